@@ -1,4 +1,4 @@
-from typing import Optional, Any
+from typing import Optional, Any, List
 from logging import Logger
 import asyncio
 
@@ -12,10 +12,12 @@ from core.models.entities.agent import Agent as AgentModel
 from core.models.messages.broker_message import BrokerMessage, BrokerMessageType
 from core.authority import Authority
 from core.broker import Broker
+from core.messaging.subscription_registry import SubscriptionHandle
 from core.topic_generator import TopicGenerator
 
 from core.services.agience_chat_completion_service import AgienceChatCompletionService
 from core.services.agience_credential_service import AgienceCredentialService
+from core.models.messages.broker_events import CredentialResponseEvent, decode_event
 from core.services.extended_service_provider import ExtendedServiceProvider
 
 
@@ -46,6 +48,7 @@ class Agent(AgentModel):
         self._logger = logger
         self._disposed = False
         self._is_connected = False
+        self._subscriptions: List[SubscriptionHandle] = []
         self._chat_history = ChatHistory()
         self._topic_generator = TopicGenerator(authority.id, id)
 
@@ -76,18 +79,17 @@ class Agent(AgentModel):
 
         if not self._is_connected:
             try:
-                # Subscribe to agent's topic
-                await self._broker.subscribe(
+                # The agent's own topic carries credential responses, so the
+                # session keeps it while offline; both go out in one batch
+                self._subscriptions = [await self._broker.subscribe(
                     self._topic_generator.subscribe_as_agent(),
+                    self._broker_receive_message,
+                    qos=self._broker.options.control_qos
+                )]
+                self._subscriptions.extend(await self._broker.subscribe_many(
+                    [self._topic_generator.connect_to(topic.name) for topic in self.topics],
                     self._broker_receive_message
-                )
-
-                # Subscribe to each topic
-                for topic in self.topics:
-                    await self._broker.subscribe(
-                        self._topic_generator.connect_to(topic.name),
-                        self._broker_receive_message
-                    )
+                ))
 
                 self._is_connected = True
                 self._logger.info(f"Agent {self.id} connected successfully")
@@ -99,18 +101,15 @@ class Agent(AgentModel):
     async def _broker_receive_message(self, message: BrokerMessage) -> None:
         try:
             # Handle incoming credential
-            if (message.type == BrokerMessageType.EVENT
-                and message.data
-                and message.data.get("type") == "credential_response"
-                and message.data.get("credential_name")
-                    and message.data.get("encrypted_credential")):
-
-                name = message.data["credential_name"]
-                credential = message.data["encrypted_credential"]
+            event = decode_event(message.data) if message.type == BrokerMessageType.EVENT else None
+            if (isinstance(event, CredentialResponseEvent)
+                and event.credential_name
+                    and event.encrypted_credential):
 
                 credential_service: AgienceCredentialService = self._service_provider.get_service(
                     AgienceCredentialService)
-                await credential_service.add_encrypted_credential(name, credential)
+                await credential_service.add_encrypted_credential(
+                    event.credential_name, event.encrypted_credential, message.correlation_id)
         except Exception as e:
             self._logger.error(f"Error processing broker message: {str(e)}")
             raise
@@ -119,7 +118,9 @@ class Agent(AgentModel):
         """Disconnect the agent from its topics"""
         if self._is_connected:
             try:
-                await self._broker.unsubscribe(self._topic_generator.subscribe_as_agent())
+                # Shared connect/ topics stay subscribed while other agents use them
+                await self._broker.unsubscribe_many(self._subscriptions)
+                self._subscriptions = []
                 self._is_connected = False
                 self._logger.info(f"Agent {self.id} disconnected successfully")
             except Exception as e:
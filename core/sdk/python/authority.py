@@ -1,4 +1,4 @@
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Set
 from pydantic import BaseModel
 from urllib.parse import urlparse, urlunparse
 import json
@@ -10,6 +10,11 @@ import ssl
 from http.client import HTTPException
 
 from core.broker import Broker, BrokerMessage, BrokerMessageType
+from core.models.messages.broker_events import (
+    LEGACY_SCHEMA_VERSION, NATIVE_SCHEMA_VERSION, AgentConnectEvent, AgentDisconnectEvent, BrokerEvent,
+    CredentialRequestEvent, CredentialResponseEvent, HostConnectEvent, HostWelcomeEvent, decode_event,
+    schema_version_of
+)
 from core.models.entities.host import Host
 from core.models.entities.agent import Agent
 from core.models.entities.plugin import Plugin
@@ -20,6 +25,10 @@ class Authority:
     BROKER_URI_KEY = "broker_uri"
     FILES_URI_KEY = "files_uri"
     OPENID_CONFIG_PATH = "/.well-known/openid-configuration"
+    # Agents per host_welcome part; the host connects each part's agents on
+    # arrival. Only for hosts on event schema 2: older hosts (.NET) read
+    # agents from the first part alone, so they get one welcome.
+    WELCOME_AGENTS_PER_MESSAGE = 25
 
     def __init__(
         self,
@@ -29,7 +38,8 @@ class Authority:
         service_scope_factory,
         logger: logging.Logger,
         authority_uri_internal: Optional[str] = None,
-        broker_uri_internal: Optional[str] = None
+        broker_uri_internal: Optional[str] = None,
+        share_group: Optional[str] = None
     ):
         if not authority_uri:
             raise ValueError("authority_uri cannot be empty")
@@ -41,17 +51,29 @@ class Authority:
         self._service_scope_factory = service_scope_factory
         self._logger = logger or ValueError("logger cannot be None")
         self._broker_uri = broker_uri_internal
+        # Workers in the same share group split the authority's inbound stream
+        self._share_group = share_group
 
         self.token_endpoint: Optional[str] = None
         self.files_uri: Optional[str] = None
         self.is_connected: bool = False
 
         self._topic_generator = TopicGenerator(self.id, self.id)
+        # Referenced until done, so the loop can't drop them mid-publish
+        self._welcome_tasks: Set[asyncio.Task] = set()
+        # Host id -> event schema it sent host_connect in, and so reads
+        self._host_schemas: Dict[str, int] = {}
 
     @property
     def id(self) -> str:
         return self._authority_uri.hostname
 
+    @property
+    def subscription_topic(self) -> str:
+        if self._share_group:
+            return self._topic_generator.subscribe_as_authority_shared(self._share_group)
+        return self._topic_generator.subscribe_as_authority()
+
     @property
     def timestamp(self) -> str:
         return self._broker.timestamp
@@ -120,14 +142,15 @@ class Authority:
 
             if self._broker.is_connected:
                 await self._broker.subscribe(
-                    self._topic_generator.subscribe_as_authority(),
-                    self._broker_receive_message
+                    self.subscription_topic,
+                    self._broker_receive_message,
+                    qos=self._broker.options.control_qos
                 )
                 self.is_connected = True
 
     async def disconnect(self):
         if self.is_connected:
-            await self._broker.unsubscribe(self._topic_generator.subscribe_as_authority())
+            await self._broker.unsubscribe(self.subscription_topic)
             await self._broker.disconnect()
             self.is_connected = False
 
@@ -136,31 +159,31 @@ class Authority:
         self._logger.info(f"MessageReceived: sender:{
                           message.sender_id}, destination:{message.destination}")
 
-        if not message.sender_id or not message.data:
+        if not message.sender_id or not message.data or message.type != BrokerMessageType.EVENT:
             return
 
-        if (message.type == BrokerMessageType.EVENT and
-            message.data.get("type") == "host_connect" and
-                message.data.get("host")):
-
-            host = Host.parse_raw(message.data["host"])
-            if host.id == message.sender_id:
-                await self._on_host_connected(host)
+        try:
+            event = decode_event(message.data)
+        except ValueError as e:
+            self._logger.error(
+                f"Failed to parse {message.data.get('type')} message: {e}")
+            return
 
-        if (message.type == BrokerMessageType.EVENT and
-            message.data.get("type") == "credential_request" and
-            message.data.get("credential_name") and
-            message.data.get("jwk") and
-                message.data.get("agent_id") == message.sender_id):
+        if isinstance(event, HostConnectEvent):
+            if event.host.id == message.sender_id:
+                self._host_schemas[event.host.id] = schema_version_of(message.data)
+                await self._on_host_connected(event.host)
 
-            credential_name = message.data["credential_name"]
-            agent_id = message.data["agent_id"]
-            jwk = json.loads(message.data["jwk"])
+        elif (isinstance(event, CredentialRequestEvent) and
+              event.credential_name and event.jwk and
+                event.agent_id == message.sender_id):
 
-            await self._handle_credential_request(agent_id, credential_name, jwk)
+            await self._handle_credential_request(
+                event.agent_id, event.credential_name, event.jwk, message.correlation_id)
 
     # TODO: need to implement authority_records_repository
-    async def _handle_credential_request(self, agent_id: str, credential_name: str, jwk: dict):
+    async def _handle_credential_request(self, agent_id: str, credential_name: str, jwk: dict,
+                                         correlation_id: Optional[str] = None):
         authority_records_repository = self.get_authority_records_repository()
 
         credential = await authority_records_repository.get_credential_for_agent_by_name(
@@ -179,11 +202,12 @@ class Authority:
         await self._broker.publish_async(BrokerMessage(
             type=BrokerMessageType.EVENT,
             topic=self._topic_generator.publish_to_agent(agent_id),
-            data={
-                "type": "credential_response",
-                "credential_name": credential_name,
-                "encrypted_credential": encrypted_credential
-            }
+            data=self._event_data(CredentialResponseEvent(
+                credential_name=credential_name,
+                encrypted_credential=encrypted_credential
+            )),
+            # Lets the agent match the response to its request span
+            correlation_id=correlation_id
         ))
 
         self._logger.error(f"Credential response sent for '{
@@ -218,17 +242,47 @@ class Authority:
 
         self._logger.info(f"Publishing Host Welcome Event: {host.name}")
 
-        self._broker.publish(BrokerMessage(
-            type=BrokerMessageType.EVENT,
-            topic=self._topic_generator.publish_to_host(host.id),
-            data={
-                "type": "host_welcome",
-                "timestamp": self._broker.timestamp,
-                "host": json.dumps(host.dict()),
-                "plugins": json.dumps([p.dict() for p in plugins]),
-                "agents": json.dumps([a.dict() for a in agents])
-            }
-        ))
+        task = asyncio.create_task(self._publish_host_welcome(host, plugins, agents))
+        self._welcome_tasks.add(task)
+        task.add_done_callback(lambda done: self._on_host_welcome_sent(host, done))
+
+    def _on_host_welcome_sent(self, host: Host, task: asyncio.Task):
+        self._welcome_tasks.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            self._logger.error(f"Failed to publish Host Welcome for {host.id}: {error}", exc_info=error)
+
+    async def _publish_host_welcome(self, host: Host, plugins: List[Plugin], agents: List[Agent]):
+        # The first part carries the host and plugins, the rest only agents.
+        # Parts share a topic, so the host receives them in order. Hosts on
+        # the legacy schema get everything in one message, as before.
+        if self._host_schema(host.id) >= NATIVE_SCHEMA_VERSION:
+            batch_size = self.WELCOME_AGENTS_PER_MESSAGE
+            batches = [agents[i:i + batch_size]
+                       for i in range(0, len(agents), batch_size)] or [[]]
+        else:
+            batches = [agents]
+        topic = self._topic_generator.publish_to_host(host.id)
+
+        for part, batch in enumerate(batches):
+            event = HostWelcomeEvent(
+                timestamp=self._broker.timestamp,
+                host_id=host.id,
+                part=part,
+                parts=len(batches),
+                agents=batch
+            )
+            if part == 0:
+                event.host = host
+                event.plugins = plugins
+
+            await self._broker.publish_async(BrokerMessage(
+                type=BrokerMessageType.EVENT,
+                topic=topic,
+                data=self._event_data(event, host.id)
+            ))
 
     # TODO: need to implement authority_records_repository
     async def _send_agent_connect_event(self, agent: Agent):
@@ -242,14 +296,13 @@ class Authority:
         self._logger.info(f"Sending Agent Connect Event: {agent.name}")
         self._logger.debug(f"Agent: {json.dumps(agent.dict())}")
 
-        self._broker.publish(BrokerMessage(
+        await self._broker.publish(BrokerMessage(
             type=BrokerMessageType.EVENT,
             topic=self._topic_generator.publish_to_host(host_id),
-            data={
-                "type": "agent_connect",
-                "timestamp": self._broker.timestamp,
-                "agent": json.dumps(agent.dict())
-            }
+            data=self._event_data(AgentConnectEvent(
+                timestamp=self._broker.timestamp,
+                agent=agent
+            ), host_id)
         ))
 
     # TODO: need to implement authority_records_repository
@@ -260,16 +313,25 @@ class Authority:
         authority_records_repository = self.get_authority_records_repository()
         host_id = await authority_records_repository.get_host_id_for_agent_by_id(agent.id)
 
-        self._broker.publish(BrokerMessage(
+        await self._broker.publish(BrokerMessage(
             type=BrokerMessageType.EVENT,
             topic=self._topic_generator.publish_to_host(host_id),
-            data={
-                "type": "agent_disconnect",
-                "timestamp": self._broker.timestamp,
-                "agent_id": agent.id
-            }
+            data=self._event_data(AgentDisconnectEvent(
+                timestamp=self._broker.timestamp,
+                agent_id=agent.id
+            ), host_id)
         ))
 
+    def _host_schema(self, host_id: str) -> int:
+        # A host not heard from since this authority started gets the legacy layout
+        return self._host_schemas.get(host_id, LEGACY_SCHEMA_VERSION)
+
+    def _event_data(self, event: BrokerEvent, host_id: Optional[str] = None):
+        """The event in the layout its recipient reads: a host's own, else the configured one."""
+        if host_id is not None:
+            return event.to_data(self._host_schema(host_id))
+        return event.to_data(self._broker.options.event_schema_version)
+
     async def _fetch_openid_config(self, config_url: str) -> dict:
         if not config_url:
             raise ValueError("Config URL cannot be empty")
@@ -0,0 +1,101 @@
+"""
+Per-message cost of Data on the broker path: decoding a received payload,
+reading its fields and encoding it for publish. Each case is timed for the
+Data and JSON path from before the rework (benchmarks/baseline_data.py)
+and for the current one. Run from the repository root, where the SDK is
+importable as `core`:
+
+    python -m core.benchmarks.data_benchmark [--messages N] [--backend NAME]
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable
+
+from core.benchmarks.baseline_data import BaselineJsonCodec
+from core.data import Data
+from core.messaging.payload_codec import JsonCodec
+
+
+def _host_welcome_payload(agent_count: int) -> bytes:
+    agents = [{"id": f"agent-{i}", "name": f"Agent {i}", "persona": "x" * 40} for i in range(agent_count)]
+    return json.dumps({
+        "type": "host_welcome",
+        "host": {"id": "host-1", "name": "Host", "plugins": []},
+        "plugins": [{"id": f"plugin-{i}", "name": f"Plugin {i}"} for i in range(5)],
+        "agents": agents,
+    }).encode()
+
+
+def _chat_payload() -> bytes:
+    return json.dumps({"type": "chat", "sender": "agent-1", "text": "hello " * 20}).encode()
+
+
+def _time(count: int, operation: Callable[[], None]) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        operation()
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def _cases(codec: Any, new_data: Callable[[], Any], payload: bytes):
+    def decode_modify_encode():
+        data = codec.decode_data(payload)
+        data["forwarded"] = "true"
+        codec.encode_data(data)
+
+    # Nested values added as JSON text, as BrokerEvent.to_data does; made
+    # once here so the timing covers Data and not the json.dumps calls
+    fields = [(key, value if isinstance(value, str) else json.dumps(value))
+              for key, value in json.loads(payload).items()]
+
+    def build_and_encode():
+        data = new_data()
+        for key, value in fields:
+            data.add(key, value)
+        codec.encode_data(data)
+
+    def build_encode_modify_encode():
+        data = new_data()
+        for key, value in fields:
+            data.add(key, value)
+        codec.encode_data(data)
+        data["forwarded"] = "true"
+        codec.encode_data(data)
+
+    return (
+        ("decode", lambda: codec.decode_data(payload)),
+        ("decode + read type", lambda: codec.decode_data(payload).get("type")),
+        ("decode + read all fields", lambda: [value for value in codec.decode_data(payload).values()]),
+        ("decode + modify + encode", decode_modify_encode),
+        ("build + encode", build_and_encode),
+        ("build + encode, modify + encode", build_encode_modify_encode),
+    )
+
+
+def run(messages: int):
+    for name, payload in (("chat", _chat_payload()), ("host_welcome (25 agents)", _host_welcome_payload(25))):
+        print(f"{name}: {len(payload)} bytes")
+        print(f"  {'us/message':<32} {'before':>9} {'after':>9}")
+
+        before = _cases(BaselineJsonCodec(), BaselineJsonCodec.new_data, payload)
+        after = _cases(JsonCodec(), Data, payload)
+        for (label, old), (_, new) in zip(before, after):
+            print(f"  {label:<32} {_time(messages, old):9.2f} {_time(messages, new):9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--backend", default=None, help="JSON backend: stdlib, orjson or ujson")
+    args = parser.parse_args()
+
+    if args.backend:
+        from core.utils.json_backend import set_json_backend
+        set_json_backend(args.backend)
+
+    run(args.messages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Information id generation: ids per second for each generator and how
+well consecutive ids keep sorted order. Run from the repository root,
+where the SDK is importable as `core`:
+
+    python -m core.benchmarks.id_benchmark [--ids N]
+"""
+import argparse
+import bisect
+import time
+from typing import Callable, List
+
+from core.utils.id_generator import LegacyIdGenerator, UlidGenerator, ulid_from_bytes, ulid_to_bytes
+
+
+def _rate(label: str, count: int, generate: Callable[[], List[str]]) -> List[str]:
+    started = time.perf_counter()
+    ids = generate()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {count / elapsed / 1e6:6.2f} M ids/s  ({elapsed / count * 1e9:7.0f} ns/id)")
+    return ids
+
+
+def _locality(label: str, ids: List[str]):
+    """Share of ids already in order, and the cost of keeping a sorted index."""
+    in_order = sum(1 for previous, current in zip(ids, ids[1:]) if previous < current)
+
+    index: List[str] = []
+    started = time.perf_counter()
+    for value in ids:
+        bisect.insort(index, value)
+    elapsed = time.perf_counter() - started
+
+    print(f"  {label:<28} {in_order / (len(ids) - 1):6.1%} in order, "
+          f"sorted insert {elapsed / len(ids) * 1e9:7.0f} ns/id")
+
+
+def run(count: int):
+    legacy = LegacyIdGenerator()
+    ulid = UlidGenerator()
+
+    print(f"Generation ({count} ids)")
+    legacy_ids = _rate("legacy sha256/base64", count, lambda: [legacy.new_id() for _ in range(count)])
+    ulid_ids = _rate("ulid", count, lambda: [ulid.new_id() for _ in range(count)])
+    _rate("ulid, batches of 100", count,
+          lambda: [value for _ in range(count // 100) for value in ulid.new_ids(100)])
+
+    print("Sort locality")
+    _locality("legacy sha256/base64", legacy_ids)
+    _locality("ulid", ulid_ids)
+
+    print("Binary form")
+    _rate("ulid -> 16 bytes -> ulid", count, lambda: [ulid_from_bytes(ulid_to_bytes(value)) for value in ulid_ids])
+    print(f"  {len(legacy_ids[0])} chars legacy, {len(ulid_ids[0])} chars or 16 bytes ulid")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ids", type=int, default=100000)
+    args = parser.parse_args()
+    run(args.ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,76 @@
 import ssl
-from datetime import datetime
-from typing import Dict, List, Optional, Callable, Any
+from typing import Dict, List, Optional, Callable, Any, Set, Union
 import asyncio
 from asyncio import Task
+from functools import partial
 import logging
-from ntplib import NTPClient
-from pydantic import BaseModel
+import time
+import uuid
 import paho.mqtt.client as mqtt
 from paho.mqtt.packettypes import PacketTypes
 from urllib.parse import urlparse
 
 from core.models.messages.broker_message import BrokerMessage, BrokerMessageType
+from core.models.messages.received_message import ReceivedBrokerMessage
 from core.information import Information
 from core.data import Data
-
-
-class CallbackContainer(BaseModel):
-    callback: Callable[[BrokerMessage], Task]
+from core.broker_options import BrokerOptions
+from core.messaging.broker_instrumentation import BrokerInstrumentation, PrometheusFamily, render_prometheus
+from core.messaging.message_chunker import ChunkAssembler, new_chunk_id, split_payload
+from core.messaging.message_dispatcher import MessageDispatcher
+from core.messaging.message_priority import MessagePriority, classify_priority, classify_topic
+from core.messaging.offline_queue import OfflinePublishQueue
+from core.messaging.payload_codec import PayloadCodec, PayloadCodecRegistry
+from core.messaging.payload_compressor import PayloadCompressor
+from core.messaging.publish_pipeline import PublishPipeline
+from core.messaging.rate_limiter import RateLimitPolicy, SenderRateLimiter
+from core.messaging.subscription_batcher import SubscriptionBatcher
+from core.messaging.subscription_registry import SubscriptionHandle, SubscriptionRegistry
+from core.messaging.topic_alias_table import TopicAliasTable
+from core.messaging.topic_trie import TopicTrie
+from core.messaging.tracing import Tracer, default_tracer
+from core.topic_generator import TopicGenerator
+from core.messaging.mqtt_transport import (
+    AsyncioMqttTransport, MqttTransport, MqttTransportMode, ThreadedMqttTransport)
+from core.utils.backoff import jittered_backoff
+from core.utils.ntp_clock import NtpClock
 
 
 class Broker:
     MESSAGE_TYPE_KEY = "message.type"
-    TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
-
-    def __init__(self, logger: logging.Logger, custom_ntp_host: Optional[str] = None):
+    CONTENT_TYPE_KEY = "content.type"
+    CONTENT_ENCODING_KEY = "content.encoding"
+    CHUNK_ID_KEY = "chunk.id"
+    CHUNK_INDEX_KEY = "chunk.index"
+    CHUNK_COUNT_KEY = "chunk.count"
+    MESSAGE_ID_KEY = "trace.message_id"
+    CORRELATION_ID_KEY = "trace.correlation_id"
+    SENT_AT_KEY = "trace.sent_at"
+    TRACEPARENT_KEY = "traceparent"
+    PRIORITY_KEY = "message.priority"
+    TIME_FORMAT = NtpClock.TIME_FORMAT
+
+    def __init__(self, logger: logging.Logger, custom_ntp_host: Optional[str] = None,
+                 options: Optional[BrokerOptions] = None, clock: Optional[NtpClock] = None,
+                 tracer: Optional[Tracer] = None, codecs: Optional[PayloadCodecRegistry] = None):
         self._logger = logger
         self._custom_ntp_host = custom_ntp_host
-        self._mqtt_client = mqtt.Client(protocol=mqtt.MQTTv5)
-        self._callbacks: Dict[str, List[CallbackContainer]] = {}
-        self._ntp_client: Optional[NTPClient] = None
+        self._options = options or BrokerOptions()
+        # Stable across reconnects so the server can resume the session; 23
+        # alphanumerics is the length every MQTT server must accept
+        self._client_id = "agience" + uuid.uuid4().hex[:16]
+        self._mqtt_client = self._create_client()
+        self._subscriptions = SubscriptionRegistry()
         self._connected = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connect_future: Optional[asyncio.Future] = None
+
+        # Reconnect state; set once connect() succeeds, cleared by disconnect()
+        self._should_reconnect = False
+        self._session_present = False
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._reconnects = 0
+        self._reconnect_attempts = 0
 
         # NTP hosts
         self.ntp_hosts = [
@@ -42,6 +83,84 @@ class Broker:
             "oceania.pool.ntp.org"
         ]
 
+        if self._custom_ntp_host:
+            if not self._custom_ntp_host.lower().endswith('pool.ntp.org'):
+                raise ValueError(
+                    "The CustomNtpHost must end with `pool.ntp.org`")
+            self.ntp_hosts = [self._custom_ntp_host]
+
+        # Brokers sharing a process may share one clock; only its creator stops it
+        self._owns_clock = clock is None
+        self._clock = clock or NtpClock(
+            logger,
+            self.ntp_hosts,
+            resync_interval_seconds=self._options.ntp_resync_interval_seconds,
+            max_backoff_seconds=self._options.ntp_max_backoff_seconds
+        )
+
+        self._instrumentation = BrokerInstrumentation()
+        self._tracer = tracer or default_tracer()
+
+        self._dispatcher = MessageDispatcher(
+            logger,
+            queue_size=self._options.dispatch_queue_size,
+            worker_count=self._options.dispatch_workers,
+            invoke=self._invoke_callback
+        )
+
+        self._publish_pipeline = PublishPipeline(
+            logger, max_inflight=self._options.max_inflight_messages)
+        self._mqtt_client.max_inflight_messages_set(
+            self._options.max_inflight_messages)
+
+        self._subscription_batcher = SubscriptionBatcher(
+            self._mqtt_client,
+            logger,
+            batch_window_seconds=self._options.subscribe_batch_window_seconds,
+            max_batch_size=self._options.subscribe_batch_max_topics
+        )
+
+        self._codecs = codecs or PayloadCodecRegistry()
+        self._publish_codec = self._codecs.resolve(self._options.payload_content_type)
+        if self._publish_codec.content_type != self._options.payload_content_type:
+            self._logger.warning(
+                f"Payload codec '{self._options.payload_content_type}' is not available, publishing JSON")
+
+        self._compressor = PayloadCompressor(
+            algorithm=self._options.compression,
+            threshold_bytes=self._options.compression_threshold_bytes,
+            level=self._options.compression_level,
+            dictionary=self._options.compression_dictionary,
+            max_output_bytes=self._options.max_decompressed_bytes
+        )
+
+        self._chunk_assembler = ChunkAssembler(
+            logger,
+            timeout_seconds=self._options.chunk_timeout_seconds,
+            max_buffered_bytes=self._options.chunk_buffer_max_bytes
+        )
+
+        # Sized from the CONNACK's Topic Alias Maximum on every connect
+        self._topic_aliases = TopicAliasTable()
+
+        self._json_topics: TopicTrie[bool] = TopicTrie()
+        for topic_filter in self._options.json_topic_filters:
+            self._json_topics.add(topic_filter, True)
+
+        self._offline_queue = OfflinePublishQueue(self._options.offline_queue_size)
+
+        self._rate_limiter = SenderRateLimiter(
+            self._options.publish_rate_limit,
+            burst=self._options.publish_rate_burst,
+            policy=self._options.publish_rate_policy,
+            host_rate_per_second=self._options.publish_host_rate_limit,
+            host_burst=self._options.publish_host_rate_burst
+        )
+        # Tasks started by publish(), by sender; held so they are not collected
+        self._publish_tasks: Dict[str, Set[Task]] = {}
+
+        self._transport = self._create_transport()
+
         # Set up MQTT callbacks
 
         self._mqtt_client.on_connect = self._on_connect
@@ -49,16 +168,83 @@ class Broker:
         self._mqtt_client.on_disconnect = self._on_disconnect
         self._mqtt_client.on_publish = self._on_publish
         self._mqtt_client.on_subscribe = self._on_subscribe
+        self._mqtt_client.on_unsubscribe = self._on_unsubscribe
 
     @property
     def is_connected(self) -> bool:
         return self._connected
 
+    @property
+    def client_id(self) -> str:
+        return self._client_id
+
+    @property
+    def clock(self) -> NtpClock:
+        return self._clock
+
+    @property
+    def options(self) -> BrokerOptions:
+        return self._options
+
     @property
     def timestamp(self) -> str:
-        if not self._ntp_client:
-            raise RuntimeError("NTP client not initialized")
-        return datetime.utcfromtimestamp(self._ntp_client.request('pool.ntp.org').tx_time).strftime(self.TIME_FORMAT)
+        return self._clock.timestamp
+
+    @property
+    def tracer(self) -> Tracer:
+        return self._tracer
+
+    @property
+    def codecs(self) -> PayloadCodecRegistry:
+        return self._codecs
+
+    @property
+    def compressor(self) -> PayloadCompressor:
+        return self._compressor
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "traffic": self._instrumentation.snapshot,
+            "clock": self._clock.metrics,
+            "dispatch": self._dispatcher.metrics,
+            "publish": self._publish_pipeline.metrics,
+            "subscriptions": self._subscription_batcher.metrics,
+            "compression": self._compressor.metrics,
+            "chunks": self._chunk_assembler.metrics,
+            "topic_aliases": self._topic_aliases.metrics,
+            "offline_queue": self._offline_queue.metrics,
+            "rate_limit": {
+                **self._rate_limiter.metrics,
+                "publish_tasks": sum(len(tasks) for tasks in self._publish_tasks.values()),
+            },
+            "reconnect": {
+                "reconnects": self._reconnects,
+                "attempts": self._reconnect_attempts,
+                "session_present": self._session_present,
+            },
+        }
+
+    def prometheus_metrics(self) -> str:
+        """Traffic counters, latency histograms and queue depths as Prometheus text."""
+        return render_prometheus(self.prometheus_families())
+
+    def prometheus_families(self, labels: str = "") -> List[PrometheusFamily]:
+        """The families of `prometheus_metrics`, with `labels` added to every sample."""
+        dispatch = self._dispatcher.metrics
+        publish = self._publish_pipeline.metrics
+        return self._instrumentation.prometheus_families(gauges={
+            "connected": int(self._connected),
+            "dispatch_pending": dispatch["pending"],
+            "dispatch_pending_control": dispatch["priority_pending"]["control"],
+            "dispatch_pending_data": dispatch["priority_pending"]["data"],
+            "publish_inflight": publish["inflight"],
+            "publish_waiting_control": publish["waiting"]["control"],
+            "publish_waiting_data": publish["waiting"]["data"],
+            "offline_queue_pending": len(self._offline_queue),
+            "reconnects_total": self._reconnects,
+            "publish_throttled_total": self._rate_limiter.metrics["throttled"],
+        }, labels=labels)
 
     async def connect(self, token: str, broker_uri: str):
         await self._start_ntp_clock()
@@ -84,49 +270,131 @@ class Broker:
             self._mqtt_client.tls_insecure_set(True)
 
             try:
-                self._mqtt_client.connect(host, port, keepalive=60)
-
-                # Start a background loop for the MQTT client
+                # Callbacks are handed to the loop that owns the connection
                 loop = asyncio.get_running_loop()
-                loop.run_in_executor(None, self._mqtt_client.loop_forever)
-
-                # Wait for connection or timeout
-                timeout = 10
-                start_time = datetime.now()
-                while not self.is_connected and (datetime.now() - start_time).seconds < timeout:
-                    await asyncio.sleep(0.1)
+                self._loop = loop
+                self._dispatcher.start(loop)
+                self._publish_pipeline.start(loop)
+                self._subscription_batcher.start(loop)
+
+                # Resolved by _on_connect when the CONNACK arrives
+                self._connect_future = loop.create_future()
+
+                # Clean start only on the first connect; reconnects resume the
+                # session the server kept for session_expiry_seconds
+                connect_properties = mqtt.Properties(PacketTypes.CONNECT)
+                if self._options.session_expiry_seconds:
+                    connect_properties.SessionExpiryInterval = self._options.session_expiry_seconds
+
+                await self._transport.connect(
+                    loop, host, port, keepalive=60,
+                    clean_start=mqtt.MQTT_CLEAN_START_FIRST_ONLY,
+                    properties=connect_properties
+                )
 
-                if not self.is_connected:
+                try:
+                    await asyncio.wait_for(
+                        self._connect_future, timeout=self._options.connect_timeout_seconds)
+                except asyncio.TimeoutError:
                     raise TimeoutError("Connection timeout")
 
+                self._should_reconnect = self._options.reconnect
+
             except Exception as e:
                 self._logger.error(f"Broker Connection Failed: {str(e)}")
                 raise
 
+    def _create_client(self) -> mqtt.Client:
+        return mqtt.Client(client_id=self._client_id, protocol=mqtt.MQTTv5)
+
+    def _create_transport(self) -> MqttTransport:
+        if self._options.transport == MqttTransportMode.ASYNCIO:
+            return AsyncioMqttTransport(
+                self._mqtt_client,
+                self._logger,
+                should_pause=lambda: self._dispatcher.is_saturated,
+                wait_for_resume=self._dispatcher.wait_for_capacity
+            )
+        return ThreadedMqttTransport(self._mqtt_client, self._logger)
+
     def _on_connect(self, client, userdata, flags, rc, properties=None):
         if rc == 0:
+            server_maximum = getattr(properties, "TopicAliasMaximum", 0)
+            self._topic_aliases.reset(
+                min(self._options.topic_alias_maximum, server_maximum))
+            self._session_present = bool(
+                flags.get("session present")) if isinstance(flags, dict) else False
             self._connected = True
             self._logger.info("Broker Connected")
         else:
             self._logger.error(f"Connection failed with code {rc}")
 
+        if self._loop and self._connect_future:
+            self._loop.call_soon_threadsafe(
+                self._resolve_connect, self._connect_future, rc)
+
+    def _resolve_connect(self, future: asyncio.Future, rc):
+        if future.done():
+            return
+        if rc == 0:
+            future.set_result(None)
+        else:
+            future.set_exception(ConnectionError(
+                f"Connection failed with code {rc}"))
+
     def _on_message(self, client, userdata, msg: mqtt.MQTTMessage):
-        self._logger.info(f"Received Message: {msg.topic}")
+        self._instrumentation.record_in(msg.topic, len(msg.payload))
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(f"Received Message: {msg.topic}")
 
-        topic_parts = msg.topic.split('/')
-        callback_topic = '/'.join(topic_parts[2:])  # Remove SenderId segment
+        handles = self._subscriptions.match(msg.topic)
 
-        if callback_topic in self._callbacks:
+        if handles:
             try:
                 user_properties = msg.properties.UserProperty if hasattr(
                     msg.properties, 'UserProperty') else []
 
-                # Get the first message type from the UserProperty or None as default
-                message_type_str = next(
-                    (value for key, value in user_properties if key ==
-                     self.MESSAGE_TYPE_KEY),
-                    None
-                )
+                message_type_str = None
+                content_type = None
+                content_encoding = None
+                chunk_id = None
+                chunk_index = 0
+                chunk_count = 1
+                message_id = None
+                correlation_id = None
+                sent_at = None
+                traceparent = None
+                priority = None
+                for key, value in user_properties:
+                    if key == self.MESSAGE_TYPE_KEY and message_type_str is None:
+                        message_type_str = value
+                    elif key == self.CONTENT_TYPE_KEY and content_type is None:
+                        content_type = value
+                    elif key == self.CONTENT_ENCODING_KEY and content_encoding is None:
+                        content_encoding = value
+                    elif key == self.CHUNK_ID_KEY:
+                        chunk_id = value
+                    elif key == self.CHUNK_INDEX_KEY:
+                        chunk_index = int(value)
+                    elif key == self.CHUNK_COUNT_KEY:
+                        chunk_count = int(value)
+                    elif key == self.MESSAGE_ID_KEY:
+                        message_id = value
+                    elif key == self.CORRELATION_ID_KEY:
+                        correlation_id = value
+                    elif key == self.SENT_AT_KEY:
+                        sent_at = float(value)
+                    elif key == self.TRACEPARENT_KEY:
+                        traceparent = value
+                    elif key == self.PRIORITY_KEY:
+                        priority = value
+
+                payload = msg.payload
+                if chunk_id:
+                    payload = self._chunk_assembler.add(
+                        msg.topic, chunk_id, chunk_index, chunk_count, payload)
+                    if payload is None:
+                        return
 
                 try:
                     message_type = BrokerMessageType(
@@ -134,148 +402,424 @@ class Broker:
                 except ValueError:
                     message_type = BrokerMessageType.UNKNOWN
 
-                message = BrokerMessage(
-                    type=message_type,
-                    topic=msg.topic
+                # No content type means a JSON sender (.NET, older SDKs)
+                codec = self._codecs.get(content_type)
+
+                # Decompressed and decoded on the loop, when a handler first reads it
+                message = ReceivedBrokerMessage(
+                    message_type,
+                    msg.topic,
+                    payload,
+                    partial(self._decode_payload, codec, content_encoding),
+                    message_id=message_id,
+                    correlation_id=correlation_id,
+                    sent_at=sent_at,
+                    traceparent=traceparent
                 )
 
-                if message_type == BrokerMessageType.EVENT:
-                    data = Data()
-                    data.raw = msg.payload.decode()
+                if sent_at is not None and self._clock.is_synchronized:
+                    self._instrumentation.record_transit(msg.topic, self._clock.now() - sent_at)
 
-                    message.data = data
-                elif message_type == BrokerMessageType.INFORMATION:
-                    message.information = Information.parse_raw(msg.payload)
+                # The payload stays untouched: our senders mark control traffic,
+                # older ones are judged by topic
+                if content_type is not None:
+                    message_priority = MessagePriority.CONTROL if priority == "control" else MessagePriority.DATA
+                else:
+                    message_priority = classify_topic(msg.topic)
 
-                # Create event loop if not exists
-                try:
-                    loop = asyncio.get_event_loop()
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-
-                for container in self._callbacks[callback_topic]:
-                    # asyncio.create_task(container.callback(message))
-                    loop.run_until_complete(container.callback(message))
+                # Handlers run on the owning loop; this thread only enqueues
+                callbacks = [handle.callback for handle in handles]
+                self._dispatcher.submit(msg.topic, callbacks, message, message_priority)
 
             except Exception as e:
-                # print(e)
-                self._logger.error(f"Message handling error: {
-                                   str(e)}", exc_info=e)
-                raise
+                self._logger.error(f"Message handling error: {str(e)}", exc_info=e)
+
+    def _decode_payload(self, codec: PayloadCodec, content_encoding: Optional[str],
+                        message_type: BrokerMessageType, payload: bytes) -> Any:
+        if content_encoding:
+            payload = self._compressor.decompress(payload, content_encoding)
+
+        if message_type == BrokerMessageType.EVENT:
+            return codec.decode_data(payload)
+        return codec.decode_information(payload)
 
     def _on_disconnect(self, client, userdata, disconnect_flags, rc):
         # client, userdata, disconnect_flags, reason_code, properties
         self._connected = False
         self._logger.info(f"Broker disconnected with code: {rc}")
 
-    def _on_publish(self, client, userdata, mid):
-        self._logger.info(f"Message published with mid: {mid}")
-
-    def _on_subscribe(self, client, userdata, mid, granted_qos, properties=None):
-        self._logger.info(f"Subscribed successfully with mid {
-                          mid} and QoS: {granted_qos}")
-
-    async def subscribe(self, topic: str, callback: Callable[[BrokerMessage], Task]):
-        self._logger.info(f"Subscribing to topic - {topic}")
-        if not self.is_connected:
-            raise RuntimeError("Not Connected")
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._on_connection_lost)
 
-        topic_parts = topic.split('/')
-        callback_topic = '/'.join(topic_parts[2:])
-
-        container = CallbackContainer(callback=callback)
+    def _on_connection_lost(self):
+        # Nothing else would ever resolve these waiters
+        error = ConnectionError("Broker connection lost")
+        self._publish_pipeline.fail_unsent(error)
+        if self._should_reconnect:
+            self._subscription_batcher.requeue_awaiting()
+            self._start_reconnect()
+        else:
+            self._subscription_batcher.fail_all(error)
 
-        if callback_topic not in self._callbacks:
-            self._callbacks[callback_topic] = []
+    def _start_reconnect(self):
+        if not self._should_reconnect or self._connected:
+            return
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = self._loop.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        attempt = 0
+        while self._should_reconnect and not self._connected:
+            delay = jittered_backoff(
+                attempt,
+                self._options.reconnect_min_delay_seconds,
+                self._options.reconnect_max_delay_seconds
+            )
+            self._logger.info(f"Reconnecting in {delay:.1f} seconds")
+            await asyncio.sleep(delay)
+
+            if not self._should_reconnect:
+                return
+
+            attempt += 1
+            self._reconnect_attempts += 1
+            self._connect_future = self._loop.create_future()
 
-        self._callbacks[callback_topic].append(container)
-        result, mid = self._mqtt_client.subscribe(topic, qos=0)
-        self._logger.info(f"Subscription result: {result}, message ID: {mid}")
+            try:
+                await self._transport.reconnect(self._loop)
+                await asyncio.wait_for(
+                    self._connect_future, timeout=self._options.connect_timeout_seconds)
+            except Exception as e:
+                self._logger.warning(f"Reconnect attempt {attempt} failed: {str(e)}")
+
+        if self._connected:
+            self._reconnects += 1
+            self._logger.info(
+                f"Broker reconnected after {attempt} attempts (session present: {self._session_present})")
+            await self._restore_session()
+
+    async def _restore_session(self):
+        # Without a resumed session the server has forgotten our filters
+        if not self._session_present:
+            topics = self._subscriptions.topics()
+            if topics:
+                self._logger.info(f"Restoring {len(topics)} subscriptions")
+                for topic in topics:
+                    self._subscriptions.set_acknowledgement(
+                        topic, self._subscription_batcher.subscribe(topic, self._subscriptions.qos(topic)))
+
+        # Also sends the (un)subscribes that were unacknowledged when the connection dropped
+        self._subscription_batcher.flush()
+
+        queued = self._offline_queue.drain()
+        if queued:
+            self._logger.info(f"Publishing {len(queued)} messages queued while offline")
+
+        for message, future in queued:
+            try:
+                # Already counted against the rate limit when first published
+                published = await self._publish_message(message)
+            except Exception as e:
+                published = None
+                if not future.done():
+                    future.set_exception(e)
 
-    async def unsubscribe(self, topic: str):
-        topic_parts = topic.split('/')
-        callback_topic = '/'.join(topic_parts[2:])
+            if published is not None:
+                published.add_done_callback(
+                    lambda done, target=future: self._copy_result(done, target))
 
-        if callback_topic in self._callbacks:
-            del self._callbacks[callback_topic]
+    @staticmethod
+    def _copy_result(source: asyncio.Future, target: asyncio.Future):
+        if target.done():
+            return
+        if source.cancelled():
+            target.cancel()
+        elif source.exception():
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+
+    def _on_publish(self, client, userdata, mid, *args):
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(f"Message published with mid: {mid}")
+        self._publish_pipeline.on_publish(mid)
+
+    def _on_subscribe(self, client, userdata, mid, reason_codes, properties=None):
+        self._logger.info(f"Subscribed successfully with mid {mid} and QoS: {reason_codes}")
+        self._subscription_batcher.on_subscribe(mid, reason_codes)
+
+    def _on_unsubscribe(self, client, userdata, mid, properties=None, reason_codes=None):
+        self._subscription_batcher.on_unsubscribe(mid, reason_codes)
+
+    async def subscribe(self, topic: str, callback: Callable[[BrokerMessage], Task],
+                        qos: Optional[int] = None) -> SubscriptionHandle:
+        return (await self.subscribe_many([topic], callback, qos))[0]
+
+    async def subscribe_many(self, topics: List[str], callback: Callable[[BrokerMessage], Task],
+                             qos: Optional[int] = None) -> List[SubscriptionHandle]:
+        """
+        Registers `callback` for every topic. Filters nobody on this connection
+        listens to yet, or only at a lower QoS, are queued for a batched
+        SUBSCRIBE; each handle's `acknowledged` future completes on the
+        SUBACK for its filter. `qos` defaults to `options.subscribe_qos`;
+        pass `options.control_qos` for topics control events arrive on.
+        """
+        self._logger.info(f"Subscribing to topics - {', '.join(topics)}")
+        if not self.is_connected:
+            raise RuntimeError("Not Connected")
 
-        self._mqtt_client.unsubscribe(topic)
+        if qos is None:
+            qos = self._options.subscribe_qos
+
+        handles = []
+        for topic in topics:
+            handle, _ = self._subscriptions.add(topic, callback)
+            if self._subscriptions.raise_qos(topic, qos):
+                self._subscriptions.set_acknowledgement(
+                    topic, self._subscription_batcher.subscribe(topic, qos))
+            handles.append(handle)
+
+        return handles
+
+    async def unsubscribe(self, subscription: Union[str, SubscriptionHandle]) -> asyncio.Future:
+        return (await self.unsubscribe_many([subscription]))[0]
+
+    async def unsubscribe_many(self, subscriptions: List[Union[str, SubscriptionHandle]]) -> List[asyncio.Future]:
+        """
+        Removes handles, or every callback on a filter when given a topic string.
+        An UNSUBSCRIBE is only sent once no callbacks remain on the filter.
+        """
+        futures = []
+        for subscription in subscriptions:
+            if isinstance(subscription, SubscriptionHandle):
+                topic = subscription.topic
+                is_last = self._subscriptions.remove(subscription)
+            else:
+                topic = subscription
+                is_last = self._subscriptions.remove_topic(topic)
+
+            if is_last:
+                futures.append(self._subscription_batcher.unsubscribe(topic))
+            else:
+                future = asyncio.get_running_loop().create_future()
+                future.set_result(None)
+                futures.append(future)
+
+        return futures
 
     async def disconnect(self):
+        self._should_reconnect = False
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+
         if self.is_connected:
+            # Send queued (un)subscribes before the connection goes away
+            self._subscription_batcher.flush()
             self._mqtt_client.disconnect()
-            self._mqtt_client.loop_stop()
+            await self._transport.stop()
             self._connected = False
 
-    async def publish(self, message: BrokerMessage):
-        asyncio.create_task(self.publish_async(message))
+        self._publish_pipeline.fail_all(ConnectionError("Broker disconnected"))
+        self._subscription_batcher.fail_all(ConnectionError("Broker disconnected"))
+        self._chunk_assembler.clear()
+        self._offline_queue.fail_all(ConnectionError("Broker disconnected"))
 
-    async def publish_async(self, message: BrokerMessage):
-        if not self.is_connected:
-            self._logger.error("Not Connected")
-            return
+        await self._dispatcher.stop()
+
+        if self._owns_clock:
+            await self._clock.stop()
 
+    async def publish(self, message: BrokerMessage):
         if not message.topic:
             raise ValueError("Topic cannot be None")
 
-        payload = ""
-        if message.type == BrokerMessageType.EVENT:
-            payload = str(message.data) if message.data else ""
-        elif message.type == BrokerMessageType.INFORMATION:
-            payload = message.information.json() if message.information else ""
-
-        properties = mqtt.Properties(packetType=PacketTypes.PUBLISH)
-
-        # TODO: Test this line
-        properties.UserProperty = (self.MESSAGE_TYPE_KEY, message.type.value)
+        sender = self._sender_of(message.topic)
+        tasks = self._publish_tasks.setdefault(sender, set())
+
+        if classify_priority(message) == MessagePriority.CONTROL:
+            # Connection setup and credentials are never throttled or dropped
+            publish = self._publish_message(message)
+        elif len(tasks) >= self._options.max_publish_tasks_per_sender:
+            if self._rate_limiter.policy == RateLimitPolicy.DELAY:
+                # Make the runaway caller wait for its own publish
+                self._rate_limiter.record_throttled(sender)
+                await self.publish_async(message)
+            else:
+                self._rate_limiter.reject(sender, "too many publishes in flight")
+            return
+        elif self._rate_limiter.policy == RateLimitPolicy.DELAY:
+            publish = self.publish_async(message)
+        else:
+            # Drop or raise here, in the caller, rather than in a detached task
+            if not await self._rate_limiter.acquire(sender):
+                return
+            publish = self._publish_message(message)
+
+        task = asyncio.create_task(publish)
+        tasks.add(task)
+        task.add_done_callback(lambda done: self._forget_publish_task(sender, done))
+
+    def _forget_publish_task(self, sender: str, task: Task):
+        tasks = self._publish_tasks.get(sender)
+        if tasks is not None:
+            tasks.discard(task)
+            if not tasks:
+                del self._publish_tasks[sender]
+
+    async def publish_async(self, message: BrokerMessage) -> Optional[asyncio.Future]:
+        """
+        Hands the message to the socket and returns once it is queued; the
+        returned future completes when paho reports it published (PUBACK for
+        QoS 1). Waits only while the in-flight window is full, or for the
+        sender's or host's rate limit under the DELAY policy; control events
+        are exempt. Returns None when the message was dropped.
+        """
+        if not message.topic:
+            raise ValueError("Topic cannot be None")
 
-        self._logger.info(f"Publishing message to {message.topic}")
-        res = self._mqtt_client.publish(
-            message.topic,
-            payload,
-            qos=0,
-            retain=False,
-            properties=properties
-        )
+        if (classify_priority(message) != MessagePriority.CONTROL
+                and not await self._rate_limiter.acquire(self._sender_of(message.topic))):
+            return
 
-        res.wait_for_publish()
+        return await self._publish_message(message)
 
-    async def _start_ntp_clock(self):
-        await self._query_ntp_with_backoff()
+    async def _publish_message(self, message: BrokerMessage) -> Optional[asyncio.Future]:
+        if not self.is_connected:
+            if self._should_reconnect:
+                # Sent by _restore_session once the connection is back
+                future = asyncio.get_running_loop().create_future()
+                if self._offline_queue.put(message, future):
+                    if self._logger.isEnabledFor(logging.DEBUG):
+                        self._logger.debug(f"Not Connected, queued message to {message.topic}")
+                    return future
 
-        # Schedule daily NTP updates
-        # while True:
-        #     await asyncio.sleep(24 * 60 * 60)  # 24 hours
-        #     await self._query_ntp_with_backoff()
+            self._logger.error("Not Connected")
+            return
 
-    async def _query_ntp_with_backoff(self, max_delay_seconds: float = 32):
-        if self._custom_ntp_host:
-            if not self._custom_ntp_host.lower().endswith('pool.ntp.org'):
-                raise ValueError(
-                    "The CustomNtpHost must end with `pool.ntp.org`")
-            self.ntp_hosts = [self._custom_ntp_host]
+        plain = self._json_topics.match(message.topic)
+        codec = self._codecs.json if plain else self._publish_codec
+        priority = classify_priority(message)
 
-        delay = 1
-        current_host_index = 0
+        payload = b""
+        if message.type == BrokerMessageType.EVENT:
+            payload = codec.encode_data(message.data) if message.data else b""
+        elif message.type == BrokerMessageType.INFORMATION:
+            payload = codec.encode_information(message.information) if message.information else b""
 
-        while True:
-            ntp_host = self.ntp_hosts[current_host_index]
-            try:
-                self._ntp_client = NTPClient()
-                self._logger.info(f"NTP Querying host {ntp_host}")
-                self._ntp_client.request(ntp_host)
-                self._logger.info(
-                    f"Connected to {ntp_host}. NTP Time: {self.timestamp}")
-                break
-            except Exception as e:
-                self._logger.error(f"NTP Query to host {ntp_host} failed")
+        properties = mqtt.Properties(packetType=PacketTypes.PUBLISH)
+        properties.UserProperty = [
+            (self.MESSAGE_TYPE_KEY, message.type.value),
+            (self.CONTENT_TYPE_KEY, codec.content_type)
+        ]
 
-                start_new_cycle = current_host_index == len(self.ntp_hosts) - 1
-                current_host_index = 0 if start_new_cycle else current_host_index + 1
+        if priority == MessagePriority.CONTROL:
+            properties.UserProperty.append((self.PRIORITY_KEY, "control"))
+
+        if self._options.trace_messages:
+            self._stamp_trace(message, properties)
+
+        compressed = None if plain else self._compressor.compress(payload)
+        if compressed is not None:
+            payload = compressed
+            properties.UserProperty.append(
+                (self.CONTENT_ENCODING_KEY, self._compressor.algorithm.value))
+
+        max_chunk_bytes = self._options.max_chunk_bytes
+        if plain or not max_chunk_bytes or len(payload) <= max_chunk_bytes:
+            if self._logger.isEnabledFor(logging.DEBUG):
+                self._logger.debug(f"Publishing message to {message.topic}")
+            return await self._publish_raw(message.topic, payload, properties, priority)
+
+        chunks = split_payload(payload, max_chunk_bytes)
+        chunk_id = new_chunk_id()
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(
+                f"Publishing message to {message.topic} in {len(chunks)} chunks")
+
+        futures = []
+        for index, chunk in enumerate(chunks):
+            chunk_properties = mqtt.Properties(packetType=PacketTypes.PUBLISH)
+            chunk_properties.UserProperty = properties.UserProperty + [
+                (self.CHUNK_ID_KEY, chunk_id),
+                (self.CHUNK_INDEX_KEY, str(index)),
+                (self.CHUNK_COUNT_KEY, str(len(chunks)))
+            ]
+            futures.append(await self._publish_raw(message.topic, chunk, chunk_properties, priority))
+
+        return asyncio.gather(*futures)
+
+    @staticmethod
+    def _sender_of(topic: str) -> str:
+        """The sender segment of event/<sender>/…; other topics are their own key."""
+        if topic.startswith(TopicGenerator.CONNECT_PREFIX):
+            topic = topic[len(TopicGenerator.CONNECT_PREFIX):]
+        if topic.startswith(TopicGenerator.EVENT_PREFIX):
+            return topic[len(TopicGenerator.EVENT_PREFIX):].split('/', 1)[0]
+        return topic
+
+    def _stamp_trace(self, message: BrokerMessage, properties: mqtt.Properties):
+        # A reply carries the request's correlation id; anything else starts its own
+        message.message_id = message.message_id or uuid.uuid4().hex
+        message.correlation_id = message.correlation_id or message.message_id
+        message.sent_at = self._clock.now() if self._clock.is_synchronized else time.time()
+        message.traceparent = message.traceparent or self._tracer.current_traceparent()
+
+        properties.UserProperty.extend([
+            (self.MESSAGE_ID_KEY, message.message_id),
+            (self.CORRELATION_ID_KEY, message.correlation_id),
+            (self.SENT_AT_KEY, repr(message.sent_at)),
+        ])
+        if message.traceparent:
+            properties.UserProperty.append((self.TRACEPARENT_KEY, message.traceparent))
+
+    async def _invoke_callback(self, callback: Callable[[BrokerMessage], Task], message: BrokerMessage):
+        # Handlers that start spans inside the callback become children of this one
+        with self._tracer.start_span(
+            "broker.receive",
+            attributes={
+                "messaging.destination": message.topic,
+                "messaging.message_id": message.message_id or "",
+                "agience.correlation_id": message.correlation_id or "",
+            },
+            traceparent=message.traceparent
+        ):
+            await self._instrumentation.invoke(callback, message)
+
+    async def _publish_raw(self, topic: str, payload: bytes, properties: mqtt.Properties,
+                           priority: MessagePriority = MessagePriority.DATA) -> asyncio.Future:
+        # Control events go at least once, so the session holds them while we are offline
+        qos = self._options.control_qos if priority == MessagePriority.CONTROL else self._options.publish_qos
+        started = time.perf_counter()
+        self._instrumentation.record_out(topic, len(payload))
+
+        def publish() -> mqtt.MQTTMessageInfo:
+            # Resolved when the packet is written so aliases follow wire order
+            wire_topic = topic
+            if qos == 0:
+                # QoS 1 packets may be resent after a reconnect, when the alias is gone
+                alias, is_new = self._topic_aliases.resolve(topic)
+                if alias:
+                    properties.TopicAlias = alias
+                    if not is_new:
+                        wire_topic = ""
+
+            return self._mqtt_client.publish(
+                wire_topic,
+                payload,
+                qos=qos,
+                retain=False,
+                properties=properties
+            )
+
+        future = await self._publish_pipeline.submit(publish, priority, qos)
+        self._instrumentation.track_publish(future, started)
+        return future
+
+    async def flush(self):
+        """Wait for every message published so far to be acknowledged."""
+        await self._publish_pipeline.flush()
 
-                if start_new_cycle:
-                    self._logger.info(f"Trying again a NTP connection in {
-                                      delay} seconds.\n{str(e)}")
-                    await asyncio.sleep(delay)
-                    delay = min(delay * 2, max_delay_seconds)
+    async def _start_ntp_clock(self):
+        # Queries NTP once, then re-syncs in the background on the configured interval
+        await self._clock.start()
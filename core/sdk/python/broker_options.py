@@ -0,0 +1,78 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from core.messaging.mqtt_transport import MqttTransportMode
+from core.messaging.payload_codec import JSON_CONTENT_TYPE
+from core.messaging.payload_compressor import CompressionAlgorithm
+from core.messaging.rate_limiter import RateLimitPolicy
+
+
+class BrokerOptions(BaseModel):
+    # NTP clock
+    ntp_resync_interval_seconds: float = 24 * 60 * 60
+    ntp_max_backoff_seconds: float = 32
+
+    # Inbound dispatch
+    dispatch_queue_size: int = 1000
+    dispatch_workers: int = 4
+
+    # Connection
+    transport: MqttTransportMode = MqttTransportMode.THREAD
+    connect_timeout_seconds: float = 10
+
+    # Reconnect and persistent session
+    reconnect: bool = True
+    reconnect_min_delay_seconds: float = 1
+    reconnect_max_delay_seconds: float = 60
+    session_expiry_seconds: int = 60 * 60
+    offline_queue_size: int = 1000
+    # The session only keeps messages for subscriptions above QoS 0. Control
+    # events are published at control_qos, and Host, Agent and Authority
+    # subscribe at it to the topics those events arrive on
+    control_qos: int = 1
+    subscribe_qos: int = 0
+
+    # Outbound publish pipeline
+    max_inflight_messages: int = 100
+    publish_qos: int = 0
+    # Outbound topic aliases, capped by the server's Topic Alias Maximum (0 disables)
+    topic_alias_maximum: int = 100
+
+    # Per-sender limits; the sender is the second segment of an event topic.
+    # Control events (connection setup, credentials) are never limited
+    publish_rate_limit: Optional[float] = None
+    publish_rate_burst: int = 100
+    # Limit shared by every sender on the connection, i.e. the whole host
+    publish_host_rate_limit: Optional[float] = None
+    publish_host_rate_burst: int = 1000
+    publish_rate_policy: RateLimitPolicy = RateLimitPolicy.DELAY
+    max_publish_tasks_per_sender: int = 1000
+
+    # Subscription batching
+    subscribe_batch_window_seconds: float = 0.005
+    subscribe_batch_max_topics: int = 100
+
+    # Payload encoding; receivers decode by the content type user property
+    payload_content_type: str = JSON_CONTENT_TYPE
+    # Topics always sent as plain, uncompressed JSON, e.g. to the .NET authority
+    json_topic_filters: List[str] = Field(default_factory=lambda: ["event/+/+/-/-"])
+    # Layout of typed events: 1 nests entities as JSON text (.NET SDK), 2 as
+    # plain JSON objects. Receivers read both. A host's host_connect goes out
+    # in its layout, and the authority answers that host in the same one
+    event_schema_version: int = 1
+
+    # Payload compression (opt-in); flagged by the content encoding user property
+    compression: Optional[CompressionAlgorithm] = None
+    compression_threshold_bytes: int = 16 * 1024
+    compression_level: Optional[int] = None
+    compression_dictionary: Optional[bytes] = None
+    # Received payloads expanding beyond this are dropped
+    max_decompressed_bytes: int = 16 * 1024 * 1024
+
+    # Chunked transfer; payloads above max_chunk_bytes are split (None disables)
+    max_chunk_bytes: Optional[int] = None
+    chunk_timeout_seconds: float = 30
+    chunk_buffer_max_bytes: int = 16 * 1024 * 1024
+
+    # Stamp message id, correlation id, send time and traceparent on every publish
+    trace_messages: bool = True
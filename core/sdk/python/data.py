@@ -1,70 +1,131 @@
-from typing import Dict, Optional, Iterator, Any, Union
-from pydantic import BaseModel, field_serializer, field_validator
-import json
+from typing import Dict, Optional, Iterator, Any, Tuple, Union
 from collections.abc import Mapping
+from pydantic_core import core_schema
 
+from core.utils.json_backend import json_backend
 
-class Data(BaseModel, Mapping):
-    _structured: Dict[str, Any] = {}
-    _raw: Optional[str] = None
 
-    class Config:
-        arbitrary_types_allowed = True
+class _Nested:
+    """A parsed object or array; its JSON text is made on first read."""
+
+    __slots__ = ("value", "text")
+
+    def __init__(self, value: Any):
+        self.value = value
+        self.text: Optional[str] = None
+
+
+class Data(Mapping):
+    """
+    Event payload: a flat map of fields, held per instance. Objects and
+    arrays received in the payload read back as JSON text, as the handlers
+    expect; the text is only produced when such a field is read. The
+    serialized form is cached until the next change, so a received message
+    that is forwarded unchanged is never encoded again. In pydantic models
+    a Data field accepts Data, JSON text or a dict and serializes as JSON
+    text.
+    """
+
+    __slots__ = ("_structured", "_raw", "_bytes", "_parsed")
+
+    def __init__(self, raw: Optional[str] = None):
+        self._structured: Dict[str, Any] = {}
+        self._raw: Optional[str] = None
+        self._bytes: Optional[bytes] = None
+        # key -> (JSON text, its parsed value), filled by `parsed`
+        self._parsed: Optional[Dict[str, Tuple[str, Any]]] = None
+        if raw is not None:
+            self.raw = raw
 
     @property
     def raw(self) -> Optional[str]:
         if self._raw is None:
-            # Convert any nested dictionaries to their native form before serializing
-            cleaned_dict = {}
-            for key, value in self._structured.items():
-                if isinstance(value, str):
-                    try:
-                        # Try to parse string as JSON if it looks like JSON
-                        if value.startswith('{') and value.endswith('}'):
-                            cleaned_dict[key] = json.loads(value)
-                        else:
-                            cleaned_dict[key] = value
-                    except json.JSONDecodeError:
-                        cleaned_dict[key] = value
-                else:
-                    cleaned_dict[key] = value
-            self._raw = json.dumps(cleaned_dict)
+            self._raw = self.to_bytes().decode()
         return self._raw
 
     @raw.setter
     def raw(self, value: Optional[str]) -> None:
-        self._raw = value
         self._structured.clear()
+        self._parsed = None
+        self._raw = value
+        self._bytes = None
 
         if value and value.startswith("{") and value.endswith("}"):
             try:
-                elements = json.loads(value)
-                if isinstance(elements, dict):
-                    for key, element in elements.items():
-                        if isinstance(element, (dict, list)):
-                            self._structured[key] = json.dumps(element)
-                        else:
-                            self._structured[key] = element
-            except (json.JSONDecodeError, TypeError):
+                self._load(json_backend().loads(value))
+            except ValueError:
                 pass
 
+    @classmethod
+    def from_bytes(cls, payload: Union[bytes, bytearray, memoryview]) -> 'Data':
+        """Parses a JSON payload once; the bytes are kept as the serialized form."""
+        data = cls()
+        payload = bytes(payload)
+        data._bytes = payload
+        try:
+            data._load(json_backend().loads(payload))
+        except ValueError:
+            pass
+        return data
+
+    def to_bytes(self) -> bytes:
+        if self._bytes is None:
+            if self._raw is not None:
+                self._bytes = self._raw.encode()
+            else:
+                self._bytes = json_backend().dumps(self._serializable())
+        return self._bytes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self._structured}
+
+    @classmethod
+    def from_dict(cls, elements: Dict[str, Any]) -> 'Data':
+        # Same shape as a parsed payload: nested values read back as JSON text
+        data = cls()
+        data._load(elements)
+        return data
+
     def add(self, key: str, value: Any) -> None:
-        if isinstance(value, (dict, list)):
-            # Store complex objects as native Python objects
-            self._structured[key] = value
-        else:
-            self._structured[key] = value
-        self._raw = None
+        # Objects and lists added here are kept and returned as native values
+        self._structured[key] = value
+        self._changed()
 
     def __getitem__(self, key: str) -> Optional[str]:
-        return self._structured.get(key)
+        value = self._structured.get(key)
+        if type(value) is _Nested:
+            if value.text is None:
+                value.text = json_backend().dumps(value.value).decode()
+            return value.text
+        return value
+
+    def parsed(self, key: str) -> Any:
+        """
+        The field with objects and arrays as Python values, whether they came
+        nested or as JSON text. Text is parsed once and the result kept next
+        to it; the field itself, and so the serialized form, is left as text.
+        """
+        value = self._structured.get(key)
+        if type(value) is _Nested:
+            return value.value
+        if isinstance(value, str) and value[:1] in ('{', '['):
+            if self._parsed is None:
+                self._parsed = {}
+            cached = self._parsed.get(key)
+            # Valid only while the field still holds the text it was parsed from
+            if cached is not None and cached[0] is value:
+                return cached[1]
+            try:
+                parsed = json_backend().loads(value)
+            except ValueError:
+                return value
+            self._parsed[key] = (value, parsed)
+            return parsed
+        return value
 
     def __setitem__(self, key: str, value: Any) -> None:
-        if isinstance(value, (dict, list)):
-            self._structured[key] = value
-        else:
-            self._structured[key] = value
-        self._raw = None
+        self._structured[key] = value
+        self._changed()
 
     def __iter__(self) -> Iterator[str]:
         return iter(self._structured)
@@ -75,24 +136,54 @@ class Data(BaseModel, Mapping):
     def __str__(self) -> str:
         return str(self.raw)
 
+    def __repr__(self) -> str:
+        return f"Data({self.raw!r})"
+
+    def _load(self, elements: Any):
+        if isinstance(elements, dict):
+            structured = self._structured
+            for key, element in elements.items():
+                if isinstance(element, (dict, list)):
+                    structured[key] = _Nested(element)
+                else:
+                    structured[key] = element
+
+    def _changed(self):
+        self._raw = None
+        self._bytes = None
+
+    def _serializable(self) -> Dict[str, Any]:
+        # JSON text holding an object is embedded as the object itself; the
+        # parse is kept by `parsed`, so later encodes after changes to other
+        # fields do not parse it again
+        elements = {}
+        for key, value in self._structured.items():
+            if type(value) is _Nested:
+                value = value.value
+            elif isinstance(value, str) and value.startswith('{') and value.endswith('}'):
+                value = self.parsed(key)
+            elements[key] = value
+        return elements
+
     @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
+    def __get_pydantic_core_schema__(cls, source: Any, handler: Any) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls.validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(lambda data: data.raw)
+        )
 
     @classmethod
-    def validate(cls, value: Union[str, 'Data', None]) -> Optional['Data']:
+    def validate(cls, value: Union[str, Dict[str, Any], 'Data', None]) -> Optional['Data']:
         if value is None:
             return None
         if isinstance(value, Data):
             return value
         if isinstance(value, str):
             return cls(raw=value)
+        if isinstance(value, dict):
+            return cls.from_dict(value)
         raise ValueError(f'Cannot convert {type(value)} to Data')
 
-    @field_serializer('raw', check_fields=False)
-    def serialize_raw(self, value: Optional[str], _info) -> Optional[str]:
-        return value
-
     def model_dump(self) -> Dict[str, Any]:
         return {"raw": self.raw}
 
@@ -1,55 +1,581 @@
-import concurrent.futures
+import bisect
 import datetime
-from typing import Optional, Dict
-from dataclasses import dataclass, field
-from collections import defaultdict
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from dataclasses import dataclass
+from pydantic import BaseModel
+
+from core.data import Data
+from core.history_spill import SpillLog
+from core.information import Information
+from core.utils.id_generator import is_ulid, ulid_timestamp_ms
+
 
 @dataclass
 class InformationVertex:
-   id: Optional[str] = None
-   input: Optional[dict] = None
-   input_timestamp: Optional[datetime.datetime] = None
-   output: Optional[dict] = None
-   output_timestamp: Optional[datetime.datetime] = None
-   function_id: Optional[str] = None
+    id: Optional[str] = None
+    input: Optional[Data] = None
+    input_timestamp: Optional[datetime.datetime] = None
+    output: Optional[Data] = None
+    output_timestamp: Optional[datetime.datetime] = None
+    function_id: Optional[str] = None
+
+    @property
+    def timestamp(self) -> Optional[datetime.datetime]:
+        """When the vertex happened, for the time index: input first, then output."""
+        return self.input_timestamp or self.output_timestamp
+
 
 @dataclass
 class InformationEdge:
-   source: InformationVertex
-   target: InformationVertex
+    source: InformationVertex
+    target: InformationVertex
+
+
+class RetentionPolicy(BaseModel):
+    # Limits on what a History keeps in memory; None disables each. Age
+    # counts from when a vertex was last added or read back
+    max_vertices: Optional[int] = None
+    max_bytes: Optional[int] = None
+    max_age_seconds: Optional[float] = None
+
+    # Evicted vertices are appended to segment files under this directory
+    # and read back when a query reaches them; None drops them instead
+    spill_directory: Optional[str] = None
+    spill_segment_bytes: int = 64 * 1024 * 1024
+    # Sealed segments with less than this share of live records are rewritten
+    spill_compact_ratio: float = 0.5
+
+    @property
+    def bounded(self) -> bool:
+        return any(limit is not None for limit in (self.max_vertices, self.max_bytes, self.max_age_seconds))
+
+
+# Estimated memory of a vertex besides its payloads: the dataclass, its dict
+# entries and index entries
+_VERTEX_OVERHEAD_BYTES = 512
+_EVICTION_RATE_WINDOW_SECONDS = 60
+
+
+def _as_utc(value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    # Naive and aware times can't be compared; naive ones are taken as UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime.datetime]:
+    return _as_utc(datetime.datetime.fromisoformat(value)) if value else None
+
+
+def _vertex_size(vertex: InformationVertex) -> int:
+    size = _VERTEX_OVERHEAD_BYTES + len(vertex.id or "")
+    for data in (vertex.input, vertex.output):
+        if data is not None:
+            size += len(data.to_bytes())
+    return size
+
+
+def _to_record(vertex: InformationVertex, parents: Set[str], children: Set[str]) -> Dict[str, Any]:
+    return {
+        "id": vertex.id,
+        "input": vertex.input.raw if vertex.input is not None else None,
+        "input_timestamp": vertex.input_timestamp.isoformat() if vertex.input_timestamp else None,
+        "output": vertex.output.raw if vertex.output is not None else None,
+        "output_timestamp": vertex.output_timestamp.isoformat() if vertex.output_timestamp else None,
+        "function_id": vertex.function_id,
+        "parents": list(parents),
+        "children": list(children),
+    }
+
+
+def _from_record(record: Dict[str, Any]) -> Tuple[InformationVertex, List[str], List[str]]:
+    vertex = InformationVertex(
+        id=record["id"],
+        input=Data(raw=record["input"]) if record["input"] is not None else None,
+        input_timestamp=_parse_timestamp(record["input_timestamp"]),
+        output=Data(raw=record["output"]) if record["output"] is not None else None,
+        output_timestamp=_parse_timestamp(record["output_timestamp"]),
+        function_id=record["function_id"],
+    )
+    return vertex, record["parents"], record["children"]
+
+
+def _id_timestamp(id: str) -> Optional[datetime.datetime]:
+    if not is_ulid(id):
+        return None
+    return datetime.datetime.fromtimestamp(ulid_timestamp_ms(id) / 1000, tz=datetime.timezone.utc)
+
+
+_LATEST = datetime.datetime.max.replace(tzinfo=datetime.timezone.utc)
+
+
+def _vertex_sort_key(vertex: InformationVertex) -> Tuple[datetime.datetime, str]:
+    # As History._sort_key, for vertices that may not be indexed
+    return (vertex.timestamp or _id_timestamp(vertex.id) or _LATEST, vertex.id)
+
 
 class History:
-   def __init__(self, id: Optional[str] = None, owner_id: Optional[str] = None):
-       self.id = id
-       self.owner_id = owner_id
-       self.vertices: Dict[str, InformationVertex] = {}
-       self.edges: Dict[str, InformationEdge] = {}
-       self.vertex_locks: Dict[str, object] = defaultdict(object)
-       self.lock = concurrent.futures.RLock()
-
-   def add(self, information):
-       with self.vertex_locks[information.id], self.lock:
-           if information.id not in self.vertices:
-               self.vertices[information.id] = InformationVertex(
-                   id=information.id,
-                   input=information.input,
-                   input_timestamp=datetime.datetime.fromisoformat(information.input_timestamp) if information.input_timestamp else None,
-                   output=information.output,
-                   output_timestamp=datetime.datetime.fromisoformat(information.output_timestamp) if information.output_timestamp else None,
-                   function_id=information.function_id,
-               )
-           else:
-               self.vertices[information.id].input = information.input
-               self.vertices[information.id].input_timestamp = datetime.datetime.fromisoformat(information.input_timestamp) if information.input_timestamp else None
-               self.vertices[information.id].output = information.output
-               self.vertices[information.id].output_timestamp = datetime.datetime.fromisoformat(information.output_timestamp) if information.output_timestamp else None
-               self.vertices[information.id].function_id = information.function_id
-
-       if information.parent_id:
-           with self.vertex_locks[information.parent_id], self.lock:
-               if information.parent_id not in self.vertices:
-                   self.vertices[information.parent_id] = InformationVertex(id=information.parent_id)
-               self.edges[f"{information.parent_id}-{information.id}"] = InformationEdge(
-                   source=self.vertices[information.parent_id],
-                   target=self.vertices[information.id]
-               )
\ No newline at end of file
+    """
+    Provenance graph of Information: each vertex is an Information, each edge
+    runs from a parent to a child. Parent and child adjacency sets make
+    ancestor, descendant and lineage queries cost O(result), and vertices are
+    indexed by function_id and by timestamp.
+
+    Safe to use from several threads. Writers lock the shard of the vertex
+    they change (shards are picked by id hash), so unrelated vertices are
+    updated in parallel; the function and time indexes share one short lock
+    taken inside a shard lock, never the other way round. Queries copy each
+    adjacency set under its vertex's shard lock and see each vertex either
+    before or after a concurrent update.
+
+    A RetentionPolicy bounds what stays in memory. Past a limit the least
+    recently added or read back vertices are evicted with their adjacency.
+    With a spill directory they go to an append-only SpillLog. `get` reads
+    one back into memory; the record stays in the log, so a vertex read back
+    and evicted again unchanged is not written twice. Graph queries read the
+    records they reach without making them resident, so a walk over a long
+    chain stays within the limits. by_function, between and find only see
+    the vertices in memory. Without a spill directory evicted vertices are
+    dropped, and queries stop at the gap.
+    """
+
+    def __init__(
+        self,
+        id: Optional[str] = None,
+        owner_id: Optional[str] = None,
+        shards: int = 16,
+        retention: Optional[RetentionPolicy] = None
+    ):
+        if shards < 1:
+            raise ValueError("A History needs at least one shard")
+
+        self.id = id
+        self.owner_id = owner_id
+
+        self._shards = [threading.RLock() for _ in range(shards)]
+        self._vertices: Dict[str, InformationVertex] = {}
+        self._children: Dict[str, Set[str]] = {}
+        self._parents: Dict[str, Set[str]] = {}
+
+        self._index_lock = threading.Lock()
+        self._by_function: Dict[str, Set[str]] = {}
+        # (timestamp, id), sorted; what each vertex is filed under is kept
+        # so an update can remove the old entry
+        self._by_time: List[Tuple[datetime.datetime, str]] = []
+        self._indexed: Dict[str, Tuple[Optional[str], Optional[datetime.datetime]]] = {}
+
+        self._retention = retention or RetentionPolicy()
+        self._spill: Optional[SpillLog] = None
+        if self._retention.spill_directory:
+            self._spill = SpillLog(
+                self._retention.spill_directory,
+                segment_bytes=self._retention.spill_segment_bytes,
+                compact_ratio=self._retention.spill_compact_ratio
+            )
+
+        # Vertices in memory whose spill record is still current; each id is
+        # guarded by its shard lock
+        self._spilled: Set[str] = set()
+
+        # Guarded by _index_lock. Id -> when it was last added or read back
+        # (monotonic), least recent first; only kept when a limit needs it
+        self._recency: "OrderedDict[str, float]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._resident_bytes = 0
+        self._evicted = {"max_vertices": 0, "max_bytes": 0, "max_age": 0}
+        self._dropped = 0
+        self._faulted = 0
+        self._rate_window_start = time.monotonic()
+        self._rate_window_evictions = 0
+        self._eviction_rate: Optional[float] = None
+
+    def _lock(self, id: str) -> threading.RLock:
+        return self._shards[hash(id) % len(self._shards)]
+
+    def add(self, information: Information) -> InformationVertex:
+        """Adds or updates the vertex for `information`, and its edge from parent_id."""
+        input_timestamp = _parse_timestamp(information.input_timestamp)
+        output_timestamp = _parse_timestamp(information.output_timestamp)
+
+        with self._lock(information.id):
+            vertex = self._fault(information.id)
+            if vertex is None:
+                vertex = InformationVertex(id=information.id)
+                self._vertices[information.id] = vertex
+
+            vertex.input = information.input_data
+            vertex.input_timestamp = input_timestamp
+            vertex.output = information.output_data
+            vertex.output_timestamp = output_timestamp
+            vertex.function_id = information.function_id
+            self._modified(information.id)
+            self._reindex(vertex)
+
+        if information.parent_id:
+            self._link(information.parent_id, information.id)
+
+        if self._retention.bounded:
+            self.enforce()
+
+        return vertex
+
+    def _link(self, parent_id: str, child_id: str):
+        # One shard at a time, so two writers can never wait on each other
+        with self._lock(parent_id):
+            if self._fault(parent_id) is None:
+                # Known only as a parent until its own Information arrives
+                self._vertices[parent_id] = parent = InformationVertex(id=parent_id)
+                self._reindex(parent)
+            children = self._children.setdefault(parent_id, set())
+            if child_id not in children:
+                children.add(child_id)
+                self._modified(parent_id)
+
+        with self._lock(child_id):
+            # Adjacency is only kept for vertices in memory; one evicted
+            # meanwhile is read back first so the edge lands in its record
+            if self._fault(child_id) is not None:
+                parents = self._parents.setdefault(child_id, set())
+                if parent_id not in parents:
+                    parents.add(parent_id)
+                    self._modified(child_id)
+
+    def _modified(self, id: str):
+        # Caller holds the vertex's shard lock; its spill record is now stale
+        if id in self._spilled:
+            self._spilled.discard(id)
+            self._spill.discard(id)
+
+    def _reindex(self, vertex: InformationVertex):
+        # Caller holds the vertex's shard lock
+        timestamp = vertex.timestamp or _id_timestamp(vertex.id)
+        entry = (vertex.function_id, timestamp)
+        size = _vertex_size(vertex)
+
+        with self._index_lock:
+            self._resident_bytes += size - self._sizes.get(vertex.id, 0)
+            self._sizes[vertex.id] = size
+            if self._retention.bounded:
+                self._recency[vertex.id] = time.monotonic()
+                self._recency.move_to_end(vertex.id)
+
+            previous = self._indexed.get(vertex.id)
+            if previous == entry:
+                return
+
+            if previous is not None:
+                self._remove_index_entry(vertex.id, previous)
+
+            if vertex.function_id is not None:
+                self._by_function.setdefault(vertex.function_id, set()).add(vertex.id)
+            if timestamp is not None:
+                bisect.insort(self._by_time, (timestamp, vertex.id))
+            self._indexed[vertex.id] = entry
+
+    def _remove_index_entry(self, id: str, entry: Tuple[Optional[str], Optional[datetime.datetime]]):
+        # Caller holds _index_lock
+        function_id, timestamp = entry
+        if function_id is not None:
+            ids = self._by_function.get(function_id)
+            if ids is not None:
+                ids.discard(id)
+                if not ids:
+                    del self._by_function[function_id]
+        if timestamp is not None:
+            key = (timestamp, id)
+            position = bisect.bisect_left(self._by_time, key)
+            if position < len(self._by_time) and self._by_time[position] == key:
+                del self._by_time[position]
+
+    def _fault(self, id: str) -> Optional[InformationVertex]:
+        """The vertex for `id`, read back from the spill log if it was evicted there."""
+        vertex = self._vertices.get(id)
+        if vertex is not None or self._spill is None:
+            return vertex
+
+        # Absence is only certain under the lock: an eviction holds it from
+        # writing the record until the vertex is out of memory
+        with self._lock(id):
+            vertex = self._vertices.get(id)
+            if vertex is None:
+                record = self._spill.read(id)
+                if record is None:
+                    return None
+                vertex, parents, children = _from_record(record)
+                self._vertices[id] = vertex
+                self._parents[id] = set(parents)
+                self._children[id] = set(children)
+                self._spilled.add(id)
+                self._reindex(vertex)
+                with self._index_lock:
+                    self._faulted += 1
+        return vertex
+
+    def enforce(self) -> int:
+        """Evicts until the retention limits hold; returns how many vertices went."""
+        evicted = 0
+        while True:
+            candidate = self._eviction_candidate()
+            if candidate is None:
+                return evicted
+            id, reason = candidate
+            with self._lock(id):
+                if self._evict(id, reason):
+                    evicted += 1
+
+    def _eviction_candidate(self) -> Optional[Tuple[str, str]]:
+        retention = self._retention
+        with self._index_lock:
+            if not self._recency:
+                return None
+            id, touched = next(iter(self._recency.items()))
+            if retention.max_age_seconds is not None and time.monotonic() - touched > retention.max_age_seconds:
+                return id, "max_age"
+            if retention.max_vertices is not None and len(self._sizes) > retention.max_vertices:
+                return id, "max_vertices"
+            if retention.max_bytes is not None and self._resident_bytes > retention.max_bytes:
+                return id, "max_bytes"
+        return None
+
+    def _evict(self, id: str, reason: str) -> bool:
+        # Caller holds the vertex's shard lock. The record is written before
+        # the vertex leaves memory, so it is always in one or the other
+        vertex = self._vertices.get(id)
+        if vertex is not None:
+            if id in self._spilled:
+                # Unchanged since it was read back; the record still holds
+                self._spilled.discard(id)
+            elif self._spill is not None:
+                self._spill.write(id, _to_record(vertex, self._parents.get(id, ()), self._children.get(id, ())))
+            del self._vertices[id]
+            self._parents.pop(id, None)
+            self._children.pop(id, None)
+
+        with self._index_lock:
+            entry = self._indexed.pop(id, None)
+            if entry is not None:
+                self._remove_index_entry(id, entry)
+            self._resident_bytes -= self._sizes.pop(id, 0)
+            self._recency.pop(id, None)
+
+            if vertex is None:
+                return False
+
+            self._evicted[reason] += 1
+            self._count_eviction()
+            if self._spill is None:
+                self._dropped += 1
+        return True
+
+    def _count_eviction(self):
+        # Caller holds _index_lock
+        self._roll_eviction_rate()
+        self._rate_window_evictions += 1
+
+    def _roll_eviction_rate(self):
+        now = time.monotonic()
+        elapsed = now - self._rate_window_start
+        if elapsed >= _EVICTION_RATE_WINDOW_SECONDS:
+            self._eviction_rate = self._rate_window_evictions / elapsed
+            self._rate_window_start = now
+            self._rate_window_evictions = 0
+
+    @property
+    def retention(self) -> RetentionPolicy:
+        return self._retention
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        with self._index_lock:
+            self._roll_eviction_rate()
+            rate = self._eviction_rate
+            if rate is None:
+                # No full window yet; the rate so far
+                elapsed = max(time.monotonic() - self._rate_window_start, 1e-9)
+                rate = self._rate_window_evictions / elapsed
+            metrics = {
+                "resident_vertices": len(self._sizes),
+                "resident_bytes": self._resident_bytes,
+                "spilled_vertices": len(self._spill) - len(self._spilled) if self._spill is not None else 0,
+                "evicted": dict(self._evicted),
+                "evictions_per_second": rate,
+                "dropped": self._dropped,
+                "faulted": self._faulted,
+            }
+        if self._spill is not None:
+            metrics["spill"] = self._spill.metrics
+        return metrics
+
+    def compact(self) -> int:
+        """Compacts the spill log now; returns the bytes reclaimed."""
+        return self._spill.compact() if self._spill is not None else 0
+
+    def close(self):
+        """Deletes the spill log. Evicted vertices are lost."""
+        if self._spill is not None:
+            self._spill.close()
+
+    @property
+    def vertices(self) -> Dict[str, InformationVertex]:
+        """The vertices in memory."""
+        return self._vertices
+
+    @property
+    def edges(self) -> Dict[str, InformationEdge]:
+        """Edges between vertices in memory, keyed "parent-child". Builds the whole map; prefer the queries."""
+        edges = {}
+        for parent_id in list(self._children):
+            with self._lock(parent_id):
+                parent = self._vertices.get(parent_id)
+                children = list(self._children.get(parent_id, ()))
+            if parent is None:
+                # Evicted since the ids were listed
+                continue
+            for child_id in children:
+                child = self._vertices.get(child_id)
+                if child is not None:
+                    edges[f"{parent_id}-{child_id}"] = InformationEdge(source=parent, target=child)
+        return edges
+
+    def get(self, id: str) -> Optional[InformationVertex]:
+        vertex = self._fault(id)
+        self._settle()
+        return vertex
+
+    def __contains__(self, id: object) -> bool:
+        return id in self._vertices or (self._spill is not None and id in self._spill)
+
+    def __len__(self) -> int:
+        # Vertices read back keep their record; count them once
+        return len(self._vertices) + (len(self._spill) - len(self._spilled) if self._spill is not None else 0)
+
+    def _settle(self):
+        # Reads can fault vertices back in past the limits
+        if self._spill is not None and self._retention.bounded:
+            self.enforce()
+
+    def __iter__(self) -> Iterator[InformationVertex]:
+        return iter(list(self._vertices.values()))
+
+    def _resolve(self, ids) -> List[InformationVertex]:
+        # Index lookups: what was evicted since the ids were read is skipped
+        found = map(self._vertices.get, ids)
+        return [vertex for vertex in found if vertex is not None]
+
+    def _peek(self, id: str) -> Optional[Tuple[InformationVertex, List[str], List[str]]]:
+        """
+        The vertex for `id` with its parent and child ids, from memory or
+        else from its spill record, which is left where it is.
+        """
+        with self._lock(id):
+            vertex = self._vertices.get(id)
+            if vertex is not None:
+                return vertex, list(self._parents.get(id, ())), list(self._children.get(id, ()))
+            if self._spill is None:
+                return None
+            record = self._spill.read(id)
+        return _from_record(record) if record is not None else None
+
+    def _neighbours(self, id: str, position: int) -> List[InformationVertex]:
+        entry = self._peek(id)
+        if entry is None:
+            return []
+        found = map(self._peek, entry[position])
+        return [neighbour[0] for neighbour in found if neighbour is not None]
+
+    def parents(self, id: str) -> List[InformationVertex]:
+        return self._neighbours(id, 1)
+
+    def children(self, id: str) -> List[InformationVertex]:
+        return self._neighbours(id, 2)
+
+    def _walk(self, id: str, position: int,
+              max_depth: Optional[int]) -> List[Tuple[InformationVertex, List[str], List[str]]]:
+        # Breadth first, nearest first; each vertex once, so cycles end.
+        # `position` picks the parent (1) or child (2) ids of each entry
+        start = self._peek(id)
+        if start is None:
+            return []
+
+        seen = {id}
+        found = []
+        frontier = deque([(start, 0)])
+        while frontier:
+            entry, depth = frontier.popleft()
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for neighbour_id in entry[position]:
+                if neighbour_id not in seen:
+                    seen.add(neighbour_id)
+                    neighbour = self._peek(neighbour_id)
+                    if neighbour is not None:
+                        found.append(neighbour)
+                        frontier.append((neighbour, depth + 1))
+        return found
+
+    def ancestors(self, id: str, max_depth: Optional[int] = None) -> List[InformationVertex]:
+        """Parents, their parents and so on, nearest first."""
+        return [entry[0] for entry in self._walk(id, 1, max_depth)]
+
+    def descendants(self, id: str, max_depth: Optional[int] = None) -> List[InformationVertex]:
+        """Children, their children and so on, nearest first."""
+        return [entry[0] for entry in self._walk(id, 2, max_depth)]
+
+    def lineage(self, id: str) -> List[InformationVertex]:
+        """
+        The chain from the root down to `id`. Where a vertex has more than
+        one parent, the earliest one is followed.
+        """
+        chain = []
+        seen = set()
+        entry = self._peek(id)
+        while entry is not None and entry[0].id not in seen:
+            vertex, parents, _ = entry
+            seen.add(vertex.id)
+            chain.append(vertex)
+            candidates = [parent for parent in map(self._peek, parents) if parent is not None]
+            entry = min(candidates, key=lambda parent: _vertex_sort_key(parent[0])) if candidates else None
+        chain.reverse()
+        return chain
+
+    def roots(self, id: str) -> List[InformationVertex]:
+        """The ancestors of `id` that have no parent; `id` itself if it has none."""
+        entry = self._peek(id)
+        if entry is None:
+            return []
+        if not entry[1]:
+            return [entry[0]]
+        return [vertex for vertex, parents, _ in self._walk(id, 1, None) if not parents]
+
+    def _sort_key(self, id: str) -> Tuple[datetime.datetime, str]:
+        indexed = self._indexed.get(id)
+        timestamp = indexed[1] if indexed else None
+        return (timestamp or _LATEST, id)
+
+    def by_function(self, function_id: str) -> List[InformationVertex]:
+        """Vertices in memory produced by a function, oldest first."""
+        with self._index_lock:
+            ids = list(self._by_function.get(function_id, ()))
+        ids.sort(key=self._sort_key)
+        return self._resolve(ids)
+
+    def between(
+        self,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None
+    ) -> List[InformationVertex]:
+        """Vertices in memory timestamped in [start, end), oldest first. Naive times are taken as UTC."""
+        start = _as_utc(start)
+        end = _as_utc(end)
+        with self._index_lock:
+            low = bisect.bisect_left(self._by_time, (start, "")) if start else 0
+            high = bisect.bisect_left(self._by_time, (end, "")) if end else len(self._by_time)
+            ids = [id for _, id in self._by_time[low:high]]
+        return self._resolve(ids)
+
+    def find(self, predicate: Callable[[InformationVertex], bool]) -> List[InformationVertex]:
+        """Every vertex in memory matching `predicate`; a full scan, for ad hoc queries."""
+        return [vertex for vertex in list(self._vertices.values()) if predicate(vertex)]
@@ -0,0 +1,222 @@
+from typing import Any, Dict, Optional, Set, Tuple
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+
+from core.utils.json_backend import json_backend
+
+_LENGTH = struct.Struct(">I")
+
+
+class _Segment:
+    __slots__ = ("number", "path", "size", "live_bytes", "ids", "map", "mapped_size")
+
+    def __init__(self, number: int, path: str):
+        self.number = number
+        self.path = path
+        self.size = 0
+        self.live_bytes = 0
+        self.ids: Set[str] = set()
+        self.map: Optional[mmap.mmap] = None
+        self.mapped_size = 0
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+            self.mapped_size = 0
+
+
+class SpillLog:
+    """
+    Append-only store for records evicted from a History, keyed by vertex
+    id. Records are length-prefixed JSON appended to segment files of about
+    `segment_bytes` each, and read back through a memory map of their
+    segment. A record discarded or replaced becomes dead space; a sealed
+    segment with no live records is deleted, and one whose live share falls
+    below `compact_ratio` has its live records copied forward and is then
+    deleted.
+
+    The log lives in its own directory created under `directory` and
+    removed by `close()`; its index is in memory, so it does not outlive
+    the process. Thread-safe.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, compact_ratio: float = 0.5):
+        if segment_bytes <= 0:
+            raise ValueError("segment_bytes must be positive")
+
+        os.makedirs(directory, exist_ok=True)
+        self._directory = tempfile.mkdtemp(prefix="history-", dir=directory)
+        self._segment_bytes = segment_bytes
+        self._compact_ratio = compact_ratio
+
+        self._lock = threading.Lock()
+        self._segments: Dict[int, _Segment] = {}
+        # id -> (segment number, offset of the record body, body length)
+        self._index: Dict[str, Tuple[int, int, int]] = {}
+        self._active: Optional[_Segment] = None
+        self._file = None
+        self._closed = False
+        self._compacting = False
+
+        self._written = 0
+        self._read = 0
+        self._compactions = 0
+        self._reclaimed_bytes = 0
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    def __contains__(self, id: object) -> bool:
+        return id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "records": len(self._index),
+                "segments": len(self._segments),
+                "disk_bytes": sum(segment.size for segment in self._segments.values()),
+                "live_bytes": sum(segment.live_bytes for segment in self._segments.values()),
+                "written": self._written,
+                "read": self._read,
+                "compactions": self._compactions,
+                "reclaimed_bytes": self._reclaimed_bytes,
+            }
+
+    def write(self, id: str, record: Dict[str, Any]):
+        """Appends the record for `id`, replacing any earlier one."""
+        body = json_backend().dumps(record)
+        with self._lock:
+            self._check_open()
+            self._discard(id)
+            self._append(id, body)
+            self._written += 1
+
+    def read(self, id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            location = self._index.get(id)
+            if location is None:
+                return None
+            body = self._body(*location)
+            self._read += 1
+        return json_backend().loads(body)
+
+    def discard(self, id: str):
+        with self._lock:
+            self._discard(id)
+
+    def compact(self) -> int:
+        """Rewrites every sealed segment below the live ratio; returns the bytes reclaimed."""
+        with self._lock:
+            self._check_open()
+            reclaimed = 0
+            for segment in list(self._segments.values()):
+                if segment is not self._active and self._sparse(segment):
+                    reclaimed += self._compact_segment(segment)
+            return reclaimed
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+            self._index.clear()
+            self._active = None
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def _check_open(self):
+        if self._closed:
+            raise ValueError("The spill log is closed")
+
+    def _append(self, id: str, body: bytes):
+        record_size = _LENGTH.size + len(body)
+        if self._active is None or (self._active.size and self._active.size + record_size > self._segment_bytes):
+            self._rotate()
+
+        segment = self._active
+        self._file.write(_LENGTH.pack(len(body)))
+        self._file.write(body)
+        self._index[id] = (segment.number, segment.size + _LENGTH.size, len(body))
+        segment.size += record_size
+        segment.live_bytes += record_size
+        segment.ids.add(id)
+
+    def _rotate(self):
+        sealed = self._active
+        if self._file is not None:
+            self._file.close()
+
+        number = sealed.number + 1 if sealed is not None else 1
+        segment = _Segment(number, os.path.join(self._directory, f"{number:08d}.seg"))
+        self._segments[number] = segment
+        self._active = segment
+        self._file = open(segment.path, "ab", buffering=0)
+
+        if sealed is not None and not self._compacting and self._sparse(sealed):
+            self._compact_segment(sealed)
+
+    def _body(self, number: int, offset: int, length: int) -> bytes:
+        segment = self._segments[number]
+        if segment.map is None or segment.mapped_size < offset + length:
+            # The active segment grows; map it again to see the new records
+            segment.close()
+            with open(segment.path, "rb") as file:
+                segment.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            segment.mapped_size = len(segment.map)
+        return segment.map[offset:offset + length]
+
+    def _discard(self, id: str):
+        location = self._index.pop(id, None)
+        if location is None:
+            return
+
+        number, _, length = location
+        segment = self._segments[number]
+        segment.live_bytes -= _LENGTH.size + length
+        segment.ids.discard(id)
+
+        if segment is not self._active:
+            if not segment.ids:
+                self._delete(segment)
+            elif not self._compacting and self._sparse(segment):
+                self._compact_segment(segment)
+
+    def _sparse(self, segment: _Segment) -> bool:
+        return segment.size > 0 and segment.live_bytes < segment.size * self._compact_ratio
+
+    def _compact_segment(self, segment: _Segment) -> int:
+        self._compacting = True
+        try:
+            for id in list(segment.ids):
+                self._append(id, self._body(*self._index[id]))
+        finally:
+            self._compacting = False
+
+        reclaimed = segment.size - segment.live_bytes
+        self._delete(segment)
+        self._compactions += 1
+        return reclaimed
+
+    def _delete(self, segment: _Segment):
+        segment.close()
+        del self._segments[segment.number]
+        self._reclaimed_bytes += segment.size - segment.live_bytes
+        try:
+            os.remove(segment.path)
+        except OSError:
+            pass
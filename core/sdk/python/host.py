@@ -1,10 +1,9 @@
-from typing import Dict, Optional, Callable, Any, TYPE_CHECKING
+from typing import ClassVar, Dict, Optional, Callable, Any, TYPE_CHECKING
 from pydantic import BaseModel, Field, field_serializer
 import asyncio
 import base64
 import logging
 import httpx
-import json
 import inspect
 
 from semantic_kernel.functions.kernel_function import KernelFunction
@@ -20,7 +19,10 @@ from core.authority import Authority
 from core.broker import Broker, BrokerMessage, BrokerMessageType
 from core.agent import Agent
 from core.topic_generator import TopicGenerator
-from core.data import Data
+from core.models.messages.broker_events import (
+    AgentConnectEvent, AgentDisconnectEvent, HostConnectEvent, HostWelcomeEvent, decode_event
+)
+from core.utils.backoff import jittered_backoff
 
 if TYPE_CHECKING:
     from core.agent_factory import AgentFactory
@@ -33,6 +35,9 @@ class TokenResponse(BaseModel):
 
 
 class Host(HostModel):
+    CONNECT_MIN_DELAY_SECONDS: ClassVar[float] = 1
+    CONNECT_MAX_DELAY_SECONDS: ClassVar[float] = 60
+
     id: str
     name: Optional[str] = None
     description: Optional[str] = None
@@ -84,13 +89,18 @@ class Host(HostModel):
     async def start(self):
         self._logger.info("Starting Host")
 
+        attempt = 0
         while not self.is_connected:
             try:
                 await self.connect()
             except Exception as ex:
+                # Once connected, the broker reconnects on its own
+                delay = jittered_backoff(
+                    attempt, self.CONNECT_MIN_DELAY_SECONDS, self.CONNECT_MAX_DELAY_SECONDS)
+                attempt += 1
                 self._logger.error("Unable to Connect", exc_info=ex)
-                self._logger.info("Retrying in 10 seconds")
-                await asyncio.sleep(10)  # TODO: Implement backoff
+                self._logger.info(f"Retrying in {delay:.1f} seconds")
+                await asyncio.sleep(delay)
 
     async def connect(self):
         self._logger.info("Connecting Host")
@@ -110,13 +120,14 @@ class Host(HostModel):
         if self._broker.is_connected:
             await self._broker.subscribe(
                 self._topic_generator.subscribe_as_host(),
-                self._broker_receive_message
+                self._broker_receive_message,
+                qos=self._broker.options.control_qos
             )
 
-            data = Data()
-            data.add("type", "host_connect")
-            data.add("timestamp", self._broker.timestamp)
-            data.add("host", self.model_dump_json())
+            data = HostConnectEvent(
+                timestamp=self._broker.timestamp,
+                host=self
+            ).to_data(self._broker.options.event_schema_version)
 
             broker_message = BrokerMessage(
                 type=BrokerMessageType.EVENT,
@@ -138,7 +149,7 @@ class Host(HostModel):
             for agent in self.agents.values():
                 await agent.disconnect()
 
-            await self._broker.unsubscribe(self._topic_generator.subscribe_as_host())
+            await self._broker.unsubscribe_many([self._topic_generator.subscribe_as_host()])
             await self._broker.disconnect()
 
             self.is_connected = False
@@ -241,68 +252,47 @@ class Host(HostModel):
         self._logger.info(f"Received message: {message.topic}")
 
         # self._logger.info(f"Received message: {message}")
-        if not message.sender_id or not message.data:
+        if not message.sender_id or not message.data or message.type != BrokerMessageType.EVENT:
             return
 
-        # Incoming Host Welcome Message
-        if (message.type == BrokerMessageType.EVENT and
-            message.data.get("type") == "host_welcome" and
-                message.data.get("host")):
-
-            try:
-                host_json = json.loads(message.data["host"])
-                plugins_list_json = json.loads(
-                    message.data.get("plugins", "[]")
-                )
-                agents_list_json = json.loads(message.data.get("agents", "[]"))
-
-                host = HostModel.model_validate(host_json)
-                plugins_list = [
-                    PluginModel.model_validate(p) for p in plugins_list_json
-                ]
-                agents_list = [
-                    AgentModel.model_validate(a) for a in agents_list_json
-                ]
-
-                if not host.id:
-                    self._logger.error("Invalid Host")
-                else:
-                    self._logger.info(
-                        f"Received Host Welcome Message for {host.name}")
-                    await self.receive_host_welcome(host, plugins_list, agents_list)
-
-            except json.JSONDecodeError as e:
-                self._logger.error(
-                    f"Failed to parse host welcome message: {e}")
+        try:
+            # Entities arrive validated, in one pass over the payload
+            event = decode_event(message.data)
+        except ValueError as e:
+            self._logger.error(
+                f"Failed to parse {message.data.get('type')} message: {e}")
+            return
 
-        # Incoming Agent Connect Message
-        elif (message.type == BrokerMessageType.EVENT and
-              message.data.get("type") == "agent_connect" and
-              message.data.get("agent")):
+        # Incoming Host Welcome Message
+        if isinstance(event, HostWelcomeEvent) and event.host:
+            if not event.host.id:
+                self._logger.error("Invalid Host")
+            else:
+                self._logger.info(
+                    f"Received Host Welcome Message for {event.host.name}")
+                await self.receive_host_welcome(event.host, event.plugins, event.agents)
 
-            try:
-                agent_data = json.loads(message.data["agent"])
-                agent = Agent.parse_obj(agent_data)
+        # Later parts of a split Host Welcome: connect agents as they arrive
+        elif isinstance(event, HostWelcomeEvent) and event.agents:
+            self._logger.info(
+                f"Received Host Welcome part {event.part} of {event.parts}")
 
-                self._logger.info(f"ReceiveAgentConnect for {agent.id}")
+            for agent in event.agents:
+                await self.receive_agent_connect(agent)
 
-                if not agent.id:
-                    self._logger.error("Invalid Agent")
-                    return
+        # Incoming Agent Connect Message
+        elif isinstance(event, AgentConnectEvent):
+            self._logger.info(f"ReceiveAgentConnect for {event.agent.id}")
 
-                await self.receive_agent_connect(agent)
+            if not event.agent.id:
+                self._logger.error("Invalid Agent")
+                return
 
-            except json.JSONDecodeError as e:
-                self._logger.error(
-                    f"Failed to parse agent connect message: {e}")
+            await self.receive_agent_connect(event.agent)
 
         # Incoming Agent Disconnect Message
-        elif (message.type == BrokerMessageType.EVENT and
-              message.data.get("type") == "agent_disconnect" and
-              message.data.get("agent_id")):
-
-            agent_id = message.data["agent_id"]
-            await self.receive_agent_disconnect(agent_id)
+        elif isinstance(event, AgentDisconnectEvent) and event.agent_id:
+            await self.receive_agent_disconnect(event.agent_id)
 
     def add_plugin(self, instance: Any):
         if instance is None:
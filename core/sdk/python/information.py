@@ -1,10 +1,8 @@
 from pydantic import BaseModel, Field
 from typing import Optional
-import hashlib
-import uuid
-import base64
 
 from core.data import Data
+from core.utils.id_generator import new_id
 
 
 class Information(BaseModel):
@@ -19,12 +17,12 @@ class Information(BaseModel):
     function_id: Optional[str] = None
 
     def __init__(self, parent_id: Optional[str] = None, **data):
-        guid_bytes = uuid.uuid4().bytes
-        sha256_hash = hashlib.sha256(guid_bytes).digest()
-        id_value = base64.urlsafe_b64encode(
-            sha256_hash).rstrip(b'=').decode('ascii')
+        # A received Information keeps its id; a new one gets the next from
+        # the configured generator (see core.utils.id_generator)
+        if not data.get("id"):
+            data["id"] = new_id()
 
-        super().__init__(id=id_value, parent_id=parent_id, **data)
+        super().__init__(parent_id=parent_id, **data)
 
     class Config:
         allow_population_by_field_name = True
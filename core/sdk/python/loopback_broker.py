@@ -0,0 +1,46 @@
+from typing import Optional
+import logging
+
+import paho.mqtt.client as mqtt
+
+from core.broker import Broker
+from core.broker_options import BrokerOptions
+from core.messaging.loopback import LoopbackHub, LoopbackMqttClient, LoopbackTransport
+from core.messaging.mqtt_transport import MqttTransport
+from core.messaging.tracing import Tracer
+from core.utils.ntp_clock import NtpClock
+
+
+class LoopbackBroker(Broker):
+    """
+    Broker that talks to an in-process LoopbackHub instead of an MQTT server.
+    Encoding, chunking, subscription and dispatch run exactly as in Broker;
+    only the socket is replaced. Brokers sharing a hub reach each other, so
+    Authority, Hosts and Agents can run in one process:
+
+        hub = LoopbackHub(latency_seconds=0.001)
+        authority_broker = LoopbackBroker(logger, hub)
+        host_broker = LoopbackBroker(logger, hub)
+
+    The clock serves local time; NTP is never queried.
+    """
+
+    def __init__(self, logger: logging.Logger, hub: Optional[LoopbackHub] = None,
+                 options: Optional[BrokerOptions] = None, clock: Optional[NtpClock] = None,
+                 tracer: Optional[Tracer] = None):
+        self._hub = hub or LoopbackHub()
+        super().__init__(logger, options=options, clock=clock, tracer=tracer)
+
+    @property
+    def hub(self) -> LoopbackHub:
+        return self._hub
+
+    def _create_client(self) -> mqtt.Client:
+        return LoopbackMqttClient(self._hub)
+
+    def _create_transport(self) -> MqttTransport:
+        return LoopbackTransport(self._mqtt_client, self._logger)
+
+    async def _start_ntp_clock(self):
+        if not self._clock.is_synchronized:
+            self._clock.use_local_time()
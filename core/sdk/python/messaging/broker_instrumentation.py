@@ -0,0 +1,196 @@
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import time
+
+
+TOPIC_CLASSES = ("authority", "host", "agent", "connect", "other")
+
+# Seconds; tuned for in-process callbacks and LAN round trips
+DEFAULT_LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+# (name, help text, type, sample lines)
+PrometheusFamily = Tuple[str, Optional[str], str, List[str]]
+
+
+def classify_topic(topic: str) -> str:
+    """Which party a topic addresses: event/<sender>/<authority>/<host>/<agent>, or connect/…"""
+    if topic.startswith("connect/"):
+        return "connect"
+
+    parts = topic.split('/')
+    if len(parts) == 5 and parts[0] == "event":
+        if parts[4] != '-':
+            return "agent"
+        if parts[3] != '-':
+            return "host"
+        return "authority"
+
+    return "other"
+
+
+class LatencyHistogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self._bounds = tuple(sorted(buckets))
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, seconds: float):
+        self._counts[bisect_left(self._bounds, seconds)] += 1
+        self._sum += seconds
+        self._count += 1
+
+    @property
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = []
+        running = 0
+        for bound, count in zip(self._bounds + (float("inf"),), self._counts):
+            running += count
+            cumulative.append((bound, running))
+
+        return {
+            "count": self._count,
+            "sum": self._sum,
+            "mean": self._sum / self._count if self._count else None,
+            "buckets": cumulative,
+        }
+
+
+class BrokerInstrumentation:
+    """
+    Counters and histograms for Broker's hot path: messages and bytes in and
+    out per topic class, callback execution time and publish-to-ack latency.
+    Inbound counters are only written by the network thread and everything
+    else by the loop, so no lock is taken per message.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self._messages_in = dict.fromkeys(TOPIC_CLASSES, 0)
+        self._bytes_in = dict.fromkeys(TOPIC_CLASSES, 0)
+        self._messages_out = dict.fromkeys(TOPIC_CLASSES, 0)
+        self._bytes_out = dict.fromkeys(TOPIC_CLASSES, 0)
+        self._callback_latency = LatencyHistogram(buckets)
+        self._publish_ack_latency = LatencyHistogram(buckets)
+        self._transit_latency = {topic_class: LatencyHistogram(buckets) for topic_class in TOPIC_CLASSES}
+
+    def record_in(self, topic: str, size: int):
+        topic_class = classify_topic(topic)
+        self._messages_in[topic_class] += 1
+        self._bytes_in[topic_class] += size
+
+    def record_out(self, topic: str, size: int):
+        topic_class = classify_topic(topic)
+        self._messages_out[topic_class] += 1
+        self._bytes_out[topic_class] += size
+
+    def record_transit(self, topic: str, seconds: float):
+        """Sender timestamp to receipt; only meaningful between NTP-disciplined clocks."""
+        self._transit_latency[classify_topic(topic)].observe(max(seconds, 0.0))
+
+    def track_publish(self, future: Optional[asyncio.Future], started: float):
+        if future is None:
+            return
+        future.add_done_callback(
+            lambda _: self._publish_ack_latency.observe(time.perf_counter() - started))
+
+    async def invoke(self, callback: Callable[[Any], Awaitable[None]], message: Any):
+        """MessageDispatcher invoke hook that times each callback."""
+        started = time.perf_counter()
+        try:
+            await callback(message)
+        finally:
+            self._callback_latency.observe(time.perf_counter() - started)
+
+    @property
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "messages_in": dict(self._messages_in),
+            "bytes_in": dict(self._bytes_in),
+            "messages_out": dict(self._messages_out),
+            "bytes_out": dict(self._bytes_out),
+            "callback_latency_seconds": self._callback_latency.snapshot,
+            "publish_ack_latency_seconds": self._publish_ack_latency.snapshot,
+            "transit_latency_seconds": {
+                topic_class: histogram.snapshot for topic_class, histogram in self._transit_latency.items()
+            },
+        }
+
+    def to_prometheus(self, gauges: Optional[Dict[str, float]] = None, prefix: str = "agience_broker") -> str:
+        """Render in the Prometheus text exposition format."""
+        return render_prometheus(self.prometheus_families(gauges, prefix))
+
+    def prometheus_families(self, gauges: Optional[Dict[str, float]] = None, prefix: str = "agience_broker",
+                            labels: str = "") -> List[PrometheusFamily]:
+        """The metric families of `to_prometheus`, with `labels` added to every sample."""
+        families: List[PrometheusFamily] = []
+
+        def series(extra: str = "") -> str:
+            joined = ",".join(part for part in (labels, extra) if part)
+            return f"{{{joined}}}" if joined else ""
+
+        def counter(name: str, help_text: str, values: List[Tuple[str, int]]):
+            families.append((f"{prefix}_{name}", help_text, "counter",
+                             [f"{prefix}_{name}{series(extra)} {value}" for extra, value in values]))
+
+        def by_class(direction: str, counts: Dict[str, int]) -> List[Tuple[str, int]]:
+            return [(f'direction="{direction}",topic_class="{topic_class}"', count)
+                    for topic_class, count in counts.items()]
+
+        counter("messages_total", "Messages by direction and topic class.",
+                by_class("in", self._messages_in) + by_class("out", self._messages_out))
+        counter("bytes_total", "Payload bytes by direction and topic class.",
+                by_class("in", self._bytes_in) + by_class("out", self._bytes_out))
+
+        def histogram(name: str, help_text: str, values: List[Tuple[str, LatencyHistogram]]):
+            samples = []
+            for extra, histogram_values in values:
+                snapshot = histogram_values.snapshot
+                for bound, count in snapshot["buckets"]:
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_labels = ",".join(part for part in (extra, f'le="{le}"') if part)
+                    samples.append(f"{prefix}_{name}_bucket{series(bucket_labels)} {count}")
+                samples.append(f"{prefix}_{name}_sum{series(extra)} {snapshot['sum']}")
+                samples.append(f"{prefix}_{name}_count{series(extra)} {snapshot['count']}")
+            families.append((f"{prefix}_{name}", help_text, "histogram", samples))
+
+        histogram("callback_seconds", "Subscriber callback execution time.",
+                  [("", self._callback_latency)])
+        histogram("publish_ack_seconds", "Time from publish to PUBACK (QoS 1) or socket write (QoS 0).",
+                  [("", self._publish_ack_latency)])
+        histogram("transit_seconds", "Sender timestamp to receipt, by topic class.",
+                  [(f'topic_class="{topic_class}"', values) for topic_class, values in self._transit_latency.items()])
+
+        for name, value in (gauges or {}).items():
+            families.append((f"{prefix}_{name}", None, "gauge", [f"{prefix}_{name}{series()} {value}"]))
+
+        return families
+
+
+def render_prometheus(*family_lists: List[PrometheusFamily]) -> str:
+    """
+    Prometheus text for one or more `prometheus_families` results; families
+    of the same name, such as the same metric from several brokers, are
+    written once with all their samples.
+    """
+    merged: Dict[str, PrometheusFamily] = {}
+    for families in family_lists:
+        for name, help_text, metric_type, samples in families:
+            if name in merged:
+                merged[name][3].extend(samples)
+            else:
+                merged[name] = (name, help_text, metric_type, list(samples))
+
+    lines: List[str] = []
+    for name, help_text, metric_type, samples in merged.values():
+        if help_text is not None:
+            lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
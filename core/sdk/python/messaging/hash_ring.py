@@ -0,0 +1,43 @@
+from bisect import bisect
+from typing import Generic, List, Sequence, TypeVar
+import hashlib
+
+
+T = TypeVar('T')
+
+
+class HashRing(Generic[T]):
+    """
+    Consistent hash ring. Each node is placed at `replicas` points so keys
+    spread evenly; adding or removing a node only moves the keys that hashed
+    to its points.
+    """
+
+    def __init__(self, nodes: Sequence[T], replicas: int = 64):
+        if not nodes:
+            raise ValueError("nodes cannot be empty")
+        if replicas < 1:
+            raise ValueError("replicas must be at least 1")
+
+        self._nodes = list(nodes)
+        points = sorted(
+            (self._hash(f"{index}:{replica}"), index)
+            for index in range(len(self._nodes))
+            for replica in range(replicas)
+        )
+        self._points: List[int] = [point for point, _ in points]
+        self._owners: List[int] = [index for _, index in points]
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def index_for(self, key: str) -> int:
+        position = bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[position]
+
+    def node_for(self, key: str) -> T:
+        return self._nodes[self.index_for(key)]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
@@ -0,0 +1,298 @@
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+import asyncio
+import itertools
+import random
+import threading
+
+import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+
+from core.messaging.mqtt_transport import MqttTransport
+from core.messaging.topic_trie import TopicTrie, split_shared_filter
+
+
+class _SharedGroup:
+    """Members of one `$share/<group>/<filter>`; each message goes to one of them."""
+
+    __slots__ = ("members", "next")
+
+    def __init__(self):
+        self.members: List['LoopbackMqttClient'] = []
+        self.next = 0
+
+    def pick(self) -> 'LoopbackMqttClient':
+        member = self.members[self.next % len(self.members)]
+        self.next += 1
+        return member
+
+
+class LoopbackHub:
+    """
+    In-process stand-in for the MQTT server. Clients attached to the same hub
+    see each other's publishes through MQTT filter matching, with user
+    properties passed through untouched. `latency_seconds` (plus up to
+    `jitter_seconds`) delays each delivery and `loss_rate` drops a share of
+    them, so the SDK can be measured without a network. Like mosquitto it
+    grants `topic_alias_maximum` outbound aliases per client. Shared
+    subscriptions are delivered round-robin within each group.
+    """
+
+    def __init__(
+        self,
+        latency_seconds: float = 0,
+        jitter_seconds: float = 0,
+        loss_rate: float = 0,
+        seed: Optional[int] = None,
+        topic_alias_maximum: int = 10
+    ):
+        if latency_seconds < 0 or jitter_seconds < 0:
+            raise ValueError("latency_seconds and jitter_seconds cannot be negative")
+        if not 0 <= loss_rate < 1:
+            raise ValueError("loss_rate must be in [0, 1)")
+
+        self._latency_seconds = latency_seconds
+        self._jitter_seconds = jitter_seconds
+        self._loss_rate = loss_rate
+        self._random = random.Random(seed)
+        self.topic_alias_maximum = topic_alias_maximum
+
+        self._lock = threading.Lock()
+        self._subscriptions: TopicTrie[Union['LoopbackMqttClient', _SharedGroup]] = TopicTrie()
+        self._shared_groups: Dict[Tuple[str, str], _SharedGroup] = {}
+        self._clients: Set['LoopbackMqttClient'] = set()
+
+        self._published = 0
+        self._delivered = 0
+        self._dropped = 0
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self._clients),
+            "subscriptions": len(self._subscriptions),
+            "published": self._published,
+            "delivered": self._delivered,
+            "dropped": self._dropped,
+        }
+
+    def attach(self, client: 'LoopbackMqttClient'):
+        with self._lock:
+            self._clients.add(client)
+
+    def detach(self, client: 'LoopbackMqttClient'):
+        with self._lock:
+            self._clients.discard(client)
+            for topic_filter in list(client.filters):
+                self._remove(client, topic_filter)
+            client.filters.clear()
+
+    def disconnect_all(self):
+        """Drop every client's connection, as a server restart or failover would."""
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            client.drop_connection()
+
+    def subscribe(self, client: 'LoopbackMqttClient', topic_filter: str):
+        with self._lock:
+            if topic_filter not in client.filters:
+                group, inner = split_shared_filter(topic_filter)
+                if group is None:
+                    self._subscriptions.add(topic_filter, client)
+                else:
+                    shared = self._shared_groups.get((group, inner))
+                    if shared is None:
+                        shared = self._shared_groups[(group, inner)] = _SharedGroup()
+                        self._subscriptions.add(inner, shared)
+                    shared.members.append(client)
+                client.filters.add(topic_filter)
+
+    def unsubscribe(self, client: 'LoopbackMqttClient', topic_filter: str):
+        with self._lock:
+            if topic_filter in client.filters:
+                self._remove(client, topic_filter)
+                client.filters.discard(topic_filter)
+
+    def _remove(self, client: 'LoopbackMqttClient', topic_filter: str):
+        group, inner = split_shared_filter(topic_filter)
+        if group is None:
+            self._subscriptions.remove(topic_filter, client)
+            return
+
+        shared = self._shared_groups[(group, inner)]
+        shared.members.remove(client)
+        if not shared.members:
+            del self._shared_groups[(group, inner)]
+            self._subscriptions.remove(inner, shared)
+
+    def publish(self, topic: str, payload: bytes, qos: int, properties: Optional[mqtt.Properties]):
+        with self._lock:
+            # One delivery per client, however many of its filters match
+            receivers = list(dict.fromkeys(
+                entry.pick() if isinstance(entry, _SharedGroup) else entry
+                for entry in self._subscriptions.match(topic)))
+            self._published += 1
+
+        for receiver in receivers:
+            if self._loss_rate and self._random.random() < self._loss_rate:
+                self._dropped += 1
+                continue
+
+            delay = self._latency_seconds
+            if self._jitter_seconds:
+                delay += self._random.uniform(0, self._jitter_seconds)
+
+            self._delivered += 1
+            receiver.deliver(topic, payload, qos, properties, delay)
+
+
+class LoopbackMqttClient:
+    """
+    The part of the paho client that Broker uses, backed by a LoopbackHub.
+    Every callback runs on the event loop that called `connect`, like the
+    asyncio transport.
+    """
+
+    def __init__(self, hub: LoopbackHub):
+        self._hub = hub
+        self._mids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connected = False
+        self._aliases: Dict[int, str] = {}
+        self.filters: Set[str] = set()
+
+        self.transport = "tcp"
+        self.on_connect = None
+        self.on_message = None
+        self.on_disconnect = None
+        self.on_publish = None
+        self.on_subscribe = None
+        self.on_unsubscribe = None
+
+    # Connection options have no meaning in-process
+    def username_pw_set(self, username: Optional[str] = None, password: Optional[str] = None):
+        pass
+
+    def ws_set_options(self, path: str = "/mqtt", headers: Any = None):
+        pass
+
+    def tls_set(self, *args: Any, **kwargs: Any):
+        pass
+
+    def tls_insecure_set(self, value: bool):
+        pass
+
+    def max_inflight_messages_set(self, inflight: int):
+        pass
+
+    def connect(self, host: str, port: int = 1883, keepalive: int = 60, **kwargs: Any) -> int:
+        self._loop = asyncio.get_running_loop()
+        self._connected = True
+        self._aliases.clear()
+        self._hub.attach(self)
+
+        properties = mqtt.Properties(PacketTypes.CONNACK)
+        if self._hub.topic_alias_maximum:
+            properties.TopicAliasMaximum = self._hub.topic_alias_maximum
+        self._callback(self.on_connect, {}, 0, properties)
+        return mqtt.MQTT_ERR_SUCCESS
+
+    def reconnect(self) -> int:
+        return self.connect("loopback")
+
+    def disconnect(self, *args: Any, **kwargs: Any) -> int:
+        if self._connected:
+            self._connected = False
+            self._hub.detach(self)
+            self._callback(self.on_disconnect, None, 0)
+        return mqtt.MQTT_ERR_SUCCESS
+
+    def drop_connection(self):
+        """Lose the connection without a DISCONNECT, as on a network failure."""
+        if self._connected:
+            self._connected = False
+            self._hub.detach(self)
+            self._callback(self.on_disconnect, None, mqtt.MQTT_ERR_CONN_LOST)
+
+    def publish(self, topic: str, payload: Union[bytes, str, None] = None, qos: int = 0,
+                retain: bool = False, properties: Optional[mqtt.Properties] = None) -> mqtt.MQTTMessageInfo:
+        info = mqtt.MQTTMessageInfo(next(self._mids))
+        if not self._connected:
+            info.rc = mqtt.MQTT_ERR_NO_CONN
+            return info
+
+        if isinstance(payload, str):
+            payload = payload.encode()
+
+        alias = getattr(properties, "TopicAlias", 0)
+        if alias:
+            if alias > self._hub.topic_alias_maximum:
+                raise ValueError(f"Topic alias {alias} exceeds the maximum")
+            if topic:
+                self._aliases[alias] = topic
+            else:
+                topic = self._aliases[alias]
+
+        self._hub.publish(topic, payload or b"", qos, properties)
+        info.rc = mqtt.MQTT_ERR_SUCCESS
+        self._callback(self.on_publish, info.mid)
+        return info
+
+    def subscribe(self, topics: List[Tuple[str, Any]]) -> Tuple[int, Optional[int]]:
+        if not self._connected:
+            return mqtt.MQTT_ERR_NO_CONN, None
+
+        mid = next(self._mids)
+        granted = []
+        for topic_filter, options in topics:
+            self._hub.subscribe(self, topic_filter)
+            granted.append(getattr(options, "QoS", 0))
+
+        self._callback(self.on_subscribe, mid, granted, None)
+        return mqtt.MQTT_ERR_SUCCESS, mid
+
+    def unsubscribe(self, topics: List[str]) -> Tuple[int, Optional[int]]:
+        if not self._connected:
+            return mqtt.MQTT_ERR_NO_CONN, None
+
+        mid = next(self._mids)
+        for topic_filter in topics:
+            self._hub.unsubscribe(self, topic_filter)
+
+        self._callback(self.on_unsubscribe, mid, None, [0] * len(topics))
+        return mqtt.MQTT_ERR_SUCCESS, mid
+
+    def deliver(self, topic: str, payload: bytes, qos: int, properties: Optional[mqtt.Properties], delay: float):
+        message = mqtt.MQTTMessage(topic=topic.encode())
+        message.payload = payload
+        message.qos = qos
+        if properties is not None:
+            message.properties = properties
+
+        if delay > 0:
+            self._loop.call_soon_threadsafe(
+                self._loop.call_later, delay, self._receive, message)
+        else:
+            self._loop.call_soon_threadsafe(self._receive, message)
+
+    def _receive(self, message: mqtt.MQTTMessage):
+        if self._connected and self.on_message:
+            self.on_message(self, None, message)
+
+    def _callback(self, callback: Any, *args: Any):
+        # Acks never arrive inside the call that caused them, as with a socket
+        if callback and self._loop:
+            self._loop.call_soon_threadsafe(callback, self, None, *args)
+
+
+class LoopbackTransport(MqttTransport):
+    """Nothing to drive: the loopback client calls back on the loop directly."""
+
+    async def connect(self, loop: asyncio.AbstractEventLoop, host: str, port: int, keepalive: int, **kwargs: Any):
+        self._client.connect(host, port, keepalive=keepalive, **kwargs)
+
+    async def reconnect(self, loop: asyncio.AbstractEventLoop):
+        self._client.reconnect()
+
+    async def stop(self):
+        pass
@@ -0,0 +1,129 @@
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import time
+import uuid
+
+
+def split_payload(payload: bytes, max_chunk_bytes: int) -> List[bytes]:
+    """Split a payload into pieces of at most `max_chunk_bytes`."""
+    if max_chunk_bytes < 1:
+        raise ValueError("max_chunk_bytes must be at least 1")
+    if not payload:
+        return [payload]
+    view = memoryview(payload)
+    return [bytes(view[i:i + max_chunk_bytes]) for i in range(0, len(payload), max_chunk_bytes)]
+
+
+def new_chunk_id() -> str:
+    return uuid.uuid4().hex
+
+
+class _PartialMessage:
+    __slots__ = ("count", "chunks", "size", "received", "started")
+
+    def __init__(self, count: int, started: float):
+        self.count = count
+        self.chunks: List[Optional[bytes]] = [None] * count
+        self.size = 0
+        self.received = 0
+        self.started = started
+
+
+class ChunkAssembler:
+    """
+    Reassembles chunked messages on the receiving side, keyed by topic and
+    chunk id. Chunks may arrive in any order. Partial messages older than
+    `timeout_seconds` are dropped, and so is any message that would push the
+    buffered total past `max_buffered_bytes`, so a lost chunk or a
+    misbehaving sender cannot grow the heap without bound.
+    """
+
+    def __init__(self, logger: logging.Logger, timeout_seconds: float = 30,
+                 max_buffered_bytes: int = 16 * 1024 * 1024):
+        if timeout_seconds <= 0:
+            raise ValueError("timeout_seconds must be positive")
+        if max_buffered_bytes < 1:
+            raise ValueError("max_buffered_bytes must be at least 1")
+
+        self._logger = logger
+        self._timeout_seconds = timeout_seconds
+        self._max_buffered_bytes = max_buffered_bytes
+        self._partials: Dict[Tuple[str, str], _PartialMessage] = {}
+        self._buffered_bytes = 0
+
+        self._assembled = 0
+        self._expired = 0
+        self._rejected = 0
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "partial": len(self._partials),
+            "buffered_bytes": self._buffered_bytes,
+            "max_buffered_bytes": self._max_buffered_bytes,
+            "assembled": self._assembled,
+            "expired": self._expired,
+            "rejected": self._rejected,
+        }
+
+    def add(self, topic: str, chunk_id: str, index: int, count: int, chunk: bytes) -> Optional[bytes]:
+        """Buffer one chunk; returns the whole payload once the last missing chunk arrives."""
+        now = time.monotonic()
+        self._expire(now)
+
+        if count < 1 or not 0 <= index < count:
+            self._rejected += 1
+            raise ValueError(f"Invalid chunk {index}/{count} for message {chunk_id}")
+
+        if count == 1:
+            self._assembled += 1
+            return chunk
+
+        key = (topic, chunk_id)
+        partial = self._partials.get(key)
+        if partial is None:
+            partial = _PartialMessage(count, now)
+            self._partials[key] = partial
+        elif partial.count != count:
+            self._drop(key)
+            self._rejected += 1
+            raise ValueError(f"Chunk count changed for message {chunk_id}")
+
+        if partial.chunks[index] is not None:
+            # Redelivery (QoS 1)
+            return None
+
+        if self._buffered_bytes + len(chunk) > self._max_buffered_bytes:
+            self._drop(key)
+            self._rejected += 1
+            raise MemoryError(
+                f"Dropping chunked message {chunk_id}: reassembly buffer full")
+
+        partial.chunks[index] = chunk
+        partial.size += len(chunk)
+        partial.received += 1
+        self._buffered_bytes += len(chunk)
+
+        if partial.received < partial.count:
+            return None
+
+        self._drop(key)
+        self._assembled += 1
+        return b"".join(partial.chunks)
+
+    def clear(self):
+        self._partials.clear()
+        self._buffered_bytes = 0
+
+    def _drop(self, key: Tuple[str, str]):
+        partial = self._partials.pop(key, None)
+        if partial:
+            self._buffered_bytes -= partial.size
+
+    def _expire(self, now: float):
+        expired = [key for key, partial in self._partials.items()
+                   if now - partial.started > self._timeout_seconds]
+        for key in expired:
+            self._logger.warning(f"Chunked message {key[1]} on {key[0]} timed out")
+            self._drop(key)
+            self._expired += 1
@@ -0,0 +1,216 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import itertools
+import logging
+import threading
+import time
+
+from core.messaging.message_priority import MessagePriority
+
+
+MessageCallback = Callable[[Any], Awaitable[None]]
+
+
+class MessageDispatcher:
+    """
+    Hands inbound messages from the network thread to the owning asyncio loop.
+
+    Messages are queued on one of `worker_count` lanes chosen by topic, so each
+    topic is handled in arrival order while different topics run concurrently.
+    At most `queue_size` messages may be pending; beyond that a foreign
+    (network) thread blocks in `submit` until a worker frees a slot, which
+    pushes back on the socket instead of growing the heap.
+
+    Within a lane, control messages are taken before any queued data, and
+    they never wait for a slot, so a burst of agent traffic cannot hold up
+    connection setup or credential delivery.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        queue_size: int = 1000,
+        worker_count: int = 4,
+        invoke: Optional[Callable[[MessageCallback, Any], Awaitable[None]]] = None
+    ):
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        if worker_count < 1:
+            raise ValueError("worker_count must be at least 1")
+
+        self._logger = logger
+        self._queue_size = queue_size
+        self._worker_count = worker_count
+        self._invoke = invoke or self._invoke_callback
+
+        self._slots = threading.Semaphore(queue_size)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._queues: List[asyncio.PriorityQueue] = []
+        self._sequence = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._capacity_available: Optional[asyncio.Event] = None
+        self._running = False
+
+        self._pending = 0
+        self._max_pending = 0
+        self._submitted = 0
+        self._processed = 0
+        self._failed = 0
+        self._blocked = 0
+        self._blocked_seconds = 0.0
+        self._overflow = 0
+        self._priority_pending = dict.fromkeys(MessagePriority, 0)
+        self._priority_processed = dict.fromkeys(MessagePriority, 0)
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    @property
+    def is_saturated(self) -> bool:
+        return self._pending >= self._queue_size
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "queue_size": self._queue_size,
+            "worker_count": self._worker_count,
+            "pending": self._pending,
+            "max_pending": self._max_pending,
+            "lane_depths": [queue.qsize() for queue in self._queues],
+            "submitted": self._submitted,
+            "processed": self._processed,
+            "failed": self._failed,
+            "blocked": self._blocked,
+            "blocked_seconds": self._blocked_seconds,
+            "overflow": self._overflow,
+            "priority_pending": {
+                priority.name.lower(): count for priority, count in self._priority_pending.items()
+            },
+            "priority_processed": {
+                priority.name.lower(): count for priority, count in self._priority_processed.items()
+            },
+        }
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        if self._running:
+            if loop is not self._loop:
+                raise RuntimeError("Dispatcher already bound to another loop")
+            return
+
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._capacity_available = asyncio.Event()
+        self._capacity_available.set()
+        self._queues = [asyncio.PriorityQueue() for _ in range(self._worker_count)]
+        self._workers = [
+            loop.create_task(self._worker(queue)) for queue in self._queues
+        ]
+        self._running = True
+
+    async def stop(self):
+        if not self._running:
+            return
+
+        self._running = False
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+        # Give back the slots held by messages that were never handled
+        for queue in self._queues:
+            while not queue.empty():
+                priority, _, _, _, holds_slot = queue.get_nowait()
+                self._pending -= 1
+                self._priority_pending[priority] -= 1
+                self._release(holds_slot)
+
+        self._workers = []
+        self._queues = []
+        # Readers paused on a full queue must not wait for a restart
+        self._capacity_available.set()
+
+    def submit(self, topic: str, callbacks: List[MessageCallback], message: Any,
+               priority: MessagePriority = MessagePriority.DATA):
+        """Queue a message for its callbacks. Safe to call from any thread."""
+        if not self._running or not self._loop:
+            raise RuntimeError("Dispatcher not started")
+
+        self._submitted += 1
+        lane = hash(topic) % self._worker_count
+        # The sequence keeps arrival order within a priority
+        sequence = next(self._sequence)
+        item = (priority, sequence, message, callbacks, True)
+
+        if priority == MessagePriority.CONTROL:
+            item = (priority, sequence, message, callbacks, False)
+            if threading.get_ident() == self._loop_thread_id:
+                self._enqueue(lane, item)
+            else:
+                self._loop.call_soon_threadsafe(self._enqueue, lane, item)
+            return
+
+        if threading.get_ident() == self._loop_thread_id:
+            # Blocking the loop thread would deadlock the consumers; the caller
+            # is expected to stop reading while `is_saturated` is set.
+            if not self._slots.acquire(blocking=False):
+                self._overflow += 1
+                item = (priority, sequence, message, callbacks, False)
+            self._enqueue(lane, item)
+            return
+
+        if not self._slots.acquire(blocking=False):
+            self._blocked += 1
+            blocked_at = time.monotonic()
+            while not self._slots.acquire(timeout=0.5):
+                if not self._running:
+                    return
+            self._blocked_seconds += time.monotonic() - blocked_at
+
+        self._loop.call_soon_threadsafe(self._enqueue, lane, item)
+
+    async def wait_for_capacity(self):
+        while self.is_saturated and self._running:
+            self._capacity_available.clear()
+            await self._capacity_available.wait()
+
+    def _enqueue(self, lane: int, item: Tuple[MessagePriority, int, Any, List[MessageCallback], bool]):
+        if not self._running:
+            self._release(item[4])
+            return
+
+        self._pending += 1
+        self._priority_pending[item[0]] += 1
+        self._max_pending = max(self._max_pending, self._pending)
+        self._queues[lane].put_nowait(item)
+
+    def _release(self, holds_slot: bool):
+        if holds_slot:
+            self._slots.release()
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            priority, _, message, callbacks, holds_slot = await queue.get()
+            try:
+                for callback in callbacks:
+                    try:
+                        await self._invoke(callback, message)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        self._failed += 1
+                        self._logger.error(
+                            f"Message handling error: {str(e)}", exc_info=e)
+            finally:
+                self._processed += 1
+                self._pending -= 1
+                self._priority_pending[priority] -= 1
+                self._priority_processed[priority] += 1
+                self._release(holds_slot)
+                if not self.is_saturated:
+                    self._capacity_available.set()
+
+    @staticmethod
+    async def _invoke_callback(callback: MessageCallback, message: Any):
+        await callback(message)
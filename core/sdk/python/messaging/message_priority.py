@@ -0,0 +1,44 @@
+from enum import IntEnum
+from typing import Any, Optional
+
+from core.topic_generator import TopicGenerator
+
+
+class MessagePriority(IntEnum):
+    """Lower values are dispatched and published first."""
+    CONTROL = 0
+    DATA = 1
+
+
+# Event types that drive connection setup and credential delivery
+CONTROL_EVENT_TYPES = frozenset({
+    "host_connect",
+    "host_welcome",
+    "agent_connect",
+    "agent_disconnect",
+    "credential_request",
+    "credential_response",
+})
+
+
+def classify_priority(message: Any) -> MessagePriority:
+    """Control for the event types above; information and agent chatter is data."""
+    data: Optional[Any] = getattr(message, "data", None)
+    if data is not None and data.get("type") in CONTROL_EVENT_TYPES:
+        return MessagePriority.CONTROL
+    return MessagePriority.DATA
+
+
+def classify_topic(topic: str) -> MessagePriority:
+    """
+    For received messages that carry no priority mark (.NET and older
+    senders), judged from event/<sender>/<authority>/<host>/<agent> alone so
+    the payload stays undecoded: whatever the authority sends (sender "-")
+    and whatever is sent to an authority or host (agent "-") is control.
+    """
+    if not topic.startswith(TopicGenerator.EVENT_PREFIX):
+        return MessagePriority.DATA
+    parts = topic.split('/')
+    if len(parts) == 5 and (parts[1] == '-' or parts[4] == '-'):
+        return MessagePriority.CONTROL
+    return MessagePriority.DATA
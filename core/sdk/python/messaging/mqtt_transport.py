@@ -0,0 +1,192 @@
+from abc import ABC, abstractmethod
+from enum import Enum
+from functools import partial
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+import logging
+import threading
+
+import paho.mqtt.client as mqtt
+
+
+class MqttTransportMode(Enum):
+    THREAD = "thread"
+    ASYNCIO = "asyncio"
+
+
+class MqttTransport(ABC):
+    """Drives the network side of a paho client once `connect` is called."""
+
+    def __init__(self, client: mqtt.Client, logger: logging.Logger):
+        self._client = client
+        self._logger = logger
+
+    @abstractmethod
+    async def connect(self, loop: asyncio.AbstractEventLoop, host: str, port: int, keepalive: int, **kwargs: Any):
+        pass
+
+    @abstractmethod
+    async def reconnect(self, loop: asyncio.AbstractEventLoop):
+        """Re-open the connection with the arguments given to `connect`."""
+        pass
+
+    @abstractmethod
+    async def stop(self):
+        pass
+
+
+class ThreadedMqttTransport(MqttTransport):
+    """
+    Runs paho's network loop on an executor thread. The thread ends when the
+    connection drops; unlike `loop_forever` it never reconnects on its own,
+    so the Broker controls backoff.
+    """
+
+    LOOP_TIMEOUT_SECONDS = 1.0
+
+    def __init__(self, client: mqtt.Client, logger: logging.Logger):
+        super().__init__(client, logger)
+        self._loop_future: Optional[asyncio.Future] = None
+        self._running = False
+
+    async def connect(self, loop: asyncio.AbstractEventLoop, host: str, port: int, keepalive: int, **kwargs: Any):
+        self._client.connect(host, port, keepalive=keepalive, **kwargs)
+        self._start(loop)
+
+    async def reconnect(self, loop: asyncio.AbstractEventLoop):
+        # The previous network thread has exited, so nothing else touches the client
+        await self._wait_for_loop()
+        await loop.run_in_executor(None, self._client.reconnect)
+        self._start(loop)
+
+    async def stop(self):
+        self._running = False
+        await self._wait_for_loop()
+
+    def _start(self, loop: asyncio.AbstractEventLoop):
+        self._running = True
+        self._loop_future = loop.run_in_executor(None, self._run)
+
+    def _run(self):
+        while self._running:
+            if self._client.loop(timeout=self.LOOP_TIMEOUT_SECONDS) != mqtt.MQTT_ERR_SUCCESS:
+                break
+
+    async def _wait_for_loop(self):
+        if self._loop_future:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._loop_future), timeout=5)
+            except Exception as e:
+                self._logger.warning(f"MQTT network loop did not stop cleanly: {str(e)}")
+            self._loop_future = None
+
+
+class AsyncioMqttTransport(MqttTransport):
+    """
+    Drives paho from the event loop's selector: the socket is registered with
+    `add_reader`/`add_writer` and `loop_misc` runs as a task, so callbacks fire
+    on the loop thread. Only the blocking (re)connect itself, with its DNS
+    lookup and TCP, TLS and websocket handshakes, runs on an executor
+    thread; the socket callbacks it triggers are handed back to the loop.
+    """
+
+    MISC_INTERVAL_SECONDS = 1.0
+
+    def __init__(
+        self,
+        client: mqtt.Client,
+        logger: logging.Logger,
+        should_pause: Optional[Callable[[], bool]] = None,
+        wait_for_resume: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        super().__init__(client, logger)
+        self._should_pause = should_pause
+        self._wait_for_resume = wait_for_resume
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._sock: Any = None
+        self._misc_task: Optional[asyncio.Task] = None
+        self._resume_task: Optional[asyncio.Task] = None
+        self._reading = False
+
+        client.on_socket_open = partial(self._on_loop, self._on_socket_open)
+        client.on_socket_close = partial(self._on_loop, self._on_socket_close)
+        client.on_socket_register_write = partial(self._on_loop, self._on_socket_register_write)
+        client.on_socket_unregister_write = partial(self._on_loop, self._on_socket_unregister_write)
+
+    async def connect(self, loop: asyncio.AbstractEventLoop, host: str, port: int, keepalive: int, **kwargs: Any):
+        self._bind(loop)
+        await loop.run_in_executor(None, partial(self._client.connect, host, port, keepalive=keepalive, **kwargs))
+
+    async def reconnect(self, loop: asyncio.AbstractEventLoop):
+        self._bind(loop)
+        await loop.run_in_executor(None, self._client.reconnect)
+
+    def _bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+
+    def _on_loop(self, callback: Callable[..., None], *args: Any):
+        # The selector is only touched from the loop thread, in callback order
+        if threading.get_ident() == self._loop_thread_id:
+            callback(*args)
+        else:
+            self._loop.call_soon_threadsafe(callback, *args)
+
+    async def stop(self):
+        for task in (self._misc_task, self._resume_task):
+            if task:
+                task.cancel()
+        self._misc_task = None
+        self._resume_task = None
+
+    def _on_socket_open(self, client, userdata, sock):
+        self._sock = sock
+        self._start_reading()
+        self._misc_task = self._loop.create_task(self._misc_loop())
+
+    def _on_socket_close(self, client, userdata, sock):
+        self._stop_reading()
+        self._loop.remove_writer(sock)
+        self._sock = None
+        if self._misc_task:
+            self._misc_task.cancel()
+            self._misc_task = None
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self._loop.add_writer(sock, self._client.loop_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self._loop.remove_writer(sock)
+
+    def _on_readable(self):
+        self._client.loop_read()
+
+        # TLS and websocket wrappers can hold decoded bytes the selector never sees
+        pending = getattr(self._sock, "pending", None)
+        while self._sock is not None and pending and pending() > 0:
+            self._client.loop_read()
+
+        if self._should_pause and self._should_pause():
+            self._stop_reading()
+            self._resume_task = self._loop.create_task(self._resume_reading())
+
+    def _start_reading(self):
+        if self._sock is not None and not self._reading:
+            self._loop.add_reader(self._sock, self._on_readable)
+            self._reading = True
+
+    def _stop_reading(self):
+        if self._sock is not None and self._reading:
+            self._loop.remove_reader(self._sock)
+        self._reading = False
+
+    async def _resume_reading(self):
+        if self._wait_for_resume:
+            await self._wait_for_resume()
+        self._resume_task = None
+        self._start_reading()
+
+    async def _misc_loop(self):
+        while self._client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(self.MISC_INTERVAL_SECONDS)
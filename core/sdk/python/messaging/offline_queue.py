@@ -0,0 +1,68 @@
+from collections import deque
+from typing import Any, Deque, Dict, List, Tuple
+import asyncio
+
+
+class OfflinePublishQueue:
+    """
+    Holds messages published while the connection is down, oldest first,
+    each with the future handed back to its publisher. At most `max_size`
+    are kept; when full the oldest message is dropped and its future fails,
+    so a long outage costs the stalest messages rather than memory.
+    """
+
+    def __init__(self, max_size: int = 1000):
+        if max_size < 0:
+            raise ValueError("max_size cannot be negative")
+
+        self._max_size = max_size
+        self._queue: Deque[Tuple[Any, asyncio.Future]] = deque()
+
+        self._queued = 0
+        self._dropped = 0
+        self._flushed = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "max_size": self._max_size,
+            "pending": len(self._queue),
+            "queued": self._queued,
+            "dropped": self._dropped,
+            "flushed": self._flushed,
+        }
+
+    def put(self, message: Any, future: asyncio.Future) -> bool:
+        """Queue a message; returns False when buffering is disabled."""
+        if not self._max_size:
+            return False
+
+        if len(self._queue) >= self._max_size:
+            _, oldest = self._queue.popleft()
+            self._dropped += 1
+            self._fail(oldest, ConnectionError("Dropped from the offline publish queue"))
+
+        self._queue.append((message, future))
+        self._queued += 1
+        return True
+
+    def drain(self) -> List[Tuple[Any, asyncio.Future]]:
+        items = list(self._queue)
+        self._queue.clear()
+        self._flushed += len(items)
+        return items
+
+    def fail_all(self, error: Exception):
+        for _, future in self._queue:
+            self._fail(future, error)
+        self._queue.clear()
+
+    @staticmethod
+    def _fail(future: asyncio.Future, error: Exception):
+        if not future.done():
+            future.set_exception(error)
+            # Awaiting the result is optional; publish failures are logged
+            future.exception()
@@ -0,0 +1,188 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from core.data import Data
+from core.information import Information
+from core.utils.id_generator import is_ulid, ulid_from_bytes, ulid_to_bytes
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+CBOR_CONTENT_TYPE = "application/cbor"
+
+
+class PayloadCodec(ABC):
+    """
+    Turns the body of a BrokerMessage into publish bytes and back. The
+    `content_type` travels with every message as a user property so the
+    receiver can pick the matching decoder.
+    """
+
+    content_type: str = ""
+
+    @property
+    def is_available(self) -> bool:
+        return True
+
+    @abstractmethod
+    def encode_data(self, data: Data) -> bytes:
+        pass
+
+    @abstractmethod
+    def decode_data(self, payload: bytes) -> Data:
+        pass
+
+    @abstractmethod
+    def encode_information(self, information: Information) -> bytes:
+        pass
+
+    @abstractmethod
+    def decode_information(self, payload: bytes) -> Information:
+        pass
+
+
+class JsonCodec(PayloadCodec):
+    """UTF-8 JSON text; the format the .NET SDK and authority speak."""
+
+    content_type = JSON_CONTENT_TYPE
+
+    def encode_data(self, data: Data) -> bytes:
+        return data.to_bytes()
+
+    def decode_data(self, payload: bytes) -> Data:
+        return Data.from_bytes(payload)
+
+    def encode_information(self, information: Information) -> bytes:
+        return information.json().encode()
+
+    def decode_information(self, payload: bytes) -> Information:
+        return Information.parse_raw(payload)
+
+
+class _BinaryCodec(PayloadCodec):
+    """
+    Packs the structured fields of Data directly. Values that already hold
+    JSON text (plugin and agent lists in host_welcome) stay opaque strings, so
+    neither side parses or re-serializes them. With `compact_ids`, ULID
+    Information ids travel as 16 raw bytes instead of 26 characters; the
+    decoder accepts either form.
+    """
+
+    _ID_FIELDS = ("id", "parent_id")
+
+    def __init__(self, compact_ids: bool = False):
+        self.compact_ids = compact_ids
+
+    @abstractmethod
+    def _pack(self, value: Any) -> bytes:
+        pass
+
+    @abstractmethod
+    def _unpack(self, payload: bytes) -> Any:
+        pass
+
+    def encode_data(self, data: Data) -> bytes:
+        return self._pack(data.to_dict())
+
+    def decode_data(self, payload: bytes) -> Data:
+        elements = self._unpack(payload)
+        if not isinstance(elements, dict):
+            raise ValueError(f"{self.content_type} payload is not a map")
+        return Data.from_dict(elements)
+
+    def encode_information(self, information: Information) -> bytes:
+        elements = information.model_dump(by_alias=True)
+        if self.compact_ids:
+            for key in self._ID_FIELDS:
+                if is_ulid(elements.get(key)):
+                    elements[key] = ulid_to_bytes(elements[key])
+        return self._pack(elements)
+
+    def decode_information(self, payload: bytes) -> Information:
+        elements = self._unpack(payload)
+        if not isinstance(elements, dict):
+            raise ValueError(f"{self.content_type} payload is not a map")
+        for key in self._ID_FIELDS:
+            if isinstance(elements.get(key), bytes):
+                elements[key] = ulid_from_bytes(elements[key])
+        return Information.model_validate(elements)
+
+
+class MsgPackCodec(_BinaryCodec):
+    content_type = MSGPACK_CONTENT_TYPE
+
+    @property
+    def is_available(self) -> bool:
+        return msgpack is not None
+
+    def _pack(self, value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+
+    def _unpack(self, payload: bytes) -> Any:
+        return msgpack.unpackb(payload, raw=False)
+
+
+class CborCodec(_BinaryCodec):
+    content_type = CBOR_CONTENT_TYPE
+
+    @property
+    def is_available(self) -> bool:
+        return cbor2 is not None
+
+    def _pack(self, value: Any) -> bytes:
+        return cbor2.dumps(value)
+
+    def _unpack(self, payload: bytes) -> Any:
+        return cbor2.loads(payload)
+
+
+class PayloadCodecRegistry:
+    """
+    Codecs known to this process, keyed by content type. Messages without a
+    content type (older Python SDKs, the .NET SDK) decode as JSON.
+    """
+
+    def __init__(self, codecs: Optional[List[PayloadCodec]] = None):
+        self._codecs: Dict[str, PayloadCodec] = {}
+        self._json = JsonCodec()
+        self.register(self._json)
+
+        for codec in codecs if codecs is not None else [MsgPackCodec(), CborCodec()]:
+            self.register(codec)
+
+    @property
+    def json(self) -> PayloadCodec:
+        return self._json
+
+    @property
+    def content_types(self) -> List[str]:
+        return list(self._codecs)
+
+    def register(self, codec: PayloadCodec):
+        if not codec.content_type:
+            raise ValueError("Codec content_type cannot be empty")
+        if codec.is_available:
+            self._codecs[codec.content_type] = codec
+
+    def get(self, content_type: Optional[str]) -> PayloadCodec:
+        if not content_type:
+            return self._json
+
+        codec = self._codecs.get(content_type)
+        if codec is None:
+            raise ValueError(f"Unsupported payload content type '{content_type}'")
+        return codec
+
+    def resolve(self, content_type: Optional[str]) -> PayloadCodec:
+        """Codec for publishing; falls back to JSON if the requested one is not installed."""
+        return self._codecs.get(content_type or JSON_CONTENT_TYPE, self._json)
@@ -0,0 +1,181 @@
+from enum import Enum
+from typing import Any, Dict, List, Optional
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class CompressionAlgorithm(str, Enum):
+    DEFLATE = "deflate"
+    ZSTD = "zstd"
+
+
+class PayloadCompressor:
+    """
+    Compresses encoded payloads of at least `threshold_bytes` with the chosen
+    algorithm and decompresses by the content encoding a sender announced.
+    Smaller payloads, and payloads that do not shrink, go out unchanged.
+
+    zstd can use a shared dictionary trained on sample payloads (e.g.
+    host_welcome); every receiver needs the same dictionary to decode.
+
+    Decompression stops at `max_output_bytes`; a payload that would expand
+    beyond it is rejected with ValueError, so a peer cannot exhaust memory
+    with a small, highly compressible message.
+    """
+
+    def __init__(
+        self,
+        algorithm: Optional[CompressionAlgorithm] = None,
+        threshold_bytes: int = 16 * 1024,
+        level: Optional[int] = None,
+        dictionary: Optional[bytes] = None,
+        max_output_bytes: int = 16 * 1024 * 1024
+    ):
+        if threshold_bytes < 0:
+            raise ValueError("threshold_bytes cannot be negative")
+        if max_output_bytes < 1:
+            raise ValueError("max_output_bytes must be at least 1")
+        if algorithm == CompressionAlgorithm.ZSTD and zstandard is None:
+            raise RuntimeError("zstd compression requires the 'zstandard' package")
+
+        self._algorithm = CompressionAlgorithm(algorithm) if algorithm else None
+        self._threshold_bytes = threshold_bytes
+        self._level = level
+        self._max_output_bytes = max_output_bytes
+        self._dictionary: Optional[Any] = None
+
+        # Compression runs on the loop, and received payloads are decompressed
+        # there too, when a handler first reads the message. zstd contexts are
+        # not thread-safe, so a handler reading from another thread still gets
+        # its own
+        self._local = threading.local()
+
+        if dictionary:
+            self.load_dictionary(dictionary)
+
+        self._compressed = 0
+        self._skipped = 0
+        self._decompressed = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+        self._received_bytes_in = 0
+        self._received_bytes_out = 0
+        self._rejected = 0
+
+    @property
+    def algorithm(self) -> Optional[CompressionAlgorithm]:
+        return self._algorithm
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "algorithm": self._algorithm.value if self._algorithm else None,
+            "threshold_bytes": self._threshold_bytes,
+            "dictionary": self._dictionary is not None,
+            "compressed": self._compressed,
+            "skipped": self._skipped,
+            "uncompressed_bytes": self._bytes_in,
+            "compressed_bytes": self._bytes_out,
+            "ratio": self._bytes_out / self._bytes_in if self._bytes_in else None,
+            "decompressed": self._decompressed,
+            "received_compressed_bytes": self._received_bytes_in,
+            "received_uncompressed_bytes": self._received_bytes_out,
+            "max_output_bytes": self._max_output_bytes,
+            "rejected": self._rejected,
+        }
+
+    @staticmethod
+    def train_dictionary(samples: List[bytes], size_bytes: int = 16 * 1024) -> bytes:
+        """Train a zstd dictionary on sample payloads; distribute the result to every host."""
+        if zstandard is None:
+            raise RuntimeError("Dictionary training requires the 'zstandard' package")
+        if not samples:
+            raise ValueError("samples cannot be empty")
+        return zstandard.train_dictionary(size_bytes, samples).as_bytes()
+
+    def load_dictionary(self, dictionary: bytes):
+        if zstandard is None:
+            raise RuntimeError("Compression dictionaries require the 'zstandard' package")
+        self._dictionary = zstandard.ZstdCompressionDict(dictionary)
+        self._local = threading.local()
+
+    def compress(self, payload: bytes) -> Optional[bytes]:
+        """Returns the compressed payload, or None when it should be sent as is."""
+        if not self._algorithm or len(payload) < self._threshold_bytes:
+            self._skipped += 1
+            return None
+
+        if self._algorithm == CompressionAlgorithm.ZSTD:
+            compressed = self._zstd_compressor().compress(payload)
+        else:
+            compressed = zlib.compress(payload, -1 if self._level is None else self._level)
+
+        if len(compressed) >= len(payload):
+            self._skipped += 1
+            return None
+
+        self._compressed += 1
+        self._bytes_in += len(payload)
+        self._bytes_out += len(compressed)
+        return compressed
+
+    def decompress(self, payload: bytes, encoding: str) -> bytes:
+        algorithm = CompressionAlgorithm(encoding)
+
+        if algorithm == CompressionAlgorithm.ZSTD:
+            if zstandard is None:
+                raise RuntimeError("Received zstd payload but 'zstandard' is not installed")
+            decompressed = self._zstd_decompress(payload)
+        else:
+            decompressor = zlib.decompressobj()
+            # One byte past the limit tells an oversized payload from one that fits exactly
+            decompressed = decompressor.decompress(payload, self._max_output_bytes + 1)
+            if len(decompressed) <= self._max_output_bytes:
+                decompressed += decompressor.flush()
+            if not decompressor.eof and len(decompressed) <= self._max_output_bytes:
+                raise ValueError("Truncated deflate payload")
+
+        if len(decompressed) > self._max_output_bytes:
+            self._rejected += 1
+            raise ValueError(
+                f"Decompressed payload exceeds {self._max_output_bytes} bytes")
+
+        self._decompressed += 1
+        self._received_bytes_in += len(payload)
+        self._received_bytes_out += len(decompressed)
+        return decompressed
+
+    def _zstd_decompress(self, payload: bytes) -> bytes:
+        # The frame header's content size can't be trusted, so read through a
+        # stream and stop one byte past the limit
+        chunks = []
+        remaining = self._max_output_bytes + 1
+        with self._zstd_decompressor().stream_reader(payload) as reader:
+            while remaining > 0:
+                chunk = reader.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def _zstd_compressor(self):
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = zstandard.ZstdCompressor(
+                level=3 if self._level is None else self._level,
+                dict_data=self._dictionary)
+            self._local.compressor = compressor
+        return compressor
+
+    def _zstd_decompressor(self):
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = zstandard.ZstdDecompressor(dict_data=self._dictionary)
+            self._local.decompressor = decompressor
+        return decompressor
@@ -0,0 +1,192 @@
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+
+import paho.mqtt.client as mqtt
+
+from core.messaging.message_priority import MessagePriority
+
+
+class PublishPipeline:
+    """
+    Tracks outgoing publishes by `mid` so callers get an asyncio future per
+    message instead of blocking on `wait_for_publish()`. At most
+    `max_inflight` messages may be unacknowledged; further publishers wait for
+    a slot, and a freed slot goes to the highest priority waiter, so control
+    messages overtake queued data. For QoS 0 the future completes once paho
+    has written the packet, for QoS 1 when the PUBACK arrives. paho discards
+    unwritten QoS 0 packets on reconnect, so `fail_unsent` fails their
+    futures when the connection drops; QoS 1 packets are resent and keep
+    theirs.
+    """
+
+    def __init__(self, logger: logging.Logger, max_inflight: int = 100):
+        if max_inflight < 1:
+            raise ValueError("max_inflight must be at least 1")
+
+        self._logger = logger
+        self._max_inflight = max_inflight
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # In-flight window; waiters are served by (priority, arrival)
+        self._window_used = 0
+        self._waiters: List[Tuple[MessagePriority, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+        # on_publish arrives on the network thread
+        self._lock = threading.Lock()
+        # mid -> (future, qos)
+        self._pending: Dict[int, Tuple[asyncio.Future, int]] = {}
+        self._early_acks: Set[int] = set()
+        self._inflight: Set[asyncio.Future] = set()
+
+        self._published = 0
+        self._acked = 0
+        self._failed = 0
+        self._window_waits = 0
+        self._priority_published = dict.fromkeys(MessagePriority, 0)
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "max_inflight": self._max_inflight,
+            "inflight": len(self._inflight),
+            "published": self._published,
+            "acked": self._acked,
+            "failed": self._failed,
+            "window_waits": self._window_waits,
+            "waiting": {
+                priority.name.lower(): sum(1 for waiter in self._waiters if waiter[0] == priority)
+                for priority in MessagePriority
+            },
+            "priority_published": {
+                priority.name.lower(): count for priority, count in self._priority_published.items()
+            },
+        }
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._window_used = 0
+        self._waiters = []
+        with self._lock:
+            self._early_acks.clear()
+
+    async def submit(self, publish: Callable[[], mqtt.MQTTMessageInfo],
+                     priority: MessagePriority = MessagePriority.DATA, qos: int = 0) -> asyncio.Future:
+        if not self._loop:
+            raise RuntimeError("Publish pipeline not started")
+
+        await self._acquire(priority)
+
+        future = self._loop.create_future()
+        self._inflight.add(future)
+        future.add_done_callback(self._on_done)
+
+        try:
+            info = publish()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+
+        self._published += 1
+        self._priority_published[priority] += 1
+
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            future.set_exception(RuntimeError(
+                f"Publish failed with code {info.rc}"))
+            return future
+
+        with self._lock:
+            if info.mid in self._early_acks:
+                # Written synchronously inside publish()
+                self._early_acks.discard(info.mid)
+                future.set_result(None)
+            else:
+                self._pending[info.mid] = (future, qos)
+
+        return future
+
+    def on_publish(self, mid: int):
+        """Called from paho's on_publish, possibly on the network thread."""
+        with self._lock:
+            pending = self._pending.pop(mid, None)
+            if pending is None:
+                self._early_acks.add(mid)
+                return
+
+        self._loop.call_soon_threadsafe(self._complete, pending[0])
+
+    async def flush(self):
+        """Wait until every message submitted so far has been acknowledged."""
+        if self._inflight:
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
+
+    def fail_all(self, error: Exception):
+        with self._lock:
+            pending = [future for future, _ in self._pending.values()]
+            self._pending.clear()
+            self._early_acks.clear()
+
+        self._fail(pending, error)
+
+    def fail_unsent(self, error: Exception):
+        """Fails the QoS 0 publishes paho had not yet written; call on the loop."""
+        with self._lock:
+            unsent = [mid for mid, (_, qos) in self._pending.items() if qos == 0]
+            futures = [self._pending.pop(mid)[0] for mid in unsent]
+            # mids wrap at 65535; a stale early ack would complete a later publish unsent
+            self._early_acks.clear()
+
+        self._fail(futures, error)
+
+    @staticmethod
+    def _fail(futures: List[asyncio.Future], error: Exception):
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _acquire(self, priority: MessagePriority):
+        if self._window_used < self._max_inflight and not self._waiters:
+            self._window_used += 1
+            return
+
+        self._window_waits += 1
+        waiter = self._loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+        try:
+            # The slot is handed over by _release
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        self._window_used -= 1
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                self._window_used += 1
+                waiter.set_result(None)
+                return
+
+    @staticmethod
+    def _complete(future: asyncio.Future):
+        if not future.done():
+            future.set_result(None)
+
+    def _on_done(self, future: asyncio.Future):
+        self._inflight.discard(future)
+        self._release()
+
+        if future.cancelled():
+            return
+        if future.exception():
+            self._failed += 1
+            self._logger.error(f"Publish failed: {str(future.exception())}")
+        else:
+            self._acked += 1
@@ -0,0 +1,184 @@
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Dict, Optional
+import asyncio
+import time
+
+
+class RateLimitPolicy(str, Enum):
+    DROP = "drop"
+    DELAY = "delay"
+    RAISE = "raise"
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, sender: str, reason: str):
+        super().__init__(f"Publish rate limit exceeded for '{sender}': {reason}")
+        self.sender = sender
+        self.reason = reason
+
+
+class TokenBucket:
+    """Refills at `rate` tokens per second up to `burst`."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Takes a token and returns 0, or the seconds until one is available
+        without taking it.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self):
+        """Returns a token taken for a message that was not sent after all."""
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def reserve(self) -> float:
+        """Takes a token now, going into debt; returns the seconds to wait for it."""
+        wait = self.take()
+        if wait:
+            self.tokens -= 1
+        return wait
+
+
+class SenderRateLimiter:
+    """
+    Token bucket per sender (agent or host), so one runaway agent is
+    throttled without touching the others, and optionally one more for the
+    whole connection that every sender draws from as well. Buckets for the
+    `max_senders` most recently seen senders are kept. `policy` decides what
+    happens to a message over a limit: DROP discards it, DELAY waits for a
+    token and RAISE raises RateLimitExceeded. A rate of None disables that
+    bucket, while `reject` still applies the policy to Broker's in-flight
+    task cap.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: Optional[float],
+        burst: int = 100,
+        policy: RateLimitPolicy = RateLimitPolicy.DELAY,
+        max_senders: int = 10000,
+        host_rate_per_second: Optional[float] = None,
+        host_burst: int = 1000
+    ):
+        if rate_per_second is not None and rate_per_second <= 0:
+            raise ValueError("rate_per_second must be positive")
+        if host_rate_per_second is not None and host_rate_per_second <= 0:
+            raise ValueError("host_rate_per_second must be positive")
+        if burst < 1 or host_burst < 1:
+            raise ValueError("burst must be at least 1")
+
+        self._rate = rate_per_second
+        self._burst = burst
+        self._policy = policy
+        self._max_senders = max_senders
+        self._buckets: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+        self._host_bucket = TokenBucket(host_rate_per_second, host_burst) if host_rate_per_second else None
+
+        self._allowed = 0
+        self._dropped = 0
+        self._delayed = 0
+        self._delayed_seconds = 0.0
+        self._rejected = 0
+        self._throttled = 0
+        self._host_throttled = 0
+        self._throttled_by_sender: Dict[str, int] = {}
+
+    @property
+    def policy(self) -> RateLimitPolicy:
+        return self._policy
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "rate_per_second": self._rate,
+            "burst": self._burst,
+            "policy": self._policy.value,
+            "host_rate_per_second": self._host_bucket.rate if self._host_bucket else None,
+            "host_burst": self._host_bucket.burst if self._host_bucket else None,
+            "senders": len(self._buckets),
+            "allowed": self._allowed,
+            "dropped": self._dropped,
+            "delayed": self._delayed,
+            "delayed_seconds": self._delayed_seconds,
+            "rejected": self._rejected,
+            "throttled": self._throttled,
+            "host_throttled": self._host_throttled,
+            "throttled_by_sender": dict(self._throttled_by_sender),
+        }
+
+    async def acquire(self, sender: str) -> bool:
+        """True when the message may be sent; False when it was dropped."""
+        buckets = []
+        if self._rate is not None:
+            buckets.append(self._bucket(sender))
+        if self._host_bucket is not None:
+            buckets.append(self._host_bucket)
+
+        if self._policy == RateLimitPolicy.DELAY:
+            # Reserving keeps concurrent publishers of one sender in order
+            waits = [bucket.reserve() for bucket in buckets]
+            wait = max(waits, default=0.0)
+            if wait:
+                self.record_throttled(sender)
+                if self._host_bucket is not None and waits[-1] == wait:
+                    self._host_throttled += 1
+                self._delayed += 1
+                self._delayed_seconds += wait
+                await asyncio.sleep(wait)
+            self._allowed += 1
+            return True
+
+        for position, bucket in enumerate(buckets):
+            if bucket.take():
+                # Nothing is sent, so the sender keeps its token
+                for taken in buckets[:position]:
+                    taken.refund()
+                if bucket is self._host_bucket:
+                    self._host_throttled += 1
+                    self.reject(sender, "host rate")
+                else:
+                    self.reject(sender, "rate")
+                return False
+
+        self._allowed += 1
+        return True
+
+    def reject(self, sender: str, reason: str):
+        """Applies the DROP or RAISE policy to a message that may not be sent."""
+        self.record_throttled(sender)
+        if self._policy == RateLimitPolicy.RAISE:
+            self._rejected += 1
+            raise RateLimitExceeded(sender, reason)
+        self._dropped += 1
+
+    def record_throttled(self, sender: str):
+        self._throttled += 1
+        self._throttled_by_sender[sender] = self._throttled_by_sender.get(sender, 0) + 1
+        if len(self._throttled_by_sender) > self._max_senders:
+            self._throttled_by_sender.pop(next(iter(self._throttled_by_sender)))
+
+    def _bucket(self, sender: str) -> TokenBucket:
+        bucket = self._buckets.get(sender)
+        if bucket is None:
+            bucket = self._buckets[sender] = TokenBucket(self._rate, self._burst)
+            if len(self._buckets) > self._max_senders:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(sender)
+        return bucket
@@ -0,0 +1,248 @@
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import threading
+
+import paho.mqtt.client as mqtt
+from paho.mqtt.subscribeoptions import SubscribeOptions
+
+
+class SubscriptionBatcher:
+    """
+    Coalesces SUBSCRIBE and UNSUBSCRIBE requests made within a short window
+    into multi-topic packets. Each requested filter gets a future that
+    completes with its SUBACK/UNSUBACK reason code.
+
+    paho does not resend (un)subscribes after a reconnect, so requests still
+    waiting for their ack when the connection drops are queued again by
+    `requeue_awaiting` and go out with the next flush.
+    """
+
+    def __init__(
+        self,
+        client: mqtt.Client,
+        logger: logging.Logger,
+        batch_window_seconds: float = 0.005,
+        max_batch_size: int = 100
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self._client = client
+        self._logger = logger
+        self._batch_window_seconds = batch_window_seconds
+        self._max_batch_size = max_batch_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # topic -> (qos, futures); insertion ordered
+        self._queued_subscribes: Dict[str, Tuple[int, List[asyncio.Future]]] = {}
+        self._queued_unsubscribes: Dict[str, List[asyncio.Future]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        # SUBACK/UNSUBACK arrive on the network thread. mid -> (is subscribe,
+        # [(topic, qos, futures)])
+        self._lock = threading.Lock()
+        self._awaiting: Dict[int, Tuple[bool, List[Tuple[str, int, List[asyncio.Future]]]]] = {}
+        self._requeued = 0
+
+        self._subscribe_packets = 0
+        self._unsubscribe_packets = 0
+        self._topics_subscribed = 0
+        self._topics_unsubscribed = 0
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "queued_subscribes": len(self._queued_subscribes),
+            "queued_unsubscribes": len(self._queued_unsubscribes),
+            "awaiting_ack": len(self._awaiting),
+            "subscribe_packets": self._subscribe_packets,
+            "unsubscribe_packets": self._unsubscribe_packets,
+            "topics_subscribed": self._topics_subscribed,
+            "topics_unsubscribed": self._topics_unsubscribed,
+            "requeued": self._requeued,
+        }
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def subscribe(self, topic: str, qos: int = 0) -> asyncio.Future:
+        future = self._create_future()
+
+        # A pending unsubscribe for the same filter is superseded
+        self._resolve_all(self._queued_unsubscribes.pop(topic, []), None)
+
+        queued_qos, futures = self._queued_subscribes.get(topic, (qos, []))
+        futures.append(future)
+        self._queued_subscribes[topic] = (max(qos, queued_qos), futures)
+
+        self._schedule_flush(len(self._queued_subscribes))
+        return future
+
+    def unsubscribe(self, topic: str) -> asyncio.Future:
+        future = self._create_future()
+
+        queued = self._queued_subscribes.pop(topic, None)
+        if queued:
+            self._fail_all_futures(queued[1], asyncio.CancelledError())
+
+        self._queued_unsubscribes.setdefault(topic, []).append(future)
+
+        self._schedule_flush(len(self._queued_unsubscribes))
+        return future
+
+    def flush(self):
+        """Send every queued request now."""
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        subscribes = list(self._queued_subscribes.items())
+        unsubscribes = list(self._queued_unsubscribes.items())
+        self._queued_subscribes.clear()
+        self._queued_unsubscribes.clear()
+
+        for start in range(0, len(subscribes), self._max_batch_size):
+            self._send_subscribe(subscribes[start:start + self._max_batch_size])
+
+        for start in range(0, len(unsubscribes), self._max_batch_size):
+            self._send_unsubscribe(unsubscribes[start:start + self._max_batch_size])
+
+    def on_subscribe(self, mid: int, reason_codes: List[Any]):
+        self._on_ack(mid, reason_codes)
+
+    def on_unsubscribe(self, mid: int, reason_codes: Optional[List[Any]]):
+        self._on_ack(mid, reason_codes)
+
+    def fail_all(self, error: Exception):
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        with self._lock:
+            awaiting = list(self._awaiting.values())
+            self._awaiting.clear()
+
+        for _, futures in self._queued_subscribes.values():
+            self._fail_all_futures(futures, error)
+        for futures in self._queued_unsubscribes.values():
+            self._fail_all_futures(futures, error)
+        for _, entries in awaiting:
+            for _, _, futures in entries:
+                self._fail_all_futures(futures, error)
+
+        self._queued_subscribes.clear()
+        self._queued_unsubscribes.clear()
+
+    def requeue_awaiting(self):
+        """Queue again every request sent but not acknowledged; call on the loop."""
+        with self._lock:
+            awaiting = list(self._awaiting.values())
+            self._awaiting.clear()
+
+        for is_subscribe, entries in awaiting:
+            for topic, qos, futures in entries:
+                self._requeued += 1
+                if is_subscribe:
+                    if topic in self._queued_unsubscribes:
+                        # Already superseded by a later unsubscribe
+                        self._resolve_all(futures, None)
+                        continue
+                    queued_qos, queued = self._queued_subscribes.get(topic, (qos, []))
+                    self._queued_subscribes[topic] = (max(qos, queued_qos), futures + queued)
+                else:
+                    if topic in self._queued_subscribes:
+                        self._resolve_all(futures, None)
+                        continue
+                    self._queued_unsubscribes[topic] = futures + self._queued_unsubscribes.get(topic, [])
+
+    def _create_future(self) -> asyncio.Future:
+        if not self._loop:
+            raise RuntimeError("Subscription batcher not started")
+        return self._loop.create_future()
+
+    def _schedule_flush(self, queued: int):
+        if queued >= self._max_batch_size:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(
+                self._batch_window_seconds, self.flush)
+
+    def _send_subscribe(self, batch: List[Tuple[str, Tuple[int, List[asyncio.Future]]]]):
+        request = [(topic, SubscribeOptions(qos=qos)) for topic, (qos, _) in batch]
+        entries = [(topic, qos, futures) for topic, (qos, futures) in batch]
+
+        # Hold the lock so the SUBACK cannot be handled before the mid is known
+        with self._lock:
+            result, mid = self._client.subscribe(request)
+            if result == mqtt.MQTT_ERR_SUCCESS:
+                self._awaiting[mid] = (True, entries)
+
+        if result != mqtt.MQTT_ERR_SUCCESS:
+            error = RuntimeError(f"Subscribe failed with code {result}")
+            self._logger.error(str(error))
+            for _, _, futures in entries:
+                self._fail_all_futures(futures, error)
+            return
+
+        self._subscribe_packets += 1
+        self._topics_subscribed += len(batch)
+        self._logger.info(f"Subscribing to {len(batch)} topics, message ID: {mid}")
+
+    def _send_unsubscribe(self, batch: List[Tuple[str, List[asyncio.Future]]]):
+        with self._lock:
+            result, mid = self._client.unsubscribe([topic for topic, _ in batch])
+            if result == mqtt.MQTT_ERR_SUCCESS:
+                self._awaiting[mid] = (False, [(topic, 0, futures) for topic, futures in batch])
+
+        if result != mqtt.MQTT_ERR_SUCCESS:
+            error = RuntimeError(f"Unsubscribe failed with code {result}")
+            self._logger.error(str(error))
+            for _, futures in batch:
+                self._fail_all_futures(futures, error)
+            return
+
+        self._unsubscribe_packets += 1
+        self._topics_unsubscribed += len(batch)
+        self._logger.info(f"Unsubscribing from {len(batch)} topics, message ID: {mid}")
+
+    def _on_ack(self, mid: int, reason_codes: Optional[List[Any]]):
+        with self._lock:
+            awaiting = self._awaiting.pop(mid, None)
+
+        if awaiting is not None:
+            self._loop.call_soon_threadsafe(self._resolve_ack, awaiting[1], reason_codes)
+
+    def _resolve_ack(self, entries: List[Tuple[str, int, List[asyncio.Future]]], reason_codes: Optional[List[Any]]):
+        if not isinstance(reason_codes, list):
+            reason_codes = [reason_codes] * len(entries)
+
+        for index, (topic, _, futures) in enumerate(entries):
+            reason_code = reason_codes[index] if index < len(reason_codes) else None
+            value = getattr(reason_code, "value", reason_code)
+
+            if value is not None and value >= 0x80:
+                error = RuntimeError(
+                    f"Broker rejected '{topic}' with reason code {reason_code}")
+                self._logger.error(str(error))
+                self._fail_all_futures(futures, error)
+            else:
+                self._resolve_all(futures, reason_code)
+
+    @staticmethod
+    def _resolve_all(futures: List[asyncio.Future], result: Any):
+        for future in futures:
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _fail_all_futures(futures: List[asyncio.Future], error: BaseException):
+        for future in futures:
+            if future.done():
+                continue
+            if isinstance(error, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(error)
+                # Awaiting the ack is optional; the failure is logged by the caller
+                future.exception()
@@ -0,0 +1,123 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import itertools
+import threading
+
+from core.messaging.topic_trie import TopicTrie, split_shared_filter
+
+
+class SubscriptionHandle:
+    """One callback registered on one topic filter."""
+
+    __slots__ = ("id", "topic", "callback", "acknowledged")
+
+    def __init__(self, id: int, topic: str, callback: Callable[[Any], Awaitable[None]]):
+        self.id = id
+        self.topic = topic
+        self.callback = callback
+        # Completes when the filter is acknowledged by the broker
+        self.acknowledged: Optional[asyncio.Future] = None
+
+    def __repr__(self) -> str:
+        return f"SubscriptionHandle(id={self.id}, topic={self.topic!r})"
+
+
+class SubscriptionRegistry:
+    """
+    Reference-counted callback registry. Several handles may share a filter;
+    the caller only needs to touch the wire when `add` reports the first
+    handle for a filter or `remove` reports the last one gone. Shared
+    subscriptions (`$share/<group>/<filter>`) are counted under their full
+    name but matched against the plain filter. Each filter keeps the
+    highest QoS any of its handles asked for.
+    """
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._trie: TopicTrie[SubscriptionHandle] = TopicTrie()
+        self._ref_counts: Dict[str, int] = {}
+        self._acks: Dict[str, asyncio.Future] = {}
+        self._qos: Dict[str, int] = {}
+
+        # Matching happens on the network thread
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._trie)
+
+    def add(self, topic: str, callback: Callable[[Any], Awaitable[None]]) -> Tuple[SubscriptionHandle, bool]:
+        handle = SubscriptionHandle(next(self._ids), topic, callback)
+
+        with self._lock:
+            self._trie.add(self._match_filter(topic), handle)
+            count = self._ref_counts.get(topic, 0) + 1
+            self._ref_counts[topic] = count
+
+        handle.acknowledged = self._acks.get(topic)
+        return handle, count == 1
+
+    def raise_qos(self, topic: str, qos: int) -> bool:
+        """Records `qos` for the filter; True when it is higher than before and must be sent."""
+        current = self._qos.get(topic)
+        if current is not None and current >= qos:
+            return False
+        self._qos[topic] = qos
+        return True
+
+    def qos(self, topic: str) -> int:
+        return self._qos.get(topic, 0)
+
+    def set_acknowledgement(self, topic: str, future: asyncio.Future):
+        self._acks[topic] = future
+        for handle in self._trie.get(self._match_filter(topic)):
+            if handle.topic == topic:
+                handle.acknowledged = future
+
+    def remove(self, handle: SubscriptionHandle) -> bool:
+        """Remove a single handle. Returns True when it was the last one on its filter."""
+        with self._lock:
+            if not self._trie.remove(self._match_filter(handle.topic), handle):
+                return False
+            return self._release(handle.topic, 1)
+
+    def remove_topic(self, topic: str) -> bool:
+        """Remove every handle on the filter. Returns True if any were registered."""
+        with self._lock:
+            removed = self._remove_all(topic)
+            if not removed:
+                return False
+            return self._release(topic, removed)
+
+    def match(self, topic: str) -> List[SubscriptionHandle]:
+        with self._lock:
+            return self._trie.match(topic)
+
+    def ref_count(self, topic: str) -> int:
+        return self._ref_counts.get(topic, 0)
+
+    def topics(self) -> List[str]:
+        with self._lock:
+            return list(self._ref_counts)
+
+    @staticmethod
+    def _match_filter(topic: str) -> str:
+        return split_shared_filter(topic)[1]
+
+    def _remove_all(self, topic: str) -> int:
+        # A plain and a shared filter may sit on the same trie node
+        handles = [handle for handle in self._trie.get(self._match_filter(topic))
+                   if handle.topic == topic]
+        for handle in handles:
+            self._trie.remove(self._match_filter(topic), handle)
+        return len(handles)
+
+    def _release(self, topic: str, count: int) -> bool:
+        remaining = self._ref_counts.get(topic, 0) - count
+        if remaining > 0:
+            self._ref_counts[topic] = remaining
+            return False
+
+        self._ref_counts.pop(topic, None)
+        self._acks.pop(topic, None)
+        self._qos.pop(topic, None)
+        return True
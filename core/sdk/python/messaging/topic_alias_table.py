@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+import threading
+
+
+class TopicAliasTable:
+    """
+    Outbound MQTT v5 topic aliases for one connection. Holds at most
+    `maximum` topics, the smaller of our limit and the Topic Alias Maximum
+    from the CONNACK. When full, the least recently published topic gives up
+    its alias to the new one. A fresh table is needed for every connection,
+    since the server forgets aliases on disconnect.
+
+    Thread-safe: `reset` runs on the network thread at CONNACK while
+    `resolve` runs on the loop.
+    """
+
+    def __init__(self, maximum: int = 0):
+        self._lock = threading.Lock()
+        self._maximum = 0
+        self._aliases: 'OrderedDict[str, int]' = OrderedDict()
+
+        self._hits = 0
+        self._assigned = 0
+        self._evicted = 0
+
+        self.reset(maximum)
+
+    @property
+    def maximum(self) -> int:
+        return self._maximum
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "maximum": self._maximum,
+            "aliases": len(self._aliases),
+            "hits": self._hits,
+            "assigned": self._assigned,
+            "evicted": self._evicted,
+        }
+
+    def reset(self, maximum: int):
+        if maximum < 0:
+            raise ValueError("maximum cannot be negative")
+        with self._lock:
+            self._maximum = min(maximum, 0xFFFF)
+            self._aliases.clear()
+
+    def resolve(self, topic: str) -> Tuple[int, bool]:
+        """
+        Returns (alias, is_new). A new alias must be sent with the full topic
+        to establish it; a known one is sent with an empty topic. Alias 0
+        means aliasing is disabled.
+        """
+        with self._lock:
+            if not self._maximum:
+                return 0, False
+
+            alias = self._aliases.get(topic)
+            if alias is not None:
+                self._aliases.move_to_end(topic)
+                self._hits += 1
+                return alias, False
+
+            if len(self._aliases) < self._maximum:
+                alias = len(self._aliases) + 1
+            else:
+                _, alias = self._aliases.popitem(last=False)
+                self._evicted += 1
+
+            self._aliases[topic] = alias
+            self._assigned += 1
+            return alias, True
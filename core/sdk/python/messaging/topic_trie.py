@@ -0,0 +1,175 @@
+from typing import Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+from core.topic_generator import TopicGenerator
+
+
+T = TypeVar('T')
+
+SINGLE_LEVEL_WILDCARD = "+"
+MULTI_LEVEL_WILDCARD = "#"
+
+
+def split_shared_filter(topic_filter: str) -> Tuple[Optional[str], str]:
+    """
+    Split `$share/<group>/<filter>` into (group, filter). Messages arrive on
+    the plain topic, so the filter part is what gets matched. Returns
+    (None, topic_filter) for ordinary filters.
+    """
+    if not topic_filter.startswith(TopicGenerator.SHARE_PREFIX):
+        return None, topic_filter
+
+    group, _, inner = topic_filter[len(TopicGenerator.SHARE_PREFIX):].partition('/')
+    if not group or not inner or SINGLE_LEVEL_WILDCARD in group or MULTI_LEVEL_WILDCARD in group:
+        raise ValueError(f"Invalid shared subscription '{topic_filter}'")
+    return group, inner
+
+
+class _TopicNode(Generic[T]):
+    __slots__ = ("children", "values")
+
+    def __init__(self):
+        self.children: Dict[str, '_TopicNode[T]'] = {}
+        self.values: List[T] = []
+
+
+class TopicTrie(Generic[T]):
+    """
+    Maps MQTT topic filters to values and resolves a concrete topic to the
+    values of every matching filter. Lookup walks one level per topic segment,
+    following at most the literal, `+` and `#` branches, so its cost depends
+    on topic depth rather than on the number of subscriptions.
+    """
+
+    def __init__(self):
+        self._root: _TopicNode[T] = _TopicNode()
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, topic_filter: str) -> bool:
+        node = self._find(topic_filter)
+        return node is not None and len(node.values) > 0
+
+    @staticmethod
+    def validate_filter(topic_filter: str):
+        if not topic_filter:
+            raise ValueError("Topic filter cannot be empty")
+
+        levels = topic_filter.split('/')
+        for index, level in enumerate(levels):
+            if MULTI_LEVEL_WILDCARD in level and (level != MULTI_LEVEL_WILDCARD or index != len(levels) - 1):
+                raise ValueError(f"Invalid topic filter '{topic_filter}': '#' must be the last level")
+            if SINGLE_LEVEL_WILDCARD in level and level != SINGLE_LEVEL_WILDCARD:
+                raise ValueError(f"Invalid topic filter '{topic_filter}': '+' must occupy a whole level")
+
+    def add(self, topic_filter: str, value: T):
+        self.validate_filter(topic_filter)
+
+        node = self._root
+        for level in topic_filter.split('/'):
+            child = node.children.get(level)
+            if child is None:
+                child = _TopicNode()
+                node.children[level] = child
+            node = child
+
+        node.values.append(value)
+        self._count += 1
+
+    def remove(self, topic_filter: str, value: Optional[T] = None) -> int:
+        """Remove `value` from the filter, or every value when omitted. Returns the number removed."""
+        path = [self._root]
+        levels = topic_filter.split('/')
+        for level in levels:
+            child = path[-1].children.get(level)
+            if child is None:
+                return 0
+            path.append(child)
+
+        node = path[-1]
+        if value is None:
+            removed = len(node.values)
+            node.values.clear()
+        else:
+            try:
+                node.values.remove(value)
+                removed = 1
+            except ValueError:
+                removed = 0
+
+        self._count -= removed
+
+        # Prune empty branches
+        for depth in range(len(levels), 0, -1):
+            node = path[depth]
+            if node.values or node.children:
+                break
+            del path[depth - 1].children[levels[depth - 1]]
+
+        return removed
+
+    def get(self, topic_filter: str) -> List[T]:
+        node = self._find(topic_filter)
+        return list(node.values) if node else []
+
+    def match(self, topic: str) -> List[T]:
+        results: List[T] = []
+        levels = topic.split('/')
+
+        # Wildcards in the first level never match topics starting with '$'
+        nodes = [self._root]
+        skip_wildcards = topic.startswith('$')
+
+        for level in levels:
+            next_nodes = []
+            for node in nodes:
+                children = node.children
+                if not children:
+                    continue
+
+                if not skip_wildcards:
+                    multi = children.get(MULTI_LEVEL_WILDCARD)
+                    if multi is not None:
+                        results.extend(multi.values)
+
+                    single = children.get(SINGLE_LEVEL_WILDCARD)
+                    if single is not None:
+                        next_nodes.append(single)
+
+                literal = children.get(level)
+                if literal is not None:
+                    next_nodes.append(literal)
+
+            if not next_nodes:
+                return results
+
+            nodes = next_nodes
+            skip_wildcards = False
+
+        for node in nodes:
+            results.extend(node.values)
+
+            # 'a/#' also matches the parent level 'a'
+            multi = node.children.get(MULTI_LEVEL_WILDCARD)
+            if multi is not None:
+                results.extend(multi.values)
+
+        return results
+
+    def filters(self) -> Iterator[str]:
+        stack = [(self._root, [])]
+        while stack:
+            node, levels = stack.pop()
+            if node.values:
+                yield '/'.join(levels)
+            for level, child in node.children.items():
+                stack.append((child, levels + [level]))
+
+    def _find(self, topic_filter: str) -> Optional[_TopicNode[T]]:
+        node = self._root
+        for level in topic_filter.split('/'):
+            node = node.children.get(level)
+            if node is None:
+                return None
+        return node
@@ -0,0 +1,116 @@
+from typing import Any, Dict, Optional
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+except ImportError:
+    otel_trace = None
+
+
+class Span:
+    """A unit of work. The base class records nothing."""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_exception(self, exception: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+    @property
+    def traceparent(self) -> Optional[str]:
+        """W3C trace context naming this span, to send with a message it covers."""
+        return None
+
+    def __enter__(self) -> 'Span':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_exception(exc)
+        self.end()
+
+
+_NOOP_SPAN = Span()
+
+
+class Tracer:
+    """
+    Span factory used by Broker and message handlers. This base tracer does
+    nothing and costs one call per span; `default_tracer()` picks
+    OpenTelemetryTracer when opentelemetry-api is installed. `traceparent`
+    is the W3C trace context carried between processes in a message user
+    property.
+    """
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None,
+                   traceparent: Optional[str] = None) -> Span:
+        return _NOOP_SPAN
+
+    def current_traceparent(self) -> Optional[str]:
+        return None
+
+
+class _OpenTelemetrySpan(Span):
+    __slots__ = ("_span", "_token")
+
+    def __init__(self, span: Any):
+        self._span = span
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        self._span.set_attribute(key, value)
+
+    def record_exception(self, exception: BaseException):
+        self._span.record_exception(exception)
+
+    def end(self):
+        self._span.end()
+
+    @property
+    def traceparent(self) -> Optional[str]:
+        carrier: Dict[str, str] = {}
+        TraceContextTextMapPropagator().inject(carrier, context=otel_trace.set_span_in_context(self._span))
+        return carrier.get("traceparent")
+
+    def __enter__(self) -> 'Span':
+        # Spans started inside the block become children of this one
+        self._token = otel_context.attach(otel_trace.set_span_in_context(self._span))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._token is not None:
+            otel_context.detach(self._token)
+            self._token = None
+        super().__exit__(exc_type, exc, tb)
+
+
+class OpenTelemetryTracer(Tracer):
+    """Tracer backed by the globally configured OpenTelemetry provider."""
+
+    def __init__(self, instrumentation_name: str = "agience.broker"):
+        if otel_trace is None:
+            raise RuntimeError("OpenTelemetryTracer requires the 'opentelemetry-api' package")
+        self._tracer = otel_trace.get_tracer(instrumentation_name)
+        self._propagator = TraceContextTextMapPropagator()
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None,
+                   traceparent: Optional[str] = None) -> Span:
+        parent = None
+        if traceparent:
+            parent = self._propagator.extract({"traceparent": traceparent})
+        return _OpenTelemetrySpan(
+            self._tracer.start_span(name, context=parent, attributes=attributes))
+
+    def current_traceparent(self) -> Optional[str]:
+        carrier: Dict[str, str] = {}
+        self._propagator.inject(carrier)
+        return carrier.get("traceparent")
+
+
+def default_tracer() -> Tracer:
+    """OpenTelemetryTracer when opentelemetry-api is installed, else the no-op Tracer."""
+    return OpenTelemetryTracer() if otel_trace is not None else Tracer()
@@ -0,0 +1,147 @@
+from typing import Any, ClassVar, Dict, FrozenSet, List, Optional, Type, TypeVar
+from pydantic import BaseModel, ConfigDict
+
+from core.data import Data
+from core.models.entities.agent import Agent
+from core.models.entities.host import Host
+from core.models.entities.plugin import Plugin
+from core.utils.json_backend import json_backend
+
+# Data field naming the wire layout of an event's nested values
+SCHEMA_VERSION_KEY = "schema"
+# 1: objects and lists nested as JSON text, as the .NET SDK sends them
+# 2: nested natively, so the whole event is one JSON document
+LEGACY_SCHEMA_VERSION = 1
+NATIVE_SCHEMA_VERSION = 2
+
+EventT = TypeVar("EventT", bound="BrokerEvent")
+
+
+class BrokerEvent(BaseModel):
+    """
+    Typed body of an EVENT message, keyed by the `type` field. Subclasses
+    name their type in `event_type` and list the fields that hold entities
+    or collections in `nested_fields`.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, extra="ignore")
+
+    event_type: ClassVar[str] = ""
+    nested_fields: ClassVar[FrozenSet[str]] = frozenset()
+
+    timestamp: Optional[str] = None
+
+    @classmethod
+    def from_data(cls: Type[EventT], data: Data) -> EventT:
+        return cls.model_validate({key: data.parsed(key) for key in data})
+
+    def to_data(self, schema_version: int = LEGACY_SCHEMA_VERSION) -> Data:
+        elements: Dict[str, Any] = {"type": self.event_type}
+        for key, value in self.model_dump(mode="json", exclude_none=True).items():
+            if key in self.nested_fields and schema_version < NATIVE_SCHEMA_VERSION:
+                value = json_backend().dumps(value).decode()
+            elif not isinstance(value, (str, dict, list)):
+                # Scalars travel as text, as in the hand-built events
+                value = str(value)
+            elements[key] = value
+
+        if schema_version >= NATIVE_SCHEMA_VERSION:
+            elements[SCHEMA_VERSION_KEY] = str(schema_version)
+
+        data = Data()
+        for key, value in elements.items():
+            data.add(key, value)
+        return data
+
+
+_EVENT_TYPES: Dict[str, Type[BrokerEvent]] = {}
+
+
+def register_event(event_class: Type[EventT]) -> Type[EventT]:
+    """Class decorator adding an event type to the dispatch table."""
+    if not event_class.event_type:
+        raise ValueError(f"{event_class.__name__} has no event_type")
+    _EVENT_TYPES[event_class.event_type] = event_class
+    return event_class
+
+
+def event_class_for(event_type: Optional[str]) -> Optional[Type[BrokerEvent]]:
+    return _EVENT_TYPES.get(event_type) if event_type else None
+
+
+def schema_version_of(data: Optional[Data]) -> int:
+    """The layout a received event was sent in; events without the field are legacy."""
+    try:
+        return int(data.get(SCHEMA_VERSION_KEY) or LEGACY_SCHEMA_VERSION) if data else LEGACY_SCHEMA_VERSION
+    except ValueError:
+        return LEGACY_SCHEMA_VERSION
+
+
+def decode_event(data: Optional[Data]) -> Optional[BrokerEvent]:
+    """
+    The typed event for a message body, or None for unregistered types.
+    Raises pydantic.ValidationError when a registered event is malformed.
+    """
+    if not data:
+        return None
+    event_class = event_class_for(data.get("type"))
+    if event_class is None:
+        return None
+    return event_class.from_data(data)
+
+
+@register_event
+class HostConnectEvent(BrokerEvent):
+    event_type: ClassVar[str] = "host_connect"
+    nested_fields: ClassVar[FrozenSet[str]] = frozenset({"host"})
+
+    host: Host
+
+
+@register_event
+class HostWelcomeEvent(BrokerEvent):
+    """Sent in parts; only the first carries the host and its plugins."""
+
+    event_type: ClassVar[str] = "host_welcome"
+    nested_fields: ClassVar[FrozenSet[str]] = frozenset({"host", "plugins", "agents"})
+
+    host_id: Optional[str] = None
+    part: int = 0
+    parts: int = 1
+    host: Optional[Host] = None
+    plugins: List[Plugin] = []
+    agents: List[Agent] = []
+
+
+@register_event
+class AgentConnectEvent(BrokerEvent):
+    event_type: ClassVar[str] = "agent_connect"
+    nested_fields: ClassVar[FrozenSet[str]] = frozenset({"agent"})
+
+    agent: Agent
+
+
+@register_event
+class AgentDisconnectEvent(BrokerEvent):
+    event_type: ClassVar[str] = "agent_disconnect"
+
+    agent_id: str
+
+
+@register_event
+class CredentialRequestEvent(BrokerEvent):
+    event_type: ClassVar[str] = "credential_request"
+    nested_fields: ClassVar[FrozenSet[str]] = frozenset({"jwk"})
+
+    agent_id: str
+    credential_name: str
+    jwk: Dict[str, Any]
+
+
+@register_event
+class CredentialResponseEvent(BrokerEvent):
+    event_type: ClassVar[str] = "credential_response"
+
+    credential_name: str
+    encrypted_credential: str
+
@@ -19,6 +19,12 @@ class BrokerMessage(BaseModel):
     data: Optional[Data] = None
     information: Optional[Information] = None
 
+    # Tracing; stamped by Broker.publish_async and read back on receipt
+    message_id: Optional[str] = None
+    correlation_id: Optional[str] = None
+    sent_at: Optional[float] = None
+    traceparent: Optional[str] = None
+
     def model_post_init(self, __context: Any) -> None:
         if self.type == BrokerMessageType.EVENT:
             self.information = None
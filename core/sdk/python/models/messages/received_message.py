@@ -0,0 +1,110 @@
+from typing import Any, Callable, Optional
+
+from core.data import Data
+from core.information import Information
+from core.models.messages.broker_message import BrokerMessage, BrokerMessageType
+
+_UNSET = object()
+
+
+class ReceivedBrokerMessage:
+    """
+    Read-only view of an inbound message with the BrokerMessage attributes
+    handlers use. The payload is kept as received; it is decompressed and
+    decoded the first time `data` or `information` is read, and only once
+    however many handlers share the message. `sender_id` and `destination`
+    come from a single split of the topic. A message that is routed but never
+    read costs one small object.
+    """
+
+    __slots__ = (
+        "type", "topic", "message_id", "correlation_id", "sent_at", "traceparent",
+        "_payload", "_decode", "_data", "_information", "_topic_parts"
+    )
+
+    def __init__(
+        self,
+        type: BrokerMessageType,
+        topic: str,
+        payload: bytes,
+        decode: Callable[[BrokerMessageType, bytes], Any],
+        message_id: Optional[str] = None,
+        correlation_id: Optional[str] = None,
+        sent_at: Optional[float] = None,
+        traceparent: Optional[str] = None
+    ):
+        self.type = type
+        self.topic = topic
+        self.message_id = message_id
+        self.correlation_id = correlation_id
+        self.sent_at = sent_at
+        self.traceparent = traceparent
+
+        self._payload = payload
+        self._decode = decode
+        self._data: Any = _UNSET
+        self._information: Any = _UNSET
+        self._topic_parts = None
+
+    @property
+    def data(self) -> Optional[Data]:
+        if self._data is _UNSET:
+            self._data = self._decoded(BrokerMessageType.EVENT)
+        return self._data
+
+    @data.setter
+    def data(self, value: Optional[Data]):
+        self._data = value
+
+    @property
+    def information(self) -> Optional[Information]:
+        if self._information is _UNSET:
+            self._information = self._decoded(BrokerMessageType.INFORMATION)
+        return self._information
+
+    @information.setter
+    def information(self, value: Optional[Information]):
+        self._information = value
+
+    @property
+    def is_decoded(self) -> bool:
+        return self._data is not _UNSET or self._information is not _UNSET
+
+    @property
+    def sender_id(self) -> Optional[str]:
+        parts = self._parts()
+        return parts[1] if len(parts) > 1 else None
+
+    @property
+    def destination(self) -> Optional[str]:
+        parts = self._parts()
+        return "/".join(parts[2:]) if len(parts) > 2 else None
+
+    def to_broker_message(self) -> BrokerMessage:
+        """A full, mutable BrokerMessage, e.g. to re-publish or serialize."""
+        return BrokerMessage(
+            type=self.type,
+            topic=self.topic,
+            data=self.data,
+            information=self.information,
+            message_id=self.message_id,
+            correlation_id=self.correlation_id,
+            sent_at=self.sent_at,
+            traceparent=self.traceparent
+        )
+
+    def _decoded(self, kind: BrokerMessageType) -> Any:
+        if self.type != kind or not self._payload:
+            return None
+        value = self._decode(kind, self._payload)
+        # Nothing else needs the bytes once decoded
+        self._payload = b""
+        return value
+
+    def _parts(self):
+        if self._topic_parts is None:
+            self._topic_parts = self.topic.split('/') if self.topic else []
+        return self._topic_parts
+
+    def __repr__(self) -> str:
+        return f"ReceivedBrokerMessage(type={self.type.value}, topic={self.topic!r})"
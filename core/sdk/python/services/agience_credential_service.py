@@ -1,7 +1,8 @@
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 import uuid
 import asyncio
 import base64
+import time
 
 
 from cryptography.hazmat.primitives.serialization import load_pem_private_key
@@ -11,8 +12,9 @@ from jwcrypto.jwk import JWK
 
 from core.authority import Authority
 from core.broker import Broker
-from core.data import Data
 from core.topic_generator import TopicGenerator
+from core.messaging.tracing import Span
+from core.models.messages.broker_events import CredentialRequestEvent
 from core.models.messages.broker_message import BrokerMessage, BrokerMessageType
 
 
@@ -22,6 +24,8 @@ class AgienceCredentialService:
         self._authority = authority
         self._broker = broker
         self._credentials: Dict[str, str] = {}
+        # credential_name -> (correlation id, span, perf_counter at send)
+        self._pending: Dict[str, Tuple[str, Span, float]] = {}
         self._topic_generator = TopicGenerator(
             self._authority.id, self._agent_id)
 
@@ -47,25 +51,43 @@ class AgienceCredentialService:
             await asyncio.sleep(0.1)
         return self._credentials[name]
 
-    def add_encrypted_credential(self, name: str, encrypted_credential: str) -> None:
+    def add_encrypted_credential(self, name: str, encrypted_credential: str,
+                                 correlation_id: Optional[str] = None) -> None:
         if not name or not encrypted_credential:
             raise ValueError("Invalid credential or name.")
 
+        pending = self._pending.get(name)
+        if pending and (correlation_id is None or correlation_id == pending[0]):
+            del self._pending[name]
+            _, span, started = pending
+            span.set_attribute("agience.round_trip_seconds", time.perf_counter() - started)
+            span.end()
+
         decrypted_credential = self._decrypt_with_jwk(encrypted_credential)
         self._credentials[name] = decrypted_credential
 
     async def _send_credential_message(self, credential_name: str) -> None:
-        data = Data()
-
-        data.add("type", "credential_request")
-        data.add("agent_id", self._agent_id)
-        data.add("credential_name", credential_name)
-        data.add("jwk", self._encryption_jwk)
+        data = CredentialRequestEvent(
+            agent_id=self._agent_id,
+            credential_name=credential_name,
+            jwk=self._encryption_key.export_public(as_dict=True)
+        ).to_data(self._broker.options.event_schema_version)
+
+        correlation_id = uuid.uuid4().hex
+        span = self._broker.tracer.start_span("credential.request", attributes={
+            "agience.agent_id": self._agent_id,
+            "agience.credential_name": credential_name,
+            "agience.correlation_id": correlation_id,
+        })
+        self._pending[credential_name] = (correlation_id, span, time.perf_counter())
 
         message = BrokerMessage(
             type=BrokerMessageType.EVENT,
             topic=self._topic_generator.publish_to_authority(),
             data=data,
+            correlation_id=correlation_id,
+            # This request's span, not whichever happens to be current
+            traceparent=span.traceparent,
         )
 
         await self._broker.publish(message)
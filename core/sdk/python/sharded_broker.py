@@ -0,0 +1,243 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import asyncio
+from asyncio import Task
+import logging
+import time
+
+from core.broker import Broker
+from core.broker_options import BrokerOptions
+from core.messaging.broker_instrumentation import render_prometheus
+from core.messaging.hash_ring import HashRing
+from core.messaging.payload_codec import PayloadCodecRegistry
+from core.messaging.subscription_registry import SubscriptionHandle
+from core.messaging.tracing import Tracer
+from core.models.messages.broker_message import BrokerMessage
+from core.topic_generator import TopicGenerator
+from core.utils.ntp_clock import NtpClock
+
+
+class ShardedBroker:
+    """
+    Spreads one process's traffic over `shard_count` MQTT connections, each
+    a full Broker with its own socket, network thread and dispatch workers.
+    Topics are assigned to shards by consistent hashing on the agent they
+    belong to, so every subscription and publish for an agent uses the same
+    connection and a filter is never subscribed twice.
+
+    Exposes the Broker surface used by Host, Agent, Authority and the
+    credential service, so it can be passed wherever a Broker is expected.
+    Publish and receive rates per shard are sampled every
+    `rate_interval_seconds` while connected.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        shard_count: int = 4,
+        custom_ntp_host: Optional[str] = None,
+        options: Optional[BrokerOptions] = None,
+        shard_factory: Optional[Callable[[Optional[NtpClock]], Broker]] = None,
+        tracer: Optional[Tracer] = None,
+        rate_interval_seconds: float = 10.0
+    ):
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+
+        self._logger = logger
+        # One codec registry for every connection, so a codec registered through `codecs` applies to all
+        codecs = PayloadCodecRegistry()
+        factory = shard_factory or (lambda clock: Broker(
+            logger, custom_ntp_host=custom_ntp_host, options=options, clock=clock, tracer=tracer, codecs=codecs))
+
+        # One NTP clock for every connection, started and stopped by the first shard
+        first = factory(None)
+        self._shards: List[Broker] = [first] + [factory(first.clock) for _ in range(shard_count - 1)]
+        self._ring: HashRing[Broker] = HashRing(self._shards)
+
+        self._rate_interval_seconds = rate_interval_seconds
+        # (publish, receive) per second for each shard over the last sampling interval
+        self._rates: List[Tuple[Optional[float], Optional[float]]] = [(None, None)] * len(self._shards)
+        self._rate_task: Optional[Task] = None
+
+    @property
+    def shards(self) -> List[Broker]:
+        return self._shards
+
+    @property
+    def is_connected(self) -> bool:
+        return all(shard.is_connected for shard in self._shards)
+
+    @property
+    def client_id(self) -> str:
+        """The first shard's client id; see `client_ids` for every connection."""
+        return self._shards[0].client_id
+
+    @property
+    def client_ids(self) -> List[str]:
+        return [shard.client_id for shard in self._shards]
+
+    @property
+    def clock(self) -> NtpClock:
+        return self._shards[0].clock
+
+    @property
+    def options(self) -> BrokerOptions:
+        return self._shards[0].options
+
+    @property
+    def tracer(self) -> Tracer:
+        return self._shards[0].tracer
+
+    @property
+    def timestamp(self) -> str:
+        return self._shards[0].timestamp
+
+    @property
+    def codecs(self) -> PayloadCodecRegistry:
+        return self._shards[0].codecs
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        shards = []
+        for shard, (publish_rate, receive_rate) in zip(self._shards, self._rates):
+            metrics = shard.metrics
+            shards.append({
+                "connected": shard.is_connected,
+                "dispatch_pending": metrics["dispatch"]["pending"],
+                "publish_inflight": metrics["publish"]["inflight"],
+                "offline_queued": metrics["offline_queue"]["pending"],
+                "published": metrics["publish"]["published"],
+                "received": metrics["dispatch"]["processed"],
+                # Per second over the last sampling interval
+                "publish_rate": publish_rate,
+                "receive_rate": receive_rate,
+                "broker": metrics,
+            })
+
+        return {"shard_count": len(self._shards), "shards": shards}
+
+    def prometheus_metrics(self) -> str:
+        """Every shard's Prometheus metrics, labelled with the shard index."""
+        return render_prometheus(*(
+            shard.prometheus_families(labels=f'shard="{index}"') for index, shard in enumerate(self._shards)
+        ))
+
+    def shard_for(self, topic: str) -> Broker:
+        return self._ring.node_for(self._shard_key(topic))
+
+    async def connect(self, token: str, broker_uri: str):
+        # Start the shared clock once before the connections race for it
+        await self._shards[0].connect(token, broker_uri)
+        await asyncio.gather(*(shard.connect(token, broker_uri) for shard in self._shards[1:]))
+
+        if self._rate_task is None and self._rate_interval_seconds > 0:
+            self._rate_task = asyncio.create_task(self._sample_rates())
+
+    async def disconnect(self):
+        if self._rate_task:
+            self._rate_task.cancel()
+            try:
+                await self._rate_task
+            except asyncio.CancelledError:
+                pass
+            self._rate_task = None
+
+        await asyncio.gather(*(shard.disconnect() for shard in self._shards))
+
+    async def subscribe(self, topic: str, callback: Callable[[BrokerMessage], Task],
+                        qos: Optional[int] = None) -> SubscriptionHandle:
+        return (await self.subscribe_many([topic], callback, qos))[0]
+
+    async def subscribe_many(self, topics: List[str], callback: Callable[[BrokerMessage], Task],
+                             qos: Optional[int] = None) -> List[SubscriptionHandle]:
+        groups = self._group(topics)
+        results = await asyncio.gather(*(
+            shard.subscribe_many([topic for _, topic in items], callback, qos)
+            for shard, items in groups.items()
+        ))
+
+        handles: List[Optional[SubscriptionHandle]] = [None] * len(topics)
+        for items, shard_handles in zip(groups.values(), results):
+            for (position, _), handle in zip(items, shard_handles):
+                handles[position] = handle
+        return handles
+
+    async def unsubscribe(self, subscription: Union[str, SubscriptionHandle]) -> asyncio.Future:
+        return (await self.unsubscribe_many([subscription]))[0]
+
+    async def unsubscribe_many(self, subscriptions: List[Union[str, SubscriptionHandle]]) -> List[asyncio.Future]:
+        # A handle's filter hashes to the shard that issued it
+        groups: Dict[Broker, List[Tuple[int, Union[str, SubscriptionHandle]]]] = {}
+        for position, subscription in enumerate(subscriptions):
+            topic = subscription.topic if isinstance(subscription, SubscriptionHandle) else subscription
+            groups.setdefault(self.shard_for(topic), []).append((position, subscription))
+
+        futures: List[Optional[asyncio.Future]] = [None] * len(subscriptions)
+        for shard, items in groups.items():
+            shard_futures = await shard.unsubscribe_many([subscription for _, subscription in items])
+            for (position, _), future in zip(items, shard_futures):
+                futures[position] = future
+        return futures
+
+    async def publish(self, message: BrokerMessage):
+        if not message.topic:
+            raise ValueError("Topic cannot be None")
+        # The shard applies its per-sender task cap and its rate limits
+        await self.shard_for(message.topic).publish(message)
+
+    async def publish_async(self, message: BrokerMessage) -> Optional[asyncio.Future]:
+        if not message.topic:
+            raise ValueError("Topic cannot be None")
+        return await self.shard_for(message.topic).publish_async(message)
+
+    async def flush(self):
+        await asyncio.gather(*(shard.flush() for shard in self._shards))
+
+    async def _sample_rates(self):
+        previous = self._counters()
+        sampled = time.monotonic()
+        while True:
+            await asyncio.sleep(self._rate_interval_seconds)
+            counters = self._counters()
+            now = time.monotonic()
+            elapsed = now - sampled
+            self._rates = [
+                ((published - last_published) / elapsed, (received - last_received) / elapsed)
+                for (published, received), (last_published, last_received) in zip(counters, previous)
+            ]
+            previous, sampled = counters, now
+
+    def _counters(self) -> List[Tuple[int, int]]:
+        counters = []
+        for shard in self._shards:
+            metrics = shard.metrics
+            counters.append((metrics["publish"]["published"], metrics["dispatch"]["processed"]))
+        return counters
+
+    def _group(self, topics: List[str]) -> Dict[Broker, List[Tuple[int, str]]]:
+        groups: Dict[Broker, List[Tuple[int, str]]] = {}
+        for position, topic in enumerate(topics):
+            groups.setdefault(self.shard_for(topic), []).append((position, topic))
+        return groups
+
+    @staticmethod
+    def _shard_key(topic: str) -> str:
+        """
+        The agent (or host) a topic belongs to. Publish topics are keyed by
+        sender, subscription filters by the recipient they listen as, so an
+        agent's outbound and inbound traffic share a connection.
+        """
+        if topic.startswith(TopicGenerator.CONNECT_PREFIX):
+            topic = topic[len(TopicGenerator.CONNECT_PREFIX):]
+
+        parts = topic.split('/')
+        if len(parts) == 5 and parts[0] + '/' == TopicGenerator.EVENT_PREFIX:
+            sender, host_id, agent_id = parts[1], parts[3], parts[4]
+            if sender not in ('+', '#', '-'):
+                return sender
+            if agent_id not in ('+', '#', '-'):
+                return agent_id
+            if host_id not in ('+', '#', '-'):
+                return host_id
+
+        return topic
@@ -0,0 +1,18 @@
+import importlib.util
+import os
+import sys
+
+# The SDK is imported as `core`; register this directory under that name
+# when it is not already importable that way
+SDK_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "core" not in sys.modules:
+    try:
+        import core.data  # noqa: F401
+    except ImportError:
+        sys.modules.pop("core", None)
+        spec = importlib.util.spec_from_file_location(
+            "core", os.path.join(SDK_DIRECTORY, "__init__.py"), submodule_search_locations=[SDK_DIRECTORY])
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["core"] = module
+        spec.loader.exec_module(module)
@@ -0,0 +1,42 @@
+import json
+
+from core.data import Data
+
+
+def test_received_payload_is_forwarded_unchanged():
+    payload = b'{"type": "chat", "agent": {"id": "a"}, "tags": [1, 2]}'
+    data = Data.from_bytes(payload)
+
+    assert data["type"] == "chat"
+    assert json.loads(data["agent"]) == {"id": "a"}
+    assert data.to_bytes() is payload
+
+
+def test_object_text_is_sent_as_an_object():
+    data = Data()
+    data.add("type", "host_connect")
+    data.add("host", json.dumps({"id": "host-1"}))
+    data.add("note", "{not json}")
+
+    assert json.loads(data.to_bytes()) == {"type": "host_connect", "host": {"id": "host-1"}, "note": "{not json}"}
+
+
+def test_parsed_is_cached_until_the_field_changes():
+    data = Data()
+    data.add("host", json.dumps({"id": "host-1"}))
+
+    first = data.parsed("host")
+    assert data.parsed("host") is first
+    # Encoding reuses the parse
+    data.to_bytes()
+    assert data.parsed("host") is first
+
+    data["host"] = json.dumps({"id": "host-2"})
+    assert data.parsed("host") == {"id": "host-2"}
+
+
+def test_change_invalidates_the_serialized_form():
+    data = Data.from_bytes(b'{"type": "chat"}')
+    data["forwarded"] = "true"
+
+    assert json.loads(data.raw) == {"type": "chat", "forwarded": "true"}
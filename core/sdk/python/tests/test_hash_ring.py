@@ -0,0 +1,40 @@
+from collections import Counter
+
+import pytest
+
+from core.messaging.hash_ring import HashRing
+
+KEYS = [f"agent-{number}" for number in range(2000)]
+
+
+def test_rejects_empty_rings():
+    with pytest.raises(ValueError):
+        HashRing([])
+    with pytest.raises(ValueError):
+        HashRing(["a"], replicas=0)
+
+
+def test_assignment_is_stable():
+    first = HashRing(["a", "b", "c"])
+    second = HashRing(["a", "b", "c"])
+
+    assert [first.node_for(key) for key in KEYS] == [second.node_for(key) for key in KEYS]
+
+
+def test_keys_spread_over_every_node():
+    ring = HashRing(["a", "b", "c", "d"])
+    counts = Counter(ring.node_for(key) for key in KEYS)
+
+    assert set(counts) == {"a", "b", "c", "d"}
+    # 64 points per node keeps each share well within a factor of two
+    assert min(counts.values()) > len(KEYS) / 4 / 2
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+
+    moved = [key for key in KEYS if before.node_for(key) != after.node_for(key)]
+    assert moved
+    assert all(after.node_for(key) == "d" for key in moved)
+
@@ -0,0 +1,170 @@
+import datetime
+import threading
+
+import pytest
+
+from core.history import History, RetentionPolicy
+from core.information import Information
+
+
+def chain(history: History, length: int):
+    ids = []
+    parent_id = None
+    for _ in range(length):
+        information = Information(parent_id=parent_id)
+        history.add(information)
+        parent_id = information.id
+        ids.append(information.id)
+    return ids
+
+
+@pytest.fixture
+def spilling(tmp_path):
+    history = History(retention=RetentionPolicy(
+        max_vertices=10, spill_directory=str(tmp_path), spill_segment_bytes=4096))
+    yield history
+    history.close()
+
+
+def test_rejects_zero_shards():
+    with pytest.raises(ValueError):
+        History(shards=0)
+
+
+def test_graph_queries():
+    history = History()
+    ids = chain(history, 4)
+    sibling = Information(parent_id=ids[1])
+    history.add(sibling)
+
+    assert [vertex.id for vertex in history.parents(ids[2])] == [ids[1]]
+    assert {vertex.id for vertex in history.children(ids[1])} == {ids[2], sibling.id}
+    assert [vertex.id for vertex in history.ancestors(ids[3])] == [ids[2], ids[1], ids[0]]
+    assert [vertex.id for vertex in history.ancestors(ids[3], max_depth=1)] == [ids[2]]
+    assert len(history.descendants(ids[0])) == 4
+    assert [vertex.id for vertex in history.lineage(ids[3])] == ids
+    assert [vertex.id for vertex in history.roots(ids[3])] == [ids[0]]
+    assert f"{ids[0]}-{ids[1]}" in history.edges
+
+
+def test_lineage_follows_the_earliest_parent():
+    history = History()
+    early, late = Information(), Information()
+    history.add(early)
+    history.add(late)
+    child = Information(parent_id=late.id)
+    history.add(child)
+    history.add(Information(id=child.id, parent_id=early.id))
+
+    assert [vertex.id for vertex in history.lineage(child.id)] == [early.id, child.id]
+
+
+def test_indexes_follow_updates():
+    history = History()
+    information = Information(function_id="first", input_timestamp="2024-01-01T00:00:00+00:00")
+    history.add(information)
+    information.function_id = "second"
+    history.add(information)
+
+    assert history.by_function("first") == []
+    assert [vertex.id for vertex in history.by_function("second")] == [information.id]
+    found = history.between(datetime.datetime(2023, 12, 31), datetime.datetime(2024, 1, 2))
+    assert [vertex.id for vertex in found] == [information.id]
+
+
+def test_evicts_to_the_vertex_limit_and_reads_back(spilling):
+    ids = chain(spilling, 30)
+
+    metrics = spilling.metrics
+    assert metrics["resident_vertices"] == 10
+    assert metrics["spilled_vertices"] == 20
+    assert len(spilling) == 30
+    assert ids[0] in spilling
+
+    vertex = spilling.get(ids[0])
+    assert vertex.id == ids[0]
+    assert spilling.metrics["resident_vertices"] == 10
+
+
+def test_graph_queries_do_not_make_spilled_vertices_resident(spilling):
+    ids = chain(spilling, 30)
+    written = spilling.metrics["spill"]["written"]
+
+    assert [vertex.id for vertex in spilling.lineage(ids[-1])] == ids
+    assert len(spilling.descendants(ids[0])) == 29
+
+    metrics = spilling.metrics
+    assert metrics["resident_vertices"] == 10
+    assert metrics["faulted"] == 0
+    assert metrics["spill"]["written"] == written
+
+
+def test_vertex_read_back_unchanged_is_not_written_again(spilling):
+    ids = chain(spilling, 20)
+    spilling.get(ids[0])
+    written = spilling.metrics["spill"]["written"]
+    evicted = spilling.metrics["evicted"]["max_vertices"]
+
+    # Evicts ids[0] again, with the nine vertices that were resident beside it
+    chain(spilling, 10)
+    assert spilling.metrics["evicted"]["max_vertices"] == evicted + 10
+    assert spilling.metrics["spill"]["written"] == written + 9
+
+
+def test_edge_to_an_evicted_parent_reaches_its_record(spilling):
+    ids = chain(spilling, 20)
+    child = Information(parent_id=ids[0])
+    spilling.add(child)
+
+    assert child.id in {vertex.id for vertex in spilling.children(ids[0])}
+
+
+def test_without_a_spill_directory_evicted_vertices_are_dropped():
+    history = History(retention=RetentionPolicy(max_vertices=5))
+    ids = chain(history, 8)
+
+    assert len(history) == 5
+    assert history.get(ids[0]) is None
+    assert history.metrics["dropped"] == 3
+    # The walk stops at the gap
+    assert len(history.lineage(ids[-1])) == 5
+
+
+def test_max_age_evicts_vertices_not_touched_recently(tmp_path):
+    history = History(retention=RetentionPolicy(max_age_seconds=0, spill_directory=str(tmp_path)))
+    try:
+        for _ in range(3):
+            history.add(Information())
+        assert history.metrics["resident_vertices"] == 0
+        assert history.metrics["evicted"]["max_age"] == 3
+    finally:
+        history.close()
+
+
+def test_concurrent_writers_and_queries(spilling):
+    roots = [Information() for _ in range(4)]
+    for root in roots:
+        spilling.add(root)
+    errors = []
+
+    def writer(root):
+        try:
+            parent_id = root.id
+            for _ in range(200):
+                information = Information(parent_id=parent_id)
+                spilling.add(information)
+                parent_id = information.id
+                spilling.edges
+            assert len(spilling.lineage(parent_id)) == 201
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=writer, args=(root,)) for root in roots]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert spilling.metrics["resident_vertices"] <= 10
+    assert len(spilling) == 804
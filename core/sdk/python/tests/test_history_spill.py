@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from core.history_spill import SpillLog
+
+
+@pytest.fixture
+def spill(tmp_path):
+    log = SpillLog(str(tmp_path), segment_bytes=256)
+    yield log
+    log.close()
+
+
+def record(number: int):
+    return {"id": f"v{number}", "payload": "x" * 40}
+
+
+def test_rejects_an_empty_segment_size(tmp_path):
+    with pytest.raises(ValueError):
+        SpillLog(str(tmp_path), segment_bytes=0)
+
+
+def test_reads_back_what_was_written(spill):
+    spill.write("a", record(1))
+    spill.write("b", record(2))
+
+    assert spill.read("a") == record(1)
+    assert "b" in spill
+    assert spill.read("missing") is None
+    assert len(spill) == 2
+
+
+def test_write_replaces_the_earlier_record(spill):
+    spill.write("a", record(1))
+    spill.write("a", record(2))
+
+    assert spill.read("a") == record(2)
+    assert len(spill) == 1
+
+
+def test_rotates_segments(spill):
+    for number in range(20):
+        spill.write(f"v{number}", record(number))
+
+    assert spill.metrics["segments"] > 1
+    assert all(spill.read(f"v{number}") == record(number) for number in range(20))
+
+
+def test_empty_sealed_segments_are_deleted(spill):
+    for number in range(20):
+        spill.write(f"v{number}", record(number))
+    segments = spill.metrics["segments"]
+
+    for number in range(10):
+        spill.discard(f"v{number}")
+
+    assert spill.metrics["segments"] < segments
+    assert spill.metrics["reclaimed_bytes"] > 0
+
+
+def test_compaction_keeps_live_records(tmp_path):
+    spill = SpillLog(str(tmp_path), segment_bytes=256, compact_ratio=0.9)
+    try:
+        for number in range(20):
+            spill.write(f"v{number}", record(number))
+        # Leave every sealed segment sparse but not empty
+        for number in range(0, 20, 2):
+            spill.discard(f"v{number}")
+        spill.compact()
+
+        metrics = spill.metrics
+        assert metrics["compactions"] > 0
+        assert metrics["live_bytes"] >= metrics["disk_bytes"] * 0.5
+        assert all(spill.read(f"v{number}") == record(number) for number in range(1, 20, 2))
+        assert all(f"v{number}" not in spill for number in range(0, 20, 2))
+    finally:
+        spill.close()
+
+
+def test_close_removes_the_directory(tmp_path):
+    spill = SpillLog(str(tmp_path))
+    spill.write("a", record(1))
+    spill.close()
+
+    assert not os.path.exists(spill.directory)
+    with pytest.raises(ValueError):
+        spill.write("a", record(1))
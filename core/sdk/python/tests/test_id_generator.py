@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from core.utils.id_generator import (
+    ULID_BYTES, ULID_LENGTH, IdGenerator, LegacyIdGenerator, UlidGenerator,
+    is_ulid, ulid_from_bytes, ulid_timestamp_ms, ulid_to_bytes
+)
+
+
+def test_ulids_are_canonical_and_round_trip_through_bytes():
+    value = UlidGenerator().new_id()
+
+    assert len(value) == ULID_LENGTH
+    assert is_ulid(value)
+    assert len(ulid_to_bytes(value)) == ULID_BYTES
+    assert ulid_from_bytes(ulid_to_bytes(value)) == value
+
+
+def test_byte_form_sorts_like_the_string():
+    values = sorted(UlidGenerator().new_ids(100) + UlidGenerator().new_ids(100))
+
+    assert sorted(values, key=ulid_to_bytes) == values
+
+
+@pytest.mark.parametrize("value", [
+    None, "", "01ARZ3NDEKTSV4RRFFQ69G5FA", "01ARZ3NDEKTSV4RRFFQ69G5FAVX",
+    # Lower case, excluded letters, and a first character past 128 bits
+    "01arz3ndektsv4rrffq69g5fav", "01ARZ3NDEKTSV4RRFFQ69G5FAI", "01ARZ3NDEKTSV4RRFFQ69G5FAU",
+    "81ARZ3NDEKTSV4RRFFQ69G5FAV",
+])
+def test_rejects_non_canonical_values(value):
+    assert not is_ulid(value)
+    if isinstance(value, str):
+        with pytest.raises(ValueError):
+            ulid_to_bytes(value)
+
+
+def test_from_bytes_checks_the_length():
+    with pytest.raises(ValueError):
+        ulid_from_bytes(b"\x00" * 15)
+
+
+def test_known_value():
+    # Largest timestamp, all random bits set
+    assert ulid_to_bytes("7ZZZZZZZZZZZZZZZZZZZZZZZZZ") == b"\xff" * 16
+    assert ulid_from_bytes(b"\x00" * 16) == "0" * 26
+
+
+def test_timestamp_is_the_creation_time():
+    before = time.time_ns() // 1_000_000
+    value = UlidGenerator().new_id()
+    after = time.time_ns() // 1_000_000
+
+    assert before <= ulid_timestamp_ms(value) <= after
+
+
+def test_ids_increase_within_a_millisecond():
+    generator = UlidGenerator()
+    values = [generator.new_id() for _ in range(1000)] + generator.new_ids(1000)
+
+    assert values == sorted(values)
+    assert len(set(values)) == len(values)
+
+
+def test_ids_increase_when_the_clock_steps_back(monkeypatch):
+    generator = UlidGenerator()
+    first = generator.new_id()
+
+    monkeypatch.setattr(time, "time_ns", lambda: 0)
+    second = generator.new_id()
+
+    assert second > first
+    assert ulid_timestamp_ms(second) == ulid_timestamp_ms(first)
+
+
+def test_legacy_ids():
+    value = LegacyIdGenerator().new_id()
+
+    assert len(value) == 43
+    assert not is_ulid(value)
+
+
+def test_generator_is_abstract():
+    with pytest.raises(TypeError):
+        IdGenerator()
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import threading
+
+import pytest
+
+from core.messaging.message_dispatcher import MessageDispatcher
+from core.messaging.message_priority import MessagePriority
+
+logger = logging.getLogger(__name__)
+
+
+def test_rejects_invalid_sizes():
+    with pytest.raises(ValueError):
+        MessageDispatcher(logger, queue_size=0)
+    with pytest.raises(ValueError):
+        MessageDispatcher(logger, worker_count=0)
+
+
+def test_submit_before_start_raises():
+    with pytest.raises(RuntimeError):
+        MessageDispatcher(logger).submit("a", [], "message")
+
+
+def test_keeps_order_within_a_topic():
+    async def run():
+        dispatcher = MessageDispatcher(logger, worker_count=4)
+        dispatcher.start(asyncio.get_running_loop())
+        received = []
+
+        async def handler(message):
+            await asyncio.sleep(0)
+            received.append(message)
+
+        for number in range(50):
+            dispatcher.submit("agents/1", [handler], number)
+        while dispatcher.metrics["pending"]:
+            await asyncio.sleep(0.01)
+        await dispatcher.stop()
+        return received
+
+    assert asyncio.run(run()) == list(range(50))
+
+
+def test_control_messages_are_taken_before_queued_data():
+    async def run():
+        dispatcher = MessageDispatcher(logger, worker_count=1)
+        dispatcher.start(asyncio.get_running_loop())
+        received = []
+
+        async def handler(message):
+            received.append(message)
+
+        # Queued in one go, before the worker runs
+        for number in range(3):
+            dispatcher.submit("data", [handler], f"data-{number}")
+        dispatcher.submit("control", [handler], "control", MessagePriority.CONTROL)
+        while dispatcher.metrics["pending"]:
+            await asyncio.sleep(0.01)
+        await dispatcher.stop()
+        return received
+
+    assert asyncio.run(run()) == ["control", "data-0", "data-1", "data-2"]
+
+
+def test_handler_errors_are_counted_and_do_not_stop_the_lane():
+    async def run():
+        dispatcher = MessageDispatcher(logger, worker_count=1)
+        dispatcher.start(asyncio.get_running_loop())
+        received = []
+
+        async def failing(message):
+            raise RuntimeError("boom")
+
+        async def handler(message):
+            received.append(message)
+
+        dispatcher.submit("a", [failing, handler], 1)
+        dispatcher.submit("a", [handler], 2)
+        while dispatcher.metrics["pending"]:
+            await asyncio.sleep(0.01)
+        await dispatcher.stop()
+        return received, dispatcher.metrics
+
+    received, metrics = asyncio.run(run())
+    assert received == [1, 2]
+    assert metrics["failed"] == 1
+    assert metrics["processed"] == 2
+
+
+def test_foreign_thread_blocks_when_the_queue_is_full():
+    async def run():
+        dispatcher = MessageDispatcher(logger, queue_size=2, worker_count=1)
+        dispatcher.start(asyncio.get_running_loop())
+        release = asyncio.Event()
+        received = []
+
+        async def handler(message):
+            await release.wait()
+            received.append(message)
+
+        def network_thread():
+            for number in range(5):
+                dispatcher.submit("a", [handler], number)
+
+        thread = threading.Thread(target=network_thread)
+        thread.start()
+        await asyncio.sleep(0.2)
+        # Two slots are taken; the thread waits for the third
+        assert thread.is_alive()
+        assert dispatcher.metrics["blocked"] == 1
+
+        release.set()
+        while thread.is_alive() or dispatcher.metrics["pending"]:
+            await asyncio.sleep(0.01)
+        thread.join()
+        await dispatcher.stop()
+        return received
+
+    assert asyncio.run(run()) == list(range(5))
+
+
+def test_loop_thread_overflows_instead_of_blocking():
+    async def run():
+        dispatcher = MessageDispatcher(logger, queue_size=1, worker_count=1)
+        dispatcher.start(asyncio.get_running_loop())
+
+        async def handler(message):
+            pass
+
+        dispatcher.submit("a", [handler], 1)
+        dispatcher.submit("a", [handler], 2)
+        saturated = dispatcher.is_saturated
+        await dispatcher.wait_for_capacity()
+        while dispatcher.metrics["pending"]:
+            await asyncio.sleep(0.01)
+        await dispatcher.stop()
+        return saturated, dispatcher.metrics
+
+    saturated, metrics = asyncio.run(run())
+    assert saturated
+    assert metrics["overflow"] == 1
+    assert metrics["processed"] == 2
+
+
+def test_stop_releases_unhandled_messages():
+    async def run():
+        dispatcher = MessageDispatcher(logger, queue_size=3, worker_count=1)
+        dispatcher.start(asyncio.get_running_loop())
+        blocker = asyncio.Event()
+
+        async def handler(message):
+            await blocker.wait()
+
+        for number in range(3):
+            dispatcher.submit("a", [handler], number)
+        await asyncio.sleep(0.01)
+        await dispatcher.stop()
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert dispatcher.metrics["pending"] == 0
+    assert not dispatcher.is_running
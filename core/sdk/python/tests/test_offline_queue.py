@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from core.messaging.offline_queue import OfflinePublishQueue
+
+
+def test_rejects_a_negative_size():
+    with pytest.raises(ValueError):
+        OfflinePublishQueue(-1)
+
+
+def test_disabled_at_size_zero():
+    async def run():
+        queue = OfflinePublishQueue(0)
+        return queue.put("message", asyncio.get_running_loop().create_future()), len(queue)
+
+    assert asyncio.run(run()) == (False, 0)
+
+
+def test_drains_oldest_first():
+    async def run():
+        queue = OfflinePublishQueue(10)
+        loop = asyncio.get_running_loop()
+        for number in range(3):
+            queue.put(number, loop.create_future())
+        drained = [message for message, _ in queue.drain()]
+        return drained, len(queue), queue.metrics
+
+    drained, remaining, metrics = asyncio.run(run())
+    assert drained == [0, 1, 2]
+    assert remaining == 0
+    assert metrics["flushed"] == 3
+
+
+def test_full_queue_drops_and_fails_the_oldest():
+    async def run():
+        queue = OfflinePublishQueue(2)
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in range(3)]
+        for number, future in enumerate(futures):
+            queue.put(number, future)
+        return [message for message, _ in queue.drain()], futures, queue.metrics
+
+    drained, futures, metrics = asyncio.run(run())
+    assert drained == [1, 2]
+    assert isinstance(futures[0].exception(), ConnectionError)
+    assert not futures[1].done()
+    assert metrics["dropped"] == 1
+
+
+def test_fail_all_fails_and_clears():
+    async def run():
+        queue = OfflinePublishQueue(5)
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in range(2)]
+        for future in futures:
+            queue.put("message", future)
+        queue.fail_all(ConnectionError("closed"))
+        return futures, len(queue)
+
+    futures, remaining = asyncio.run(run())
+    assert remaining == 0
+    assert all(isinstance(future.exception(), ConnectionError) for future in futures)
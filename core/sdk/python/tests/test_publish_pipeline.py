@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import threading
+
+import paho.mqtt.client as mqtt
+import pytest
+
+from core.messaging.message_priority import MessagePriority
+from core.messaging.publish_pipeline import PublishPipeline
+
+logger = logging.getLogger(__name__)
+
+
+class FakeInfo:
+    def __init__(self, mid: int, rc: int = mqtt.MQTT_ERR_SUCCESS):
+        self.mid = mid
+        self.rc = rc
+
+
+def publisher(mid: int, rc: int = mqtt.MQTT_ERR_SUCCESS):
+    return lambda: FakeInfo(mid, rc)
+
+
+def test_rejects_an_empty_window():
+    with pytest.raises(ValueError):
+        PublishPipeline(logger, max_inflight=0)
+
+
+def test_future_completes_on_publish_ack():
+    async def run():
+        pipeline = PublishPipeline(logger)
+        pipeline.start(asyncio.get_running_loop())
+        future = await pipeline.submit(publisher(1), qos=1)
+        assert not future.done()
+
+        # PUBACKs arrive on the network thread
+        thread = threading.Thread(target=pipeline.on_publish, args=(1,))
+        thread.start()
+        thread.join()
+        await asyncio.wait_for(future, 1)
+        return pipeline.metrics
+
+    metrics = asyncio.run(run())
+    assert metrics["acked"] == 1
+    assert metrics["inflight"] == 0
+
+
+def test_ack_before_submit_returns_completes_the_future():
+    async def run():
+        pipeline = PublishPipeline(logger)
+        pipeline.start(asyncio.get_running_loop())
+
+        def publish():
+            # paho may write a QoS 0 packet inside publish()
+            pipeline.on_publish(7)
+            return FakeInfo(7)
+
+        future = await pipeline.submit(publish)
+        return future.done()
+
+    assert asyncio.run(run())
+
+
+def test_failed_publish_fails_its_future():
+    async def run():
+        pipeline = PublishPipeline(logger)
+        pipeline.start(asyncio.get_running_loop())
+        future = await pipeline.submit(publisher(1, rc=mqtt.MQTT_ERR_NO_CONN))
+        with pytest.raises(RuntimeError):
+            await future
+        # Done callbacks run on the next iteration
+        await asyncio.sleep(0)
+        return pipeline.metrics
+
+    assert asyncio.run(run())["failed"] == 1
+
+
+def test_window_serves_control_before_data():
+    async def run():
+        pipeline = PublishPipeline(logger, max_inflight=1)
+        pipeline.start(asyncio.get_running_loop())
+        order = []
+
+        first = await pipeline.submit(publisher(1))
+
+        async def submit(mid, priority):
+            await pipeline.submit(publisher(mid), priority=priority)
+            order.append(priority)
+
+        waiters = [
+            asyncio.ensure_future(submit(2, MessagePriority.DATA)),
+            asyncio.ensure_future(submit(3, MessagePriority.CONTROL)),
+        ]
+        await asyncio.sleep(0)
+        assert pipeline.metrics["waiting"] == {"control": 1, "data": 1}
+
+        pipeline.on_publish(1)
+        await first
+        pipeline.on_publish(3)
+        await asyncio.gather(*waiters)
+        return order
+
+    assert asyncio.run(run()) == [MessagePriority.CONTROL, MessagePriority.DATA]
+
+
+def test_fail_unsent_keeps_qos1_publishes():
+    async def run():
+        pipeline = PublishPipeline(logger)
+        pipeline.start(asyncio.get_running_loop())
+        qos0 = await pipeline.submit(publisher(1), qos=0)
+        qos1 = await pipeline.submit(publisher(2), qos=1)
+
+        pipeline.fail_unsent(ConnectionError("lost"))
+        with pytest.raises(ConnectionError):
+            await qos0
+        assert not qos1.done()
+
+        pipeline.on_publish(2)
+        await asyncio.wait_for(qos1, 1)
+
+    asyncio.run(run())
+
+
+def test_fail_unsent_forgets_early_acks():
+    async def run():
+        pipeline = PublishPipeline(logger)
+        pipeline.start(asyncio.get_running_loop())
+
+        # An ack for a mid that was never registered, then the connection drops
+        pipeline.on_publish(5)
+        pipeline.fail_unsent(ConnectionError("lost"))
+
+        # mid 5 comes round again; it must wait for its own ack
+        future = await pipeline.submit(publisher(5), qos=1)
+        assert not future.done()
+        pipeline.on_publish(5)
+        await asyncio.wait_for(future, 1)
+
+    asyncio.run(run())
+
+
+def test_fail_all_fails_every_pending_publish():
+    async def run():
+        pipeline = PublishPipeline(logger)
+        pipeline.start(asyncio.get_running_loop())
+        futures = [await pipeline.submit(publisher(mid), qos=1) for mid in (1, 2)]
+        pipeline.fail_all(ConnectionError("closed"))
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        await pipeline.flush()
+        return results, pipeline.metrics
+
+    results, metrics = asyncio.run(run())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert metrics["inflight"] == 0
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from core.broker_options import BrokerOptions
+from core.data import Data
+from core.loopback_broker import LoopbackBroker
+from core.messaging.loopback import LoopbackHub
+from core.messaging.rate_limiter import RateLimitExceeded, RateLimitPolicy, SenderRateLimiter, TokenBucket
+from core.models.messages.broker_message import BrokerMessage, BrokerMessageType
+
+
+def acquire_all(limiter: SenderRateLimiter, senders):
+    async def run():
+        return [await limiter.acquire(sender) for sender in senders]
+    return asyncio.run(run())
+
+
+def test_bucket_allows_the_burst_then_reports_the_wait():
+    bucket = TokenBucket(rate=10, burst=2)
+
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    wait = bucket.take()
+    assert 0 < wait <= 0.1
+
+
+def test_bucket_refund_is_capped_at_the_burst():
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.refund()
+
+    assert bucket.tokens == 1
+
+
+@pytest.mark.parametrize("arguments", [{"rate_per_second": 0}, {"rate_per_second": 1, "burst": 0},
+                                       {"rate_per_second": None, "host_rate_per_second": -1}])
+def test_rejects_invalid_limits(arguments):
+    with pytest.raises(ValueError):
+        SenderRateLimiter(**arguments)
+
+
+def test_drop_limits_each_sender_separately():
+    limiter = SenderRateLimiter(1, burst=2, policy=RateLimitPolicy.DROP)
+
+    assert acquire_all(limiter, ["a", "a", "a", "b"]) == [True, True, False, True]
+    metrics = limiter.metrics
+    assert metrics["dropped"] == 1
+    assert metrics["throttled_by_sender"] == {"a": 1}
+
+
+def test_raise_policy_raises():
+    limiter = SenderRateLimiter(1, burst=1, policy=RateLimitPolicy.RAISE)
+    acquire_all(limiter, ["a"])
+
+    with pytest.raises(RateLimitExceeded) as raised:
+        acquire_all(limiter, ["a"])
+    assert raised.value.sender == "a"
+
+
+def test_delay_waits_for_a_token():
+    limiter = SenderRateLimiter(20, burst=1, policy=RateLimitPolicy.DELAY)
+
+    started = time.monotonic()
+    assert acquire_all(limiter, ["a", "a", "a"]) == [True, True, True]
+    # Two waits of 1/20 s
+    assert time.monotonic() - started >= 0.09
+    assert limiter.metrics["delayed"] == 2
+
+
+def test_host_bucket_limits_all_senders_together():
+    limiter = SenderRateLimiter(None, policy=RateLimitPolicy.DROP, host_rate_per_second=1, host_burst=2)
+
+    assert acquire_all(limiter, ["a", "b", "c"]) == [True, True, False]
+    assert limiter.metrics["host_throttled"] == 1
+
+
+def test_dropped_message_keeps_its_sender_token():
+    limiter = SenderRateLimiter(1, burst=1, policy=RateLimitPolicy.DROP, host_rate_per_second=1, host_burst=1)
+    acquire_all(limiter, ["a"])
+
+    # "b" is refused by the host bucket, so its own token is refunded
+    assert acquire_all(limiter, ["b"]) == [False]
+    assert limiter._buckets["b"].tokens == pytest.approx(1, abs=0.01)
+
+
+def test_keeps_buckets_for_the_most_recent_senders():
+    limiter = SenderRateLimiter(1, burst=1, policy=RateLimitPolicy.DROP, max_senders=2)
+    acquire_all(limiter, ["a", "b", "c"])
+
+    assert list(limiter._buckets) == ["b", "c"]
+    # "a" was forgotten, so it starts with a full bucket
+    assert acquire_all(limiter, ["a"]) == [True]
+
+
+def test_broker_never_limits_control_messages():
+    def message(message_type: str) -> BrokerMessage:
+        data = Data()
+        data.add("type", message_type)
+        return BrokerMessage(type=BrokerMessageType.EVENT, topic="event/agent-1/authority/-/-", data=data)
+
+    async def run():
+        broker = LoopbackBroker(logging.getLogger(__name__), LoopbackHub(), BrokerOptions(
+            publish_rate_limit=1, publish_rate_burst=1, publish_host_rate_limit=1, publish_host_rate_burst=1,
+            publish_rate_policy=RateLimitPolicy.DROP))
+        await broker.connect("token", "loopback://test")
+        for _ in range(3):
+            await broker.publish(message("chat"))
+        for _ in range(3):
+            await broker.publish(message("credential_request"))
+        # publish hands the send to a task
+        await asyncio.sleep(0.05)
+        await broker.flush()
+        metrics = broker.metrics
+        await broker.disconnect()
+        return metrics
+
+    metrics = asyncio.run(run())
+    assert metrics["rate_limit"]["dropped"] == 2
+    # One chat message and every control message
+    assert metrics["publish"]["published"] == 4
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+
+from core.broker import BrokerMessage, BrokerMessageType
+from core.data import Data
+from core.loopback_broker import LoopbackBroker
+from core.messaging.loopback import LoopbackHub
+from core.sharded_broker import ShardedBroker
+
+logger = logging.getLogger(__name__)
+
+
+def test_shard_key_follows_the_agent():
+    key = ShardedBroker._shard_key
+
+    # An agent's inbound and outbound topics share a shard
+    assert key("event/+/authority/host/agent-1") == "agent-1"
+    assert key("event/agent-1/authority/-/agent-2") == "agent-1"
+    assert key("connect/event/agent-1/authority/-/-") == "agent-1"
+    assert key("event/-/authority/host/-") == "host"
+    assert key("other/topic") == "other/topic"
+
+
+def test_sharded_metrics_reads_do_not_reset_the_rates():
+    async def run():
+        hub = LoopbackHub()
+        sharded = ShardedBroker(logger, 2, shard_factory=lambda clock: LoopbackBroker(logger, hub, clock=clock),
+                                rate_interval_seconds=0.1)
+        publisher = LoopbackBroker(logger, hub)
+        await sharded.connect("token", "loopback://test")
+        await publisher.connect("token", "loopback://test")
+
+        async def handler(message):
+            pass
+
+        handles = await sharded.subscribe_many([f"event/+/authority/-/agent-{n}" for n in range(4)], handler)
+        await asyncio.gather(*(handle.acknowledged for handle in handles))
+        for number in range(40):
+            data = Data()
+            data.add("n", number)
+            await publisher.publish_async(BrokerMessage(
+                type=BrokerMessageType.EVENT, topic=f"event/x/authority/-/agent-{number % 4}", data=data))
+        await asyncio.sleep(0.25)
+
+        first = [shard["receive_rate"] for shard in sharded.metrics["shards"]]
+        second = [shard["receive_rate"] for shard in sharded.metrics["shards"]]
+        text = sharded.prometheus_metrics()
+        await sharded.disconnect()
+        await publisher.disconnect()
+        return first, second, text
+
+    first, second, text = asyncio.run(run())
+    assert first == second
+    assert all(rate is not None for rate in first)
+    # One family header, samples from both shards
+    assert text.count("# TYPE agience_broker_messages_total counter") == 1
+    assert 'shard="0"' in text and 'shard="1"' in text
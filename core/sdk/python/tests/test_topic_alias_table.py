@@ -0,0 +1,44 @@
+import pytest
+
+from core.messaging.topic_alias_table import TopicAliasTable
+
+
+def test_disabled_without_a_maximum():
+    table = TopicAliasTable()
+
+    assert table.resolve("a") == (0, False)
+    assert table.metrics["assigned"] == 0
+
+
+def test_assigns_then_reuses_aliases():
+    table = TopicAliasTable(3)
+
+    assert table.resolve("a") == (1, True)
+    assert table.resolve("b") == (2, True)
+    assert table.resolve("a") == (1, False)
+    assert table.metrics["hits"] == 1
+
+
+def test_evicts_the_least_recently_published_topic():
+    table = TopicAliasTable(2)
+    table.resolve("a")
+    table.resolve("b")
+    table.resolve("a")
+
+    # "b" is the least recent, so "c" takes its alias
+    assert table.resolve("c") == (2, True)
+    assert table.resolve("a") == (1, False)
+    assert table.resolve("b") == (2, True)
+    assert table.metrics["evicted"] == 2
+
+
+def test_reset_forgets_aliases_and_caps_the_maximum():
+    table = TopicAliasTable(2)
+    table.resolve("a")
+
+    table.reset(100000)
+    assert table.maximum == 0xFFFF
+    assert table.resolve("a") == (1, True)
+
+    with pytest.raises(ValueError):
+        table.reset(-1)
@@ -0,0 +1,66 @@
+import pytest
+
+from core.messaging.topic_trie import TopicTrie, split_shared_filter
+
+
+def trie_with(*filters):
+    trie = TopicTrie()
+    for topic_filter in filters:
+        trie.add(topic_filter, topic_filter)
+    return trie
+
+
+def test_matches_literal_and_wildcard_filters():
+    trie = trie_with("event/a/b", "event/+/b", "event/#", "other/#", "event/a/+/c")
+
+    assert sorted(trie.match("event/a/b")) == ["event/#", "event/+/b", "event/a/b"]
+    assert sorted(trie.match("event/x/b")) == ["event/#", "event/+/b"]
+    assert trie.match("other") == ["other/#"]
+    assert trie.match("nothing/here") == []
+
+
+def test_single_level_wildcard_matches_one_level_only():
+    trie = trie_with("a/+")
+
+    assert trie.match("a/b") == ["a/+"]
+    assert trie.match("a/b/c") == []
+    assert trie.match("a") == []
+
+
+def test_wildcards_skip_dollar_topics_at_the_first_level():
+    trie = trie_with("#", "+/status", "$SYS/#")
+
+    assert trie.match("$SYS/status") == ["$SYS/#"]
+    assert sorted(trie.match("host/status")) == ["#", "+/status"]
+
+
+@pytest.mark.parametrize("topic_filter", ["", "a/#/b", "a/b#", "a/b+/c"])
+def test_rejects_invalid_filters(topic_filter):
+    with pytest.raises(ValueError):
+        TopicTrie().add(topic_filter, 1)
+
+
+def test_remove_prunes_empty_branches():
+    trie = TopicTrie()
+    trie.add("a/b/c", 1)
+    trie.add("a/b/c", 2)
+    trie.add("a/d", 3)
+
+    assert trie.remove("a/b/c", 1) == 1
+    assert trie.get("a/b/c") == [2]
+    assert trie.remove("a/b/c") == 1
+    assert trie.remove("a/b/c") == 0
+    assert "a/b/c" not in trie
+    assert len(trie) == 1
+    assert list(trie.filters()) == ["a/d"]
+    # The emptied branch is gone, not just empty
+    assert "b" not in trie._root.children["a"].children
+
+
+def test_split_shared_filter():
+    assert split_shared_filter("$share/workers/event/+/a") == ("workers", "event/+/a")
+    assert split_shared_filter("event/+/a") == (None, "event/+/a")
+    with pytest.raises(ValueError):
+        split_shared_filter("$share/wor+kers/event")
+    with pytest.raises(ValueError):
+        split_shared_filter("$share/workers")
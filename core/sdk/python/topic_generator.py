@@ -1,6 +1,7 @@
 class TopicGenerator:
     EVENT_PREFIX = "event/"
     CONNECT_PREFIX = "connect/"
+    SHARE_PREFIX = "$share/"
 
     def __init__(self, authority_id: str, sender_id: str):
         if authority_id is None:
@@ -14,6 +15,9 @@ class TopicGenerator:
     def connect_to(self, topic: str) -> str:
         return f"{self.CONNECT_PREFIX}{topic}"
 
+    def share(self, group: str, topic: str) -> str:
+        return f"{self.SHARE_PREFIX}{group}/{topic}"
+
     def subscribe_as(self, host_id: str | None, agent_id: str | None) -> str:
         return f"{self.EVENT_PREFIX}+/{self._authority_id}/{host_id or '-'}/{agent_id or '-'}"
 
@@ -37,3 +41,6 @@ class TopicGenerator:
 
     def subscribe_as_authority(self) -> str:
         return self.subscribe_as(None, None)
+
+    def subscribe_as_authority_shared(self, group: str) -> str:
+        return self.share(group, self.subscribe_as_authority())
@@ -0,0 +1,12 @@
+import random
+
+
+def jittered_backoff(attempt: int, min_delay_seconds: float, max_delay_seconds: float) -> float:
+    """
+    Delay before retry number `attempt` (0-based): exponential from
+    `min_delay_seconds`, capped at `max_delay_seconds`, then drawn from the
+    upper half of that range so clients that lost the same server do not
+    retry in lockstep.
+    """
+    cap = min(max_delay_seconds, min_delay_seconds * (2 ** min(attempt, 32)))
+    return random.uniform(cap / 2, cap)
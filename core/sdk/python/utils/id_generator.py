@@ -0,0 +1,164 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+import base64
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+
+ULID_LENGTH = 26
+ULID_BYTES = 16
+
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+# Crockford digits to the digits int(..., 32) reads
+_FROM_CROCKFORD = str.maketrans(_CROCKFORD, "0123456789abcdefghijklmnopqrstuv")
+# Canonical form only: upper case, no I, L, O or U, and a first character
+# that keeps the value within 128 bits. Anything else would not survive a
+# trip through the 16-byte form unchanged.
+_ULID_PATTERN = re.compile("[0-7][0-9A-HJKMNP-TV-Z]{25}")
+
+# Two characters for each 10-bit value. The 48-bit timestamp is exactly the
+# first 10 characters and the random part the last 16.
+_PAIRS = [high + low for high in _CROCKFORD for low in _CROCKFORD]
+
+
+def _encode_time(timestamp_ms: int) -> str:
+    return _CROCKFORD[timestamp_ms >> 45] + "".join(
+        [_CROCKFORD[(timestamp_ms >> shift) & 31] for shift in range(40, -5, -5)])
+
+
+def _encode_random(value: int) -> str:
+    pairs = _PAIRS
+    return (pairs[value >> 70] + pairs[(value >> 60) & 1023] + pairs[(value >> 50) & 1023]
+            + pairs[(value >> 40) & 1023] + pairs[(value >> 30) & 1023] + pairs[(value >> 20) & 1023]
+            + pairs[(value >> 10) & 1023] + pairs[value & 1023])
+
+
+def _encode(value: int) -> str:
+    return _encode_time(value >> _RANDOM_BITS) + _encode_random(value & _RANDOM_MAX)
+
+
+def is_ulid(value: Optional[str]) -> bool:
+    return isinstance(value, str) and _ULID_PATTERN.fullmatch(value) is not None
+
+
+def ulid_to_bytes(value: str) -> bytes:
+    """The 16-byte big-endian form; byte order sorts like the string."""
+    if not is_ulid(value):
+        raise ValueError(f"Not a ULID: {value!r}")
+    return int(value.translate(_FROM_CROCKFORD), 32).to_bytes(ULID_BYTES, "big")
+
+
+def ulid_from_bytes(value: bytes) -> str:
+    if len(value) != ULID_BYTES:
+        raise ValueError(f"A ULID is {ULID_BYTES} bytes, got {len(value)}")
+    return _encode(int.from_bytes(value, "big"))
+
+
+def ulid_timestamp_ms(value: str) -> int:
+    """Creation time, in Unix milliseconds."""
+    return int.from_bytes(ulid_to_bytes(value)[:6], "big")
+
+
+class IdGenerator(ABC):
+    """Source of Information ids."""
+
+    @abstractmethod
+    def new_id(self) -> str:
+        pass
+
+    def new_ids(self, count: int) -> List[str]:
+        return [self.new_id() for _ in range(count)]
+
+
+class LegacyIdGenerator(IdGenerator):
+    """
+    SHA-256 of a random UUID, base64url without padding: 43 characters,
+    unordered. The format the first SDKs used.
+    """
+
+    def new_id(self) -> str:
+        digest = hashlib.sha256(uuid.uuid4().bytes).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+
+class UlidGenerator(IdGenerator):
+    """
+    ULIDs: 48 bits of Unix milliseconds then 80 random bits, as 26 Crockford
+    base32 characters. Ids sort by creation time. Within a millisecond the
+    random part is incremented rather than redrawn, so ids from one
+    generator are strictly increasing even when the clock stands still or
+    steps back. `new_ids` draws randomness once for the whole batch, and
+    the encoded timestamp is reused for as long as the millisecond lasts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._last_random = 0
+        self._prefix_cache: Tuple[int, str] = (-1, "")
+
+    def new_id(self) -> str:
+        timestamp, random_part = self._reserve(1)
+        return self._time_prefix(timestamp) + _encode_random(random_part)
+
+    def new_ids(self, count: int) -> List[str]:
+        if count <= 0:
+            return []
+        timestamp, first = self._reserve(count)
+        prefix = self._time_prefix(timestamp)
+        return [prefix + _encode_random(first + offset) for offset in range(count)]
+
+    def _time_prefix(self, timestamp: int) -> str:
+        # Read and written as one tuple so concurrent callers never pair a
+        # prefix with the wrong millisecond
+        cached = self._prefix_cache
+        if cached[0] != timestamp:
+            cached = (timestamp, _encode_time(timestamp))
+            self._prefix_cache = cached
+        return cached[1]
+
+    def _reserve(self, count: int) -> Tuple[int, int]:
+        """Timestamp and first random part of `count` consecutive ULIDs."""
+        now_ms = time.time_ns() // 1_000_000
+        with self._lock:
+            if now_ms > self._last_ms:
+                # Top bit clear leaves room to increment within the millisecond
+                random_part = int.from_bytes(os.urandom(10), "big") >> 1
+                timestamp = now_ms
+            else:
+                random_part = self._last_random + 1
+                timestamp = self._last_ms
+
+            if random_part + count - 1 > _RANDOM_MAX:
+                # Exhausted this millisecond; borrow the next one
+                timestamp += 1
+                random_part = int.from_bytes(os.urandom(10), "big") >> 1
+
+            self._last_ms = timestamp
+            self._last_random = random_part + count - 1
+
+        return timestamp, random_part
+
+
+_generator: IdGenerator = UlidGenerator()
+
+
+def id_generator() -> IdGenerator:
+    return _generator
+
+
+def set_id_generator(generator: IdGenerator) -> IdGenerator:
+    """Replaces the generator used for new Information ids, e.g. with LegacyIdGenerator."""
+    global _generator
+    _generator = generator
+    return _generator
+
+
+def new_id() -> str:
+    return _generator.new_id()
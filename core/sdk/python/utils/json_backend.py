@@ -0,0 +1,92 @@
+from typing import Any, Optional, Union
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class JsonBackend:
+    """Compact UTF-8 JSON. The stdlib backend is always available."""
+
+    name = "stdlib"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
+
+    def loads(self, payload: Union[bytes, bytearray, memoryview, str]) -> Any:
+        if isinstance(payload, memoryview):
+            payload = payload.tobytes()
+        return json.loads(payload)
+
+
+class OrjsonBackend(JsonBackend):
+    name = "orjson"
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    def loads(self, payload: Union[bytes, bytearray, memoryview, str]) -> Any:
+        return orjson.loads(payload)
+
+
+class UjsonBackend(JsonBackend):
+    name = "ujson"
+
+    def dumps(self, value: Any) -> bytes:
+        return ujson.dumps(value, ensure_ascii=False, escape_forward_slashes=False).encode()
+
+    def loads(self, payload: Union[bytes, bytearray, memoryview, str]) -> Any:
+        if isinstance(payload, memoryview):
+            payload = payload.tobytes()
+        return ujson.loads(payload)
+
+
+def _available():
+    backends = {"stdlib": JsonBackend}
+    if ujson is not None:
+        backends["ujson"] = UjsonBackend
+    if orjson is not None:
+        backends["orjson"] = OrjsonBackend
+    return backends
+
+
+def _fastest() -> JsonBackend:
+    if orjson is not None:
+        return OrjsonBackend()
+    if ujson is not None:
+        return UjsonBackend()
+    return JsonBackend()
+
+
+_backend: JsonBackend = _fastest()
+
+
+def json_backend() -> JsonBackend:
+    return _backend
+
+
+def set_json_backend(backend: Optional[Union[str, JsonBackend]] = None) -> JsonBackend:
+    """
+    Selects the backend used by Data: a JsonBackend, one of "stdlib",
+    "orjson" or "ujson", or None for the fastest one installed.
+    """
+    global _backend
+
+    if backend is None:
+        _backend = _fastest()
+    elif isinstance(backend, JsonBackend):
+        _backend = backend
+    else:
+        backends = _available()
+        if backend not in backends:
+            raise ValueError(f"JSON backend '{backend}' is not installed")
+        _backend = backends[backend]()
+
+    return _backend
@@ -0,0 +1,175 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from ntplib import NTPClient, NTPStats
+
+
+class NtpClock:
+    """
+    Wall clock disciplined by NTP. The server is queried once at start and
+    then every `resync_interval_seconds`; reads are served from
+    `time.monotonic()` plus the offset measured at the last sync, so they never
+    touch the network. A failed resync keeps the previous offset.
+    """
+
+    TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        ntp_hosts: List[str],
+        resync_interval_seconds: float = 24 * 60 * 60,
+        max_backoff_seconds: float = 32
+    ):
+        if not ntp_hosts:
+            raise ValueError("ntp_hosts cannot be empty")
+
+        self._logger = logger
+        self._ntp_hosts = ntp_hosts
+        self._resync_interval_seconds = resync_interval_seconds
+        self._max_backoff_seconds = max_backoff_seconds
+        self._ntp_client = NTPClient()
+        self._resync_task: Optional[asyncio.Task] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+
+        # Epoch seconds that correspond to _base_monotonic
+        self._base_time: Optional[float] = None
+        self._base_monotonic = 0.0
+
+        self._last_sync_monotonic: Optional[float] = None
+        self._last_offset_seconds = 0.0
+        self._last_delay_seconds = 0.0
+        self._last_ntp_host: Optional[str] = None
+        self._drift_seconds = 0.0
+        self._drift_ppm = 0.0
+        self._sync_count = 0
+        self._sync_failures = 0
+
+    @property
+    def is_synchronized(self) -> bool:
+        return self._base_time is not None
+
+    @property
+    def ntp_hosts(self) -> List[str]:
+        return self._ntp_hosts
+
+    def now(self) -> float:
+        """Current time as epoch seconds (UTC)."""
+        if self._base_time is None:
+            raise RuntimeError("NTP client not initialized")
+        return self._base_time + (time.monotonic() - self._base_monotonic)
+
+    @property
+    def timestamp(self) -> str:
+        return datetime.fromtimestamp(self.now(), tz=timezone.utc).strftime(self.TIME_FORMAT)
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        last_sync_age = None
+        if self._last_sync_monotonic is not None:
+            last_sync_age = time.monotonic() - self._last_sync_monotonic
+
+        return {
+            "synchronized": self.is_synchronized,
+            "ntp_host": self._last_ntp_host,
+            "offset_seconds": self._last_offset_seconds,
+            "delay_seconds": self._last_delay_seconds,
+            "drift_seconds": self._drift_seconds,
+            "drift_ppm": self._drift_ppm,
+            "last_sync_age_seconds": last_sync_age,
+            "sync_count": self._sync_count,
+            "sync_failures": self._sync_failures,
+        }
+
+    async def start(self):
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+
+        async with self._start_lock:
+            if not self.is_synchronized:
+                await self._sync_with_backoff()
+
+            if self._resync_task is None and self._resync_interval_seconds > 0:
+                self._resync_task = asyncio.create_task(self._resync_loop())
+
+    async def stop(self):
+        if self._resync_task:
+            self._resync_task.cancel()
+            try:
+                await self._resync_task
+            except asyncio.CancelledError:
+                pass
+            self._resync_task = None
+
+    async def sync(self, ntp_host: str):
+        loop = asyncio.get_running_loop()
+        response, sampled_monotonic, sampled_time = await loop.run_in_executor(
+            None, self._request, ntp_host)
+
+        true_time = sampled_time + response.offset
+
+        if self._base_time is not None and self._last_sync_monotonic is not None:
+            predicted_time = self._base_time + \
+                (sampled_monotonic - self._base_monotonic)
+            self._drift_seconds = true_time - predicted_time
+
+            elapsed = sampled_monotonic - self._last_sync_monotonic
+            if elapsed > 0:
+                self._drift_ppm = self._drift_seconds / elapsed * 1_000_000
+
+        self._base_time = true_time
+        self._base_monotonic = sampled_monotonic
+        self._last_sync_monotonic = sampled_monotonic
+        self._last_offset_seconds = response.offset
+        self._last_delay_seconds = response.delay
+        self._last_ntp_host = ntp_host
+        self._sync_count += 1
+
+    def use_local_time(self):
+        """Serve the local wall clock without querying NTP (offline runs, loopback broker)."""
+        self._base_time = time.time()
+        self._base_monotonic = time.monotonic()
+        self._last_ntp_host = None
+
+    def _request(self, ntp_host: str) -> Tuple[NTPStats, float, float]:
+        response = self._ntp_client.request(ntp_host)
+        # Sample both clocks together so the offset is anchored to monotonic time
+        return response, time.monotonic(), time.time()
+
+    async def _resync_loop(self):
+        while True:
+            await asyncio.sleep(self._resync_interval_seconds)
+            try:
+                await self._sync_with_backoff()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._logger.error(f"NTP resync failed: {str(e)}")
+
+    async def _sync_with_backoff(self):
+        delay = 1
+        current_host_index = 0
+
+        while True:
+            ntp_host = self._ntp_hosts[current_host_index]
+            try:
+                self._logger.info(f"NTP Querying host {ntp_host}")
+                await self.sync(ntp_host)
+                self._logger.info(
+                    f"Connected to {ntp_host}. NTP Time: {self.timestamp}")
+                break
+            except Exception as e:
+                self._sync_failures += 1
+                self._logger.error(f"NTP Query to host {ntp_host} failed")
+
+                start_new_cycle = current_host_index == len(self._ntp_hosts) - 1
+                current_host_index = 0 if start_new_cycle else current_host_index + 1
+
+                if start_new_cycle:
+                    self._logger.info(
+                        f"Trying again a NTP connection in {delay} seconds.\n{str(e)}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self._max_backoff_seconds)